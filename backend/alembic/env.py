@@ -10,13 +10,16 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from src.models import (  # noqa: F401
     CalendarEvent,
+    FolderTagCount,
     Idea,
     IdeaFolder,
     IdeaTagLink,
     IdeaType,
     LinkMetadata,
+    LinkPreviewJob,
     OAuthAccount,
     OAuthProviderConfig,
+    RefreshToken,
     Tag,
     Task,
     User,
@@ -38,6 +41,18 @@ if config.config_file_name is not None:
 
 target_metadata = SQLModel.metadata
 
+
+def include_name(name, type_, parent_names):
+    """Объекты полнотекстового поиска создаются миграцией вручную."""
+    if type_ == "table" and name.startswith("idea_fts"):
+        return False
+    if type_ == "column" and name == "search_vector":
+        return False
+    if type_ == "index" and name == "ix_idea_search_vector":
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -61,6 +76,7 @@ def run_migrations_offline() -> None:
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
+        include_name=include_name,
         dialect_opts={"paramstyle": "named"},
     )
 
@@ -82,7 +98,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,44 @@
+"""add composite indexes for hot queries
+
+Revision ID: 2d76d6f116e8
+Revises: 8194af36c7a8
+Create Date: 2026-10-18 21:35:15.343985
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2d76d6f116e8"
+down_revision: Union[str, Sequence[str], None] = "8194af36c7a8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Одиночные индексы по is_pinned и именам перекрыты составными:
+    # (owner_id, is_pinned, ...), (owner_id, name) у тегов и папок
+    op.drop_index(op.f("ix_idea_is_pinned"), table_name="idea")
+    op.create_index(
+        "ix_idea_owner_folder_pinned_updated",
+        "idea",
+        ["owner_id", "folder_id", "is_pinned", "updated_at", "id"],
+        unique=False,
+    )
+    op.drop_index(op.f("ix_ideafolder_name"), table_name="ideafolder")
+    op.create_index(
+        "ix_ideataglink_tag_idea", "ideataglink", ["tag_id", "idea_id"], unique=False
+    )
+    op.drop_index(op.f("ix_tag_name"), table_name="tag")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f("ix_tag_name"), "tag", ["name"], unique=False)
+    op.drop_index("ix_ideataglink_tag_idea", table_name="ideataglink")
+    op.create_index(op.f("ix_ideafolder_name"), "ideafolder", ["name"], unique=False)
+    op.drop_index("ix_idea_owner_folder_pinned_updated", table_name="idea")
+    op.create_index(op.f("ix_idea_is_pinned"), "idea", ["is_pinned"], unique=False)
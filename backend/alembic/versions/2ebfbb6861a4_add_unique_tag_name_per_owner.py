@@ -0,0 +1,58 @@
+"""add unique tag name per owner
+
+Revision ID: 2ebfbb6861a4
+Revises: 00f95865a014
+Create Date: 2026-10-18 22:10:41.512307
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "2ebfbb6861a4"
+down_revision: Union[str, Sequence[str], None] = "00f95865a014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicate_tags() -> None:
+    """
+    Дубли тегов, созданные параллельными запросами, сливаются в один тег
+    (первый по id): связи переносятся на него, дубли удаляются.
+    """
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text("SELECT id, owner_id, name FROM tag ORDER BY owner_id, name, id")
+    ).all()
+    keep = {}
+    for tag_id, owner_id, name in rows:
+        kept = keep.setdefault((owner_id, name), tag_id)
+        if kept == tag_id:
+            continue
+        params = {"keep": kept, "duplicate": tag_id}
+        bind.execute(
+            sa.text(
+                "UPDATE ideataglink SET tag_id = :keep WHERE tag_id = :duplicate "
+                "AND idea_id NOT IN "
+                "(SELECT idea_id FROM ideataglink WHERE tag_id = :keep)"
+            ),
+            params,
+        )
+        bind.execute(
+            sa.text("DELETE FROM ideataglink WHERE tag_id = :duplicate"), params
+        )
+        bind.execute(sa.text("DELETE FROM tag WHERE id = :duplicate"), params)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _merge_duplicate_tags()
+    op.create_index("ix_tag_owner_name", "tag", ["owner_id", "name"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tag_owner_name", table_name="tag")
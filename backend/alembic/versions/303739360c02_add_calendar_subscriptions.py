@@ -0,0 +1,138 @@
+"""add calendar subscriptions
+
+Revision ID: 303739360c02
+Revises: 93f8718d99b0
+Create Date: 2026-10-18 22:02:54.902494
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "303739360c02"
+down_revision: Union[str, Sequence[str], None] = "93f8718d99b0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "calendarsource",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("url", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("etag", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("last_modified", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(), nullable=True),
+        sa.Column("next_fetch_at", sa.DateTime(), nullable=True),
+        sa.Column("failure_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("url"),
+    )
+    op.create_index(
+        "ix_calendarsource_next_fetch_at",
+        "calendarsource",
+        ["next_fetch_at"],
+        unique=False,
+    )
+    op.create_table(
+        "calendarsubscription",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column("source_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["owner_id"],
+            ["user.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["source_id"],
+            ["calendarsource.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("owner_id", "source_id"),
+    )
+    op.create_index(
+        "ix_calendarsubscription_source",
+        "calendarsubscription",
+        ["source_id"],
+        unique=False,
+    )
+    op.create_table(
+        "remoteevent",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("source_id", sa.Uuid(), nullable=False),
+        sa.Column("uid", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("recurrence_id", sa.DateTime(), nullable=True),
+        sa.Column("digest", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("is_long", sa.Boolean(), server_default="0", nullable=False),
+        sa.Column("rrule", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("exdates", sa.JSON(), server_default="[]", nullable=False),
+        sa.Column("recurrence_end", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["source_id"],
+            ["calendarsource.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_remoteevent_source_long_end",
+        "remoteevent",
+        ["source_id", "end_time"],
+        unique=False,
+        sqlite_where=sa.text("is_long = 1"),
+        postgresql_where=sa.text("is_long"),
+    )
+    op.create_index(
+        "ix_remoteevent_source_series",
+        "remoteevent",
+        ["source_id", "start_time"],
+        unique=False,
+        sqlite_where=sa.text("rrule IS NOT NULL"),
+        postgresql_where=sa.text("rrule IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_remoteevent_source_start",
+        "remoteevent",
+        ["source_id", "start_time", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_remoteevent_source_uid",
+        "remoteevent",
+        ["source_id", "uid", "recurrence_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_remoteevent_source_uid", table_name="remoteevent")
+    op.drop_index("ix_remoteevent_source_start", table_name="remoteevent")
+    op.drop_index(
+        "ix_remoteevent_source_series",
+        table_name="remoteevent",
+        sqlite_where=sa.text("rrule IS NOT NULL"),
+        postgresql_where=sa.text("rrule IS NOT NULL"),
+    )
+    op.drop_index(
+        "ix_remoteevent_source_long_end",
+        table_name="remoteevent",
+        sqlite_where=sa.text("is_long = 1"),
+        postgresql_where=sa.text("is_long"),
+    )
+    op.drop_table("remoteevent")
+    op.drop_index("ix_calendarsubscription_source", table_name="calendarsubscription")
+    op.drop_table("calendarsubscription")
+    op.drop_index("ix_calendarsource_next_fetch_at", table_name="calendarsource")
+    op.drop_table("calendarsource")
@@ -0,0 +1,151 @@
+"""add idea full text search
+
+Revision ID: 53272bdaeadb
+Revises: cd1df87644e6
+Create Date: 2026-10-18 21:40:12.318004
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "53272bdaeadb"
+down_revision: Union[str, Sequence[str], None] = "cd1df87644e6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Снимок DDL из src/models/idea.py на момент этой ревизии: дальнейшие
+# изменения модели оформляются новыми миграциями и эту не меняют
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS idea_fts USING fts5(
+        title, content,
+        content='idea', content_rowid='rowid',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_fts_ai AFTER INSERT ON idea BEGIN
+        INSERT INTO idea_fts(rowid, title, content)
+        VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_fts_ad AFTER DELETE ON idea BEGIN
+        INSERT INTO idea_fts(idea_fts, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_fts_au AFTER UPDATE OF title, content ON idea
+    BEGIN
+        INSERT INTO idea_fts(idea_fts, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+        INSERT INTO idea_fts(rowid, title, content)
+        VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+]
+
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE idea ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION idea_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.content, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER idea_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON idea
+    FOR EACH ROW EXECUTE FUNCTION idea_search_vector_update()
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_idea_search_vector
+    ON idea USING GIN (search_vector)
+    """,
+]
+
+# Существующие идеи индексируются порциями, чтобы не держать в памяти всю
+# таблицу. В PostgreSQL каждая порция - своя транзакция: блокировки строк
+# короткие, а прерванная миграция при повторе продолжает с идей без вектора.
+# В SQLite индекс строится в транзакции миграции, порции ограничивают только
+# память.
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _backfill_sqlite(bind) -> None:
+    last_rowid = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT rowid, title, content FROM idea "
+                "WHERE rowid > :last ORDER BY rowid LIMIT :batch"
+            ),
+            {"last": last_rowid, "batch": BACKFILL_BATCH_SIZE},
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            sa.text(
+                "INSERT INTO idea_fts(rowid, title, content) "
+                "VALUES (:rowid, :title, :content)"
+            ),
+            [
+                {"rowid": rowid, "title": title, "content": content}
+                for rowid, title, content in rows
+            ],
+        )
+        last_rowid = rows[-1][0]
+
+
+def _backfill_postgres(bind) -> None:
+    # Пустое обновление заголовка запускает триггер, который строит вектор
+    while True:
+        result = bind.execute(
+            sa.text(
+                "UPDATE idea SET title = title WHERE id IN ("
+                "SELECT id FROM idea WHERE search_vector IS NULL LIMIT :batch)"
+            ),
+            {"batch": BACKFILL_BATCH_SIZE},
+        )
+        if result.rowcount == 0:
+            return
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        _backfill_sqlite(bind)
+    elif bind.dialect.name == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+        # Фиксирует DDL, дальше каждый UPDATE фиксируется сам
+        with op.get_context().autocommit_block():
+            _backfill_postgres(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in ("idea_fts_ai", "idea_fts_ad", "idea_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS idea_fts")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS idea_search_vector_trigger ON idea")
+        op.execute("DROP FUNCTION IF EXISTS idea_search_vector_update()")
+        op.execute("DROP INDEX IF EXISTS ix_idea_search_vector")
+        op.execute("ALTER TABLE idea DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,228 @@
+"""add idea counters
+
+Revision ID: 8194af36c7a8
+Revises: 2ebfbb6861a4
+Create Date: 2026-10-18 21:22:39.717159
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8194af36c7a8"
+down_revision: Union[str, Sequence[str], None] = "2ebfbb6861a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Снимок DDL из src/models/idea.py на момент этой ревизии: дальнейшие
+# изменения модели оформляются новыми миграциями и эту не меняют
+SQLITE_COUNTER_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_counts_ai AFTER INSERT ON idea BEGIN
+        UPDATE ideafolder SET idea_count = idea_count + 1
+        WHERE id = new.folder_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_counts_ad AFTER DELETE ON idea BEGIN
+        UPDATE ideafolder SET idea_count = idea_count - 1
+        WHERE id = old.folder_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_counts_au AFTER UPDATE OF folder_id ON idea
+    WHEN old.folder_id IS NOT new.folder_id
+    BEGIN
+        UPDATE ideafolder SET idea_count = idea_count - 1
+        WHERE id = old.folder_id;
+        UPDATE ideafolder SET idea_count = idea_count + 1
+        WHERE id = new.folder_id;
+        UPDATE foldertagcount SET idea_count = idea_count - 1
+        WHERE folder_id = old.folder_id
+          AND tag_id IN (SELECT tag_id FROM ideataglink WHERE idea_id = new.id);
+        DELETE FROM foldertagcount
+        WHERE folder_id = old.folder_id AND idea_count <= 0;
+        INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+        SELECT new.folder_id, tag_id, 1 FROM ideataglink WHERE idea_id = new.id
+        ON CONFLICT (folder_id, tag_id)
+        DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ideataglink_counts_ai AFTER INSERT ON ideataglink
+    BEGIN
+        UPDATE tag SET idea_count = idea_count + 1 WHERE id = new.tag_id;
+        INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+        SELECT folder_id, new.tag_id, 1 FROM idea WHERE id = new.idea_id
+        ON CONFLICT (folder_id, tag_id)
+        DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ideataglink_counts_ad AFTER DELETE ON ideataglink
+    BEGIN
+        UPDATE tag SET idea_count = idea_count - 1 WHERE id = old.tag_id;
+        UPDATE foldertagcount SET idea_count = idea_count - 1
+        WHERE tag_id = old.tag_id
+          AND folder_id = (SELECT folder_id FROM idea WHERE id = old.idea_id);
+        DELETE FROM foldertagcount
+        WHERE tag_id = old.tag_id AND idea_count <= 0;
+    END
+    """,
+]
+
+POSTGRES_COUNTER_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION idea_counts_update() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE ideafolder SET idea_count = idea_count + 1
+            WHERE id = NEW.folder_id;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE ideafolder SET idea_count = idea_count - 1
+            WHERE id = OLD.folder_id;
+        ELSIF NEW.folder_id IS DISTINCT FROM OLD.folder_id THEN
+            UPDATE ideafolder SET idea_count = idea_count - 1
+            WHERE id = OLD.folder_id;
+            UPDATE ideafolder SET idea_count = idea_count + 1
+            WHERE id = NEW.folder_id;
+            UPDATE foldertagcount SET idea_count = idea_count - 1
+            WHERE folder_id = OLD.folder_id
+              AND tag_id IN (SELECT tag_id FROM ideataglink WHERE idea_id = NEW.id);
+            DELETE FROM foldertagcount
+            WHERE folder_id = OLD.folder_id AND idea_count <= 0;
+            INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+            SELECT NEW.folder_id, tag_id, 1 FROM ideataglink WHERE idea_id = NEW.id
+            ON CONFLICT (folder_id, tag_id)
+            DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER idea_counts_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF folder_id ON idea
+    FOR EACH ROW EXECUTE FUNCTION idea_counts_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION ideataglink_counts_update() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE tag SET idea_count = idea_count + 1 WHERE id = NEW.tag_id;
+            INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+            SELECT folder_id, NEW.tag_id, 1 FROM idea WHERE id = NEW.idea_id
+            ON CONFLICT (folder_id, tag_id)
+            DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+        ELSE
+            UPDATE tag SET idea_count = idea_count - 1 WHERE id = OLD.tag_id;
+            UPDATE foldertagcount SET idea_count = idea_count - 1
+            WHERE tag_id = OLD.tag_id
+              AND folder_id = (SELECT folder_id FROM idea WHERE id = OLD.idea_id);
+            DELETE FROM foldertagcount
+            WHERE tag_id = OLD.tag_id AND idea_count <= 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER ideataglink_counts_trigger
+    AFTER INSERT OR DELETE ON ideataglink
+    FOR EACH ROW EXECUTE FUNCTION ideataglink_counts_update()
+    """,
+]
+
+# Начальные значения счетчиков; дальше их ведут триггеры
+BACKFILL = [
+    """
+    UPDATE ideafolder SET idea_count =
+        (SELECT count(*) FROM idea WHERE idea.folder_id = ideafolder.id)
+    """,
+    """
+    UPDATE tag SET idea_count =
+        (SELECT count(*) FROM ideataglink WHERE ideataglink.tag_id = tag.id)
+    """,
+    """
+    INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+    SELECT idea.folder_id, ideataglink.tag_id, count(*)
+    FROM ideataglink JOIN idea ON idea.id = ideataglink.idea_id
+    GROUP BY idea.folder_id, ideataglink.tag_id
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "foldertagcount",
+        sa.Column("folder_id", sa.Uuid(), nullable=False),
+        sa.Column("tag_id", sa.Uuid(), nullable=False),
+        sa.Column("idea_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["folder_id"],
+            ["ideafolder.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["tag_id"],
+            ["tag.id"],
+        ),
+        sa.PrimaryKeyConstraint("folder_id", "tag_id"),
+    )
+    op.create_index(
+        "ix_foldertagcount_folder_count",
+        "foldertagcount",
+        ["folder_id", sa.text("idea_count DESC")],
+        unique=False,
+    )
+    op.add_column(
+        "ideafolder",
+        sa.Column("idea_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "tag",
+        sa.Column("idea_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_index(
+        "ix_tag_owner_count",
+        "tag",
+        ["owner_id", sa.text("idea_count DESC"), "name", "id"],
+        unique=False,
+    )
+
+    for statement in BACKFILL:
+        op.execute(statement)
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for statement in SQLITE_COUNTER_DDL:
+            op.execute(statement)
+    elif bind.dialect.name == "postgresql":
+        for statement in POSTGRES_COUNTER_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in (
+            "idea_counts_ai",
+            "idea_counts_ad",
+            "idea_counts_au",
+            "ideataglink_counts_ai",
+            "ideataglink_counts_ad",
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS idea_counts_trigger ON idea")
+        op.execute("DROP TRIGGER IF EXISTS ideataglink_counts_trigger ON ideataglink")
+        op.execute("DROP FUNCTION IF EXISTS idea_counts_update()")
+        op.execute("DROP FUNCTION IF EXISTS ideataglink_counts_update()")
+    op.drop_index("ix_tag_owner_count", table_name="tag")
+    op.drop_column("tag", "idea_count")
+    op.drop_column("ideafolder", "idea_count")
+    op.drop_index("ix_foldertagcount_folder_count", table_name="foldertagcount")
+    op.drop_table("foldertagcount")
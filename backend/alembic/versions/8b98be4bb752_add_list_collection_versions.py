@@ -0,0 +1,298 @@
+"""add list collection versions
+
+Revision ID: 8b98be4bb752
+Revises: 303739360c02
+Create Date: 2026-10-18 22:07:46.563351
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b98be4bb752"
+down_revision: Union[str, Sequence[str], None] = "303739360c02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Снимок DDL из src/models/version.py на момент этой ревизии: дальнейшие
+# изменения модели оформляются новыми миграциями и эту не меняют
+SQLITE_COLLECTION_VERSION_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS task_tasks_version_ai AFTER INSERT ON task
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'tasks', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_tasks_version_au AFTER UPDATE ON task
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'tasks', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_tasks_version_ad AFTER DELETE ON task
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (old.owner_id, 'tasks', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_ideas_version_ai AFTER INSERT ON idea
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'ideas', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_ideas_version_au AFTER UPDATE ON idea
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'ideas', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_ideas_version_ad AFTER DELETE ON idea
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (old.owner_id, 'ideas', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_tags_version_ai AFTER INSERT ON tag
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'tags', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_tags_version_au AFTER UPDATE ON tag
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'tags', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_tags_version_ad AFTER DELETE ON tag
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (old.owner_id, 'tags', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calendarsubscription_calendar_version_ai AFTER INSERT ON calendarsubscription
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calendarsubscription_calendar_version_au AFTER UPDATE ON calendarsubscription
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calendarsubscription_calendar_version_ad AFTER DELETE ON calendarsubscription
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (old.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ideataglink_ideas_version_ai AFTER INSERT ON ideataglink
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        SELECT DISTINCT owner_id, 'ideas', 1, CURRENT_TIMESTAMP FROM tag WHERE tag.id = new.tag_id
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ideataglink_ideas_version_ad AFTER DELETE ON ideataglink
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        SELECT DISTINCT owner_id, 'ideas', 1, CURRENT_TIMESTAMP FROM tag WHERE tag.id = old.tag_id
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_ideas_version_au AFTER UPDATE OF name ON tag
+    WHEN new.name IS NOT old.name
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'ideas', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS linkmetadata_ideas_version_au AFTER UPDATE ON linkmetadata
+    WHEN new.title IS NOT old.title OR new.description IS NOT old.description OR new.image_url IS NOT old.image_url OR new.content_type IS NOT old.content_type
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        SELECT DISTINCT owner_id, 'ideas', 1, CURRENT_TIMESTAMP FROM idea WHERE idea.url = new.url AND idea.link_metadata_id = new.id
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+]
+
+POSTGRES_COLLECTION_VERSION_DDL = [
+    """
+    CREATE OR REPLACE TRIGGER task_tasks_version
+    AFTER INSERT OR UPDATE OR DELETE ON task
+    FOR EACH ROW EXECUTE FUNCTION collection_version_bump('tasks')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER idea_ideas_version
+    AFTER INSERT OR UPDATE OR DELETE ON idea
+    FOR EACH ROW EXECUTE FUNCTION collection_version_bump('ideas')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER tag_tags_version
+    AFTER INSERT OR UPDATE OR DELETE ON tag
+    FOR EACH ROW EXECUTE FUNCTION collection_version_bump('tags')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER calendarsubscription_calendar_version
+    AFTER INSERT OR UPDATE OR DELETE ON calendarsubscription
+    FOR EACH ROW EXECUTE FUNCTION collection_version_bump('calendar')
+    """,
+    """
+    CREATE OR REPLACE FUNCTION ideataglink_version_bump() RETURNS trigger AS $$
+    DECLARE
+        link_tag uuid;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            link_tag := OLD.tag_id;
+        ELSE
+            link_tag := NEW.tag_id;
+        END IF;
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        SELECT owner_id, TG_ARGV[0], 1, timezone('utc', now())
+        FROM tag WHERE id = link_tag
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = collectionversion.version + 1,
+            updated_at = timezone('utc', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER ideataglink_ideas_version
+    AFTER INSERT OR DELETE ON ideataglink
+    FOR EACH ROW EXECUTE FUNCTION ideataglink_version_bump('ideas')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER tag_ideas_version
+    AFTER UPDATE OF name ON tag
+    FOR EACH ROW WHEN (NEW.name IS DISTINCT FROM OLD.name)
+    EXECUTE FUNCTION collection_version_bump('ideas')
+    """,
+    """
+    CREATE OR REPLACE FUNCTION linkmetadata_version_bump() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        SELECT DISTINCT owner_id, TG_ARGV[0], 1, timezone('utc', now())
+        FROM idea WHERE url = NEW.url AND link_metadata_id = NEW.id
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = collectionversion.version + 1,
+            updated_at = timezone('utc', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER linkmetadata_ideas_version
+    AFTER UPDATE ON linkmetadata
+    FOR EACH ROW WHEN (
+        NEW.title IS DISTINCT FROM OLD.title
+        OR NEW.description IS DISTINCT FROM OLD.description
+        OR NEW.image_url IS DISTINCT FROM OLD.image_url
+        OR NEW.content_type IS DISTINCT FROM OLD.content_type
+    )
+    EXECUTE FUNCTION linkmetadata_version_bump('ideas')
+    """,
+]
+
+SQLITE_TRIGGERS = [
+    *(
+        f"{table}_{collection}_version_{suffix}"
+        for table, collection in [
+            ("task", "tasks"),
+            ("idea", "ideas"),
+            ("tag", "tags"),
+            ("calendarsubscription", "calendar"),
+        ]
+        for suffix in ("ai", "au", "ad")
+    ),
+    "ideataglink_ideas_version_ai",
+    "ideataglink_ideas_version_ad",
+    "tag_ideas_version_au",
+    "linkmetadata_ideas_version_au",
+]
+POSTGRES_TRIGGERS = [
+    ("task_tasks_version", "task"),
+    ("idea_ideas_version", "idea"),
+    ("tag_tags_version", "tag"),
+    ("calendarsubscription_calendar_version", "calendarsubscription"),
+    ("ideataglink_ideas_version", "ideataglink"),
+    ("tag_ideas_version", "tag"),
+    ("linkmetadata_ideas_version", "linkmetadata"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Строк версий не заводим: до первой записи версия списка - 0
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for statement in SQLITE_COLLECTION_VERSION_DDL:
+            op.execute(statement)
+    elif bind.dialect.name == "postgresql":
+        for statement in POSTGRES_COLLECTION_VERSION_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    elif bind.dialect.name == "postgresql":
+        for trigger, table in POSTGRES_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+        op.execute("DROP FUNCTION IF EXISTS ideataglink_version_bump()")
+        op.execute("DROP FUNCTION IF EXISTS linkmetadata_version_bump()")
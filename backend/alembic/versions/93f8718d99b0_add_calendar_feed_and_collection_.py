@@ -0,0 +1,213 @@
+"""add calendar feed and collection versions
+
+Revision ID: 93f8718d99b0
+Revises: a48c79c1f818
+Create Date: 2026-10-18 21:53:59.385082
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "93f8718d99b0"
+down_revision: Union[str, Sequence[str], None] = "a48c79c1f818"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Снимок DDL из src/models/version.py на момент этой ревизии: дальнейшие
+# изменения модели оформляются новыми миграциями и эту не меняют
+SQLITE_CALENDAR_VERSION_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS calendarevent_calendar_version_ai AFTER INSERT ON calendarevent
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calendarevent_calendar_version_au AFTER UPDATE ON calendarevent
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calendarevent_calendar_version_ad AFTER DELETE ON calendarevent
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (old.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_calendar_version_ai AFTER INSERT ON task
+    WHEN new.due_date IS NOT NULL
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_calendar_version_au AFTER UPDATE ON task
+    WHEN new.due_date IS NOT NULL OR old.due_date IS NOT NULL
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (new.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_calendar_version_ad AFTER DELETE ON task
+    WHEN old.due_date IS NOT NULL
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (old.owner_id, 'calendar', 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+]
+
+POSTGRES_CALENDAR_VERSION_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION collection_version_bump() RETURNS trigger AS $$
+    DECLARE
+        row_owner uuid;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_owner := OLD.owner_id;
+        ELSE
+            row_owner := NEW.owner_id;
+        END IF;
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (row_owner, TG_ARGV[0], 1, timezone('utc', now()))
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = collectionversion.version + 1,
+            updated_at = timezone('utc', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER calendarevent_calendar_version
+    AFTER INSERT OR UPDATE OR DELETE ON calendarevent
+    FOR EACH ROW EXECUTE FUNCTION collection_version_bump('calendar')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER task_calendar_version_write
+    AFTER INSERT OR UPDATE ON task
+    FOR EACH ROW WHEN (NEW.due_date IS NOT NULL)
+    EXECUTE FUNCTION collection_version_bump('calendar')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER task_calendar_version_clear
+    AFTER UPDATE ON task
+    FOR EACH ROW WHEN (NEW.due_date IS NULL AND OLD.due_date IS NOT NULL)
+    EXECUTE FUNCTION collection_version_bump('calendar')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER task_calendar_version_delete
+    AFTER DELETE ON task
+    FOR EACH ROW WHEN (OLD.due_date IS NOT NULL)
+    EXECUTE FUNCTION collection_version_bump('calendar')
+    """,
+]
+
+# Первая версия календаря у всех, у кого он не пуст; дальше ее ведут триггеры
+BACKFILL = """
+    INSERT INTO collectionversion (owner_id, collection, version)
+    SELECT owner_id, 'calendar', 1 FROM calendarevent
+    UNION
+    SELECT owner_id, 'calendar', 1 FROM task WHERE due_date IS NOT NULL
+"""
+
+SQLITE_TRIGGERS = [
+    "calendarevent_calendar_version_ai",
+    "calendarevent_calendar_version_au",
+    "calendarevent_calendar_version_ad",
+    "task_calendar_version_ai",
+    "task_calendar_version_au",
+    "task_calendar_version_ad",
+]
+POSTGRES_TRIGGERS = [
+    ("calendarevent_calendar_version", "calendarevent"),
+    ("task_calendar_version_write", "task"),
+    ("task_calendar_version_clear", "task"),
+    ("task_calendar_version_delete", "task"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "calendarfeedtoken",
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column("token_hash", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["owner_id"],
+            ["user.id"],
+        ),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+    op.create_index(
+        op.f("ix_calendarfeedtoken_token_hash"),
+        "calendarfeedtoken",
+        ["token_hash"],
+        unique=True,
+    )
+    op.create_table(
+        "collectionversion",
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column("collection", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(
+            ["owner_id"],
+            ["user.id"],
+        ),
+        sa.PrimaryKeyConstraint("owner_id", "collection"),
+    )
+
+    op.execute(BACKFILL)
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for statement in SQLITE_CALENDAR_VERSION_DDL:
+            op.execute(statement)
+    elif bind.dialect.name == "postgresql":
+        for statement in POSTGRES_CALENDAR_VERSION_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    elif bind.dialect.name == "postgresql":
+        for trigger, table in POSTGRES_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+        op.execute("DROP FUNCTION IF EXISTS collection_version_bump()")
+    op.drop_table("collectionversion")
+    op.drop_index(
+        op.f("ix_calendarfeedtoken_token_hash"), table_name="calendarfeedtoken"
+    )
+    op.drop_table("calendarfeedtoken")
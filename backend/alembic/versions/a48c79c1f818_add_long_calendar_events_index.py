@@ -0,0 +1,52 @@
+"""add long calendar events index
+
+Revision ID: a48c79c1f818
+Revises: b9bf90adb2ad
+Create Date: 2026-10-18 21:46:25.399273
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a48c79c1f818"
+down_revision: Union[str, Sequence[str], None] = "b9bf90adb2ad"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Длительность длинного события - LONG_EVENT в src/models/calendar.py (сутки)
+BACKFILL = {
+    "sqlite": "UPDATE calendarevent SET is_long = "
+    "(julianday(end_time) - julianday(start_time) > 1)",
+    "postgresql": "UPDATE calendarevent SET is_long = "
+    "(end_time - start_time > interval '1 day')",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "calendarevent",
+        sa.Column("is_long", sa.Boolean(), server_default="0", nullable=False),
+    )
+    statement = BACKFILL.get(op.get_bind().dialect.name)
+    if statement:
+        op.execute(statement)
+    op.create_index(
+        "ix_calendarevent_owner_long_end",
+        "calendarevent",
+        ["owner_id", "end_time"],
+        unique=False,
+        sqlite_where=sa.text("is_long = 1"),
+        postgresql_where=sa.text("is_long"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_calendarevent_owner_long_end", table_name="calendarevent")
+    op.drop_column("calendarevent", "is_long")
@@ -0,0 +1,65 @@
+"""add recurring calendar events
+
+Revision ID: b9bf90adb2ad
+Revises: 2d76d6f116e8
+Create Date: 2026-10-18 21:41:10.714328
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "b9bf90adb2ad"
+down_revision: Union[str, Sequence[str], None] = "2d76d6f116e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SERIES_FK = "fk_calendarevent_series_id_calendarevent"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite добавляет внешний ключ только пересозданием таблицы
+    with op.batch_alter_table("calendarevent") as batch_op:
+        batch_op.add_column(
+            sa.Column("rrule", sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("exdates", sa.JSON(), server_default="[]", nullable=False)
+        )
+        batch_op.add_column(sa.Column("recurrence_end", sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column("series_id", sa.Uuid(), nullable=True))
+        batch_op.add_column(sa.Column("recurrence_id", sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key(SERIES_FK, "calendarevent", ["series_id"], ["id"])
+    op.create_index(
+        "ix_calendarevent_owner_series",
+        "calendarevent",
+        ["owner_id", "start_time"],
+        unique=False,
+        sqlite_where=sa.text("rrule IS NOT NULL"),
+        postgresql_where=sa.text("rrule IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_calendarevent_series_recurrence",
+        "calendarevent",
+        ["series_id", "recurrence_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_calendarevent_series_recurrence", table_name="calendarevent")
+    op.drop_index("ix_calendarevent_owner_series", table_name="calendarevent")
+    with op.batch_alter_table("calendarevent") as batch_op:
+        batch_op.drop_constraint(SERIES_FK, type_="foreignkey")
+        batch_op.drop_column("recurrence_id")
+        batch_op.drop_column("series_id")
+        batch_op.drop_column("recurrence_end")
+        batch_op.drop_column("exdates")
+        batch_op.drop_column("rrule")
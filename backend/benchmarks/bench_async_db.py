@@ -0,0 +1,173 @@
+"""
+Нагрузочный бенчмарк API: пропускная способность и задержки под
+конкурентной нагрузкой.
+
+Поднимает uvicorn с отдельной SQLite-базой, регистрирует пользователя,
+создает набор задач и гоняет смешанную нагрузку (чтение списка задач и
+создание новых) от N одновременных клиентов.
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_async_db --clients 200 --duration 15
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _bench_env(db_file: Path) -> dict:
+    env = dict(os.environ)
+    env.update(
+        {
+            "DB_PATH": f"sqlite:///{db_file}",
+            "DEBUG": "False",
+            "ENCRYPTION_KEY": "Zq3wZ0vQm0p2aG6cE9bH3mU8yVb1tLxN5sR7kJ4dF2c=",
+            "SECRET_KEY": "benchmark-secret-key-benchmark-secret-key",
+            "JWT_ALGORITHM": "HS256",
+            "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+            "TIMEZONE": "UTC",
+        }
+    )
+    return env
+
+
+def _create_schema(env: dict) -> None:
+    # Схема создается в отдельном процессе, чтобы настройки приложения
+    # прочитались из переменных окружения бенчмарка
+    code = (
+        "from sqlmodel import SQLModel\n"
+        "import src.models  # noqa: F401\n"
+        "from src.core.database import engine\n"
+        "SQLModel.metadata.create_all(engine)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True)
+
+
+async def _wait_ready(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+async def _login(client: httpx.AsyncClient) -> dict:
+    user = {"username": "bench", "email": "bench@example.com", "password": "bench"}
+    await client.post("/auth/register", json=user)
+    response = await client.post(
+        "/auth/token", data={"username": user["email"], "password": user["password"]}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _worker(client, headers, deadline, write_ratio, latencies, errors, n):
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        started = time.perf_counter()
+        try:
+            if write_ratio and i % int(1 / write_ratio) == 0:
+                response = await client.post(
+                    "/tasks/", json={"title": f"task {n}-{i}"}, headers=headers
+                )
+            else:
+                response = await client.get("/tasks/", headers=headers)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(args) -> None:
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _bench_env(Path(tmp) / "bench.db")
+        _create_schema(env)
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "src.main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            limits = httpx.Limits(max_connections=args.clients)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+            ) as client:
+                await _wait_ready(client)
+                headers = await _login(client)
+                for i in range(args.seed):
+                    await client.post(
+                        "/tasks/", json={"title": f"seed {i}"}, headers=headers
+                    )
+
+                latencies: list[float] = []
+                errors: list = []
+                deadline = time.perf_counter() + args.duration
+                await asyncio.gather(
+                    *(
+                        _worker(
+                            client,
+                            headers,
+                            deadline,
+                            args.write_ratio,
+                            latencies,
+                            errors,
+                            n,
+                        )
+                        for n in range(args.clients)
+                    )
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"clients:      {args.clients}")
+    print(f"requests:     {len(latencies)}")
+    print(f"errors:       {len(errors)}")
+    print(f"requests/sec: {len(latencies) / args.duration:.1f}")
+    print(f"p50 latency:  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"p99 latency:  {p99 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=50, help="tasks created up front")
+    parser.add_argument(
+        "--write-ratio", type=float, default=0.1, help="share of POST /tasks/"
+    )
+    asyncio.run(run(parser.parse_args()))
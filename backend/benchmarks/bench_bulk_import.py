@@ -0,0 +1,192 @@
+"""
+Массовый импорт: потоковый импорт пачками против поштучного создания идей,
+как при миграции через POST /idea-box/ideas/ (теги по одному, коммит на
+каждую идею).
+
+Генерирует NDJSON-файл с --ideas идеями (часть со ссылками, 0-3 тега из
+словаря на --tags тегов, несколько папок) и импортирует его во временную
+SQLite-базу с производственным профилем PRAGMA. Поштучный путь замеряется
+на первых --baseline записях того же файла и пересчитывается на весь файл.
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_bulk_import --ideas 100000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("DB_PATH", "sqlite:///./bench.db")
+os.environ.setdefault("DEBUG", "False")
+os.environ.setdefault("ENCRYPTION_KEY", "Zq3wZ0vQm0p2aG6cE9bH3mU8yVb1tLxN5sR7kJ4dF2c=")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("TIMEZONE", "UTC")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa
+from sqlalchemy.pool import NullPool  # noqa: E402
+from sqlmodel import SQLModel, func, select  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from src.core.database import apply_sqlite_profile, sqlite_pragmas  # noqa: E402
+from src.models import Idea, IdeaFolder, IdeaType, Tag, User  # noqa: E402
+from src.modules.idea_box.services.bulk_import import (  # noqa: E402
+    import_records,
+    parse_ndjson,
+)
+
+CHUNK_SIZE = 256 * 1024
+
+
+def write_ndjson(path: Path, ideas: int, tags: int) -> None:
+    rnd = random.Random(42)
+    vocabulary = [f"tag{i}" for i in range(tags)]
+    folders = ["Inbox", "Reading", "Work", "Personal", None]
+    with path.open("w") as file:
+        for i in range(ideas):
+            record = {
+                "title": f"Idea {i} " + " ".join(rnd.choices(vocabulary, k=3)),
+                "content": "lorem ipsum dolor sit amet " * rnd.randint(1, 20),
+                "tags": rnd.sample(vocabulary, rnd.randint(0, 3)),
+                "folder": rnd.choice(folders),
+            }
+            if rnd.random() < 0.3:
+                record["url"] = f"https://example.com/{rnd.randrange(ideas // 2)}"
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+async def file_chunks(path: Path, limit_lines: int = 0):
+    if limit_lines:
+        with path.open("rb") as file:
+            yield b"".join(file.readline() for _ in range(limit_lines))
+        return
+    with path.open("rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def create_user(session_maker) -> User:
+    async with session_maker() as db:
+        user = User(username="bench", email="bench@example.com")
+        db.add(user)
+        await db.commit()
+        return user
+
+
+async def run_bulk(session_maker, owner_id, path: Path) -> int:
+    async with session_maker() as db:
+        async for progress in import_records(
+            db, owner_id, parse_ndjson(file_chunks(path))
+        ):
+            pass
+    return progress.ideas
+
+
+async def run_one_by_one(session_maker, owner_id, path: Path, limit: int) -> int:
+    """Как create_idea: папка и каждый тег отдельными запросами, коммит на идею."""
+    created = 0
+    async with session_maker() as db:
+        async for _, data in parse_ndjson(file_chunks(path, limit)):
+            name = data.get("folder") or "Imported"
+            folder = (
+                await db.exec(
+                    select(IdeaFolder).where(
+                        IdeaFolder.owner_id == owner_id, IdeaFolder.name == name
+                    )
+                )
+            ).first()
+            if folder is None:
+                folder = IdeaFolder(name=name, owner_id=owner_id)
+                db.add(folder)
+            tags = []
+            for tag_name in data["tags"]:
+                tag = (
+                    await db.exec(
+                        select(Tag).where(
+                            Tag.name == tag_name, Tag.owner_id == owner_id
+                        )
+                    )
+                ).first()
+                if not tag:
+                    tag = Tag(name=tag_name, owner_id=owner_id)
+                    db.add(tag)
+                tags.append(tag)
+            idea = Idea(
+                title=data["title"],
+                content=data["content"],
+                url=data.get("url"),
+                idea_type=IdeaType.LINK if data.get("url") else IdeaType.TEXT,
+                owner_id=owner_id,
+                folder_id=folder.id,
+                tags=tags,
+            )
+            db.add(idea)
+            await db.commit()
+            await db.refresh(idea)
+            created += 1
+    return created
+
+
+async def count_ideas(session_maker) -> int:
+    async with session_maker() as db:
+        return (await db.exec(select(func.count()).select_from(Idea))).one()
+
+
+async def bench(db_file: Path, path: Path, args) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}", poolclass=NullPool)
+    apply_sqlite_profile(engine.sync_engine, sqlite_pragmas())
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    bulk_user = await create_user(session_maker)
+    started = time.perf_counter()
+    imported = await run_bulk(session_maker, bulk_user.id, path)
+    bulk_seconds = time.perf_counter() - started
+
+    slow_user = User(username="slow", email="slow@example.com")
+    async with session_maker() as db:
+        db.add(slow_user)
+        await db.commit()
+    started = time.perf_counter()
+    created = await run_one_by_one(session_maker, slow_user.id, path, args.baseline)
+    slow_seconds = time.perf_counter() - started
+
+    print(f"{'':<14}{'ideas':>9}{'seconds':>10}{'ideas/s':>10}")
+    print(
+        f"{'bulk import':<14}{imported:>9}{bulk_seconds:>10.2f}"
+        f"{imported / bulk_seconds:>10.0f}"
+    )
+    print(
+        f"{'one by one':<14}{created:>9}{slow_seconds:>10.2f}"
+        f"{created / slow_seconds:>10.0f}"
+        f"   (~{slow_seconds / created * imported:.0f}s for {imported})"
+    )
+    print(f"ideas in database: {await count_ideas(session_maker)}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ideas", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--baseline", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ideas.ndjson"
+        write_ndjson(path, args.ideas, args.tags)
+        print(f"{path.stat().st_size / 2**20:.1f} MiB NDJSON")
+        asyncio.run(bench(Path(tmp) / "bench.db", path, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Превью ссылок: полная загрузка страницы и BeautifulSoup (как было) против
+потокового разбора только <head> (HeadMetadataParser).
+
+По умолчанию используется синтетический корпус, похожий на реальные страницы:
+большой <head> со скриптами и стилями и тело на несколько мегабайт. Каталог
+с сохраненными страницами (*.html) можно передать через --corpus.
+
+Тело подается парсеру кусками по --chunk-kib, как его отдает aiter_bytes().
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_html_head --pages 50
+    python -m benchmarks.bench_html_head --corpus ~/saved-pages
+"""
+
+import argparse
+import os
+import random
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from src.modules.idea_box.services.html_head import HeadMetadataParser
+
+
+def parse_metadata(html: str) -> dict:
+    """Прежний разбор: дерево всего документа через BeautifulSoup."""
+    soup = BeautifulSoup(html, "lxml")
+
+    def _get_meta_property(prop):
+        tag = soup.find("meta", property=prop)
+        return tag["content"] if tag else None
+
+    return {
+        "title": _get_meta_property("og:title")
+        or (soup.title.string if soup.title else None),
+        "description": _get_meta_property("og:description"),
+        "image_url": _get_meta_property("og:image"),
+    }
+
+
+def synthetic_page(rng: random.Random, body_kib: int) -> bytes:
+    head = [
+        "<!DOCTYPE html><html lang='ru'><head><meta charset='utf-8'>",
+        "<title>Страница для превью</title>",
+        '<meta property="og:title" content="Заголовок статьи">',
+        '<meta property="og:description" content="Описание статьи">',
+        '<meta property="og:image" content="https://example.com/cover.png">',
+    ]
+    # Инлайновые скрипты и стили, как у типичной страницы на фреймворке
+    for i in range(rng.randint(5, 15)):
+        head.append(
+            f"<script>window.__s{i}={{{'a:1,' * rng.randint(200, 800)}}}</script>"
+        )
+        head.append(f"<style>.c{i}{{{'color:red;' * rng.randint(50, 200)}}}</style>")
+    head.append("</head><body>")
+    paragraph = "<div class='p'><p>Lorem ipsum <a href='/x'>dolor</a> sit.</p></div>"
+    body = paragraph * (body_kib * 1024 // len(paragraph))
+    return ("".join(head) + body + "</body></html>").encode()
+
+
+def load_corpus(args) -> list[bytes]:
+    if args.corpus:
+        return [p.read_bytes() for p in sorted(Path(args.corpus).glob("*.html"))]
+    rng = random.Random(42)
+    return [
+        synthetic_page(rng, rng.randint(args.body_kib // 2, args.body_kib))
+        for _ in range(args.pages)
+    ]
+
+
+def run_full(pages: list[bytes]) -> int:
+    for page in pages:
+        parse_metadata(page.decode("utf-8", errors="replace"))
+    return sum(len(page) for page in pages)
+
+
+def run_head(pages: list[bytes], chunk: int) -> int:
+    received = 0
+    for page in pages:
+        parser = HeadMetadataParser("utf-8")
+        for start in range(0, len(page), chunk):
+            received += len(page[start : start + chunk])
+            if parser.feed(page[start : start + chunk]):
+                break
+        parser.result()
+    return received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", type=os.path.expanduser)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--body-kib", type=int, default=3072)
+    parser.add_argument("--chunk-kib", type=int, default=16)
+    args = parser.parse_args()
+
+    pages = load_corpus(args)
+    total = sum(len(page) for page in pages)
+    print(f"{len(pages)} pages, {total / 2**20:.1f} MiB")
+
+    runs = {
+        "full + soup": lambda: run_full(pages),
+        "streamed head": lambda: run_head(pages, args.chunk_kib * 1024),
+    }
+    print(f"{'':<15}{'ms/page':>9}{'KiB read/page':>15}")
+    for name, run in runs.items():
+        started = time.perf_counter()
+        received = run()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<15}{elapsed * 1000 / len(pages):>9.2f}"
+            f"{received / 1024 / len(pages):>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
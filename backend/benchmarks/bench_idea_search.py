@@ -0,0 +1,156 @@
+"""
+Поиск по идеям: прежний ILIKE '%q%' против полнотекстового индекса FTS5.
+
+Заполняет временную базу N идеями одного пользователя (худший случай для
+ILIKE: фильтр по owner_id ничего не отсекает) и замеряет медианное время
+первой страницы поиска для нескольких запросов.
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_idea_search --ideas 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("DB_PATH", "sqlite:///./bench.db")
+os.environ.setdefault("DEBUG", "False")
+os.environ.setdefault("ENCRYPTION_KEY", "Zq3wZ0vQm0p2aG6cE9bH3mU8yVb1tLxN5sR7kJ4dF2c=")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("TIMEZONE", "UTC")
+
+from sqlalchemy import or_  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine, desc, select  # noqa: E402
+
+from src.core.database import apply_sqlite_profile, sqlite_pragmas  # noqa: E402
+from src.models import Idea, IdeaFolder, IdeaType, User  # noqa: E402
+from src.modules.idea_box.services.search import search_ideas  # noqa: E402
+
+WORDS = (
+    "книга статья заметка проект встреча отпуск ремонт рецепт фильм курс "
+    "идея план список покупки подарок спорт здоровье работа отчет бюджет "
+    "database index query cache python release roadmap design review "
+    "travel budget garden music podcast lecture workshop deadline"
+).split()
+QUERIES = ["книгами", "roadmap", "отчет бюджет", "podc", "nonexistentword"]
+# Слова выше попадают примерно в каждую двадцатую идею, остальной текст -
+# из большого словаря, как в живых заметках
+TOPIC_RATE = 0.05
+FILLER_SIZE = 50000
+PAGE_SIZE = 100
+
+
+def _populate(engine, ideas: int) -> uuid.UUID:
+    rnd = random.Random(42)
+    letters = "abcdefghijklmnopqrstuvwxyzабвгдежзиклмнопрстуфхцчшэюя"
+    filler = [
+        "".join(rnd.choices(letters, k=rnd.randint(4, 10))) for _ in range(FILLER_SIZE)
+    ]
+
+    def text(words: int) -> str:
+        chosen = rnd.choices(filler, k=words)
+        if rnd.random() < TOPIC_RATE:
+            chosen[rnd.randrange(words)] = rnd.choice(WORDS)
+        return " ".join(chosen)
+
+    now = datetime.now()
+    with Session(engine) as session:
+        user = User(username="bench", email="bench@example.com")
+        session.add(user)
+        session.commit()
+        folder = IdeaFolder(name="bench", owner_id=user.id)
+        session.add(folder)
+        session.commit()
+        owner_id, folder_id = user.id, folder.id
+
+    rows = []
+    with engine.begin() as connection:
+        for i in range(ideas):
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "title": text(3),
+                    "content": text(40),
+                    "is_pinned": False,
+                    "created_at": now,
+                    "updated_at": now,
+                    "owner_id": owner_id,
+                    "folder_id": folder_id,
+                    "idea_type": IdeaType.TEXT,
+                }
+            )
+            if len(rows) == 10000 or i == ideas - 1:
+                connection.execute(Idea.__table__.insert(), rows)
+                rows = []
+    return owner_id
+
+
+def _ilike(owner_id, q: str):
+    pattern = f"%{q}%"
+    return (
+        select(Idea)
+        .where(Idea.owner_id == owner_id)
+        .where(or_(Idea.title.ilike(pattern), Idea.content.ilike(pattern)))
+        .order_by(desc(Idea.is_pinned), desc(Idea.updated_at), desc(Idea.id))
+        .limit(PAGE_SIZE + 1)
+    )
+
+
+def _fts(owner_id, q: str):
+    statement, rank = search_ideas(q, "sqlite")
+    return (
+        statement.where(Idea.owner_id == owner_id)
+        .order_by(rank, Idea.id)
+        .limit(PAGE_SIZE + 1)
+    )
+
+
+def _measure(engine, build, owner_id, q: str, repeats: int) -> tuple[float, int]:
+    timings = []
+    found = 0
+    with Session(engine) as session:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            found = len(session.exec(build(owner_id, q)).all())
+            timings.append(time.perf_counter() - started)
+            session.expunge_all()
+    return statistics.median(timings) * 1000, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ideas", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = create_engine(url)
+        apply_sqlite_profile(engine, sqlite_pragmas())
+        SQLModel.metadata.create_all(engine)
+
+        started = time.perf_counter()
+        owner_id = _populate(engine, args.ideas)
+        print(
+            f"{args.ideas} ideas indexed in {time.perf_counter() - started:.1f}s "
+            f"(triggers included)"
+        )
+
+        print(f"{'query':<18}{'ILIKE ms':>10}{'FTS5 ms':>10}{'rows':>8}")
+        for q in QUERIES:
+            ilike_ms, _ = _measure(engine, _ilike, owner_id, q, args.repeats)
+            fts_ms, found = _measure(engine, _fts, owner_id, q, args.repeats)
+            print(f"{q:<18}{ilike_ms:>10.1f}{fts_ms:>10.1f}{found:>8}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
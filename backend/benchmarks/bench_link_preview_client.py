@@ -0,0 +1,149 @@
+"""
+Превью ссылок: новый httpx.Client на каждую ссылку в пуле потоков (как было)
+против общего httpx.AsyncClient с лимитом на хост.
+
+Локальный stub-сервер отдает небольшую HTML-страницу с задержкой --latency-ms
+и считает открытые соединения и пиковое число одновременных запросов.
+Все --links ссылок указывают на один хост, как при массовом импорте.
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_link_preview_client --links 1000
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("DB_PATH", "sqlite:///./bench.db")
+os.environ.setdefault("DEBUG", "False")
+os.environ.setdefault("ENCRYPTION_KEY", "Zq3wZ0vQm0p2aG6cE9bH3mU8yVb1tLxN5sR7kJ4dF2c=")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("TIMEZONE", "UTC")
+
+import httpx  # noqa: E402
+
+from src.core import http_client  # noqa: E402
+from src.core.http_client import USER_AGENT, HostLimiter  # noqa: E402
+from src.modules.idea_box.services.link_preview import (  # noqa: E402
+    fetch_link_metadata,
+)
+
+from .bench_html_head import parse_metadata  # noqa: E402
+
+PAGE = (
+    "<html><head><title>Stub</title>"
+    '<meta property="og:title" content="Stub page">'
+    '<meta property="og:description" content="Benchmark">'
+    "</head><body>" + "<p>lorem ipsum</p>" * 200 + "</body></html>"
+).encode()
+
+# Так работал пул потоков Starlette для синхронных фоновых задач
+OLD_THREADS = 40
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.active = 0
+        self.peak = 0
+
+    def reset(self):
+        with self.lock:
+            self.connections = self.active = self.peak = 0
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_handler(stats: StubStats, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            with stats.lock:
+                stats.connections += 1
+
+        def do_GET(self):
+            with stats.lock:
+                stats.active += 1
+                stats.peak = max(stats.peak, stats.active)
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+            with stats.lock:
+                stats.active -= 1
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _old_fetch(url: str) -> dict:
+    with httpx.Client(
+        headers={"User-Agent": USER_AGENT}, follow_redirects=True, timeout=10.0
+    ) as client:
+        response = client.get(url)
+        response.raise_for_status()
+    return parse_metadata(response.text)
+
+
+def run_old(urls: list[str]) -> None:
+    with ThreadPoolExecutor(OLD_THREADS) as pool:
+        list(pool.map(_old_fetch, urls))
+
+
+async def run_new(urls: list[str], per_host: int) -> None:
+    http_client.start_http_client()
+    http_client._limiter = HostLimiter(total=100, per_host=per_host)
+    try:
+        await asyncio.gather(*(fetch_link_metadata(url) for url in urls))
+    finally:
+        await http_client.close_http_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--links", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    stats = StubStats()
+    server = StubServer(("127.0.0.1", 0), make_handler(stats, args.latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/page/{i}" for i in range(args.links)]
+
+    runs = {
+        "client per link": lambda: run_old(urls),
+        "shared, 4/host": lambda: asyncio.run(run_new(urls, 4)),
+        "shared, 40/host": lambda: asyncio.run(run_new(urls, 40)),
+    }
+    print(f"{'':<18}{'seconds':>9}{'links/s':>9}{'conns':>7}{'peak':>6}")
+    for name, run in runs.items():
+        stats.reset()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<18}{elapsed:>9.2f}{args.links / elapsed:>9.1f}"
+            f"{stats.connections:>7}{stats.peak:>6}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Списки задач, идей и событий календаря: прежний путь (объекты ORM,
+проверка по response_model, json) против быстрого (колонки Core в строки
+dataclass, orjson; см. src/core/responses.py).
+
+Заполняет временную базу и для каждого списка замеряет медианное время на
+1000 строк отдельно для выборки (запрос и сборка объектов) и для
+сериализации (проверка и кодирование в JSON). Ответы обоих путей сверяются.
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_list_serialization --rows 1000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("DB_PATH", "sqlite:///./bench.db")
+os.environ.setdefault("DEBUG", "False")
+os.environ.setdefault("ENCRYPTION_KEY", "Zq3wZ0vQm0p2aG6cE9bH3mU8yVb1tLxN5sR7kJ4dF2c=")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("TIMEZONE", "UTC")
+
+import orjson  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine, select  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from src.models import (  # noqa: E402
+    CalendarEvent,
+    Idea,
+    IdeaFolder,
+    IdeaTagLink,
+    IdeaType,
+    LinkMetadata,
+    Tag,
+    Task,
+    User,
+)
+from src.modules.calendar.router import EVENT_ROW_COLUMNS  # noqa: E402
+from src.modules.calendar.schemas import (  # noqa: E402
+    CalendarEventPublic,
+    CalendarEventRow,
+)
+from src.modules.idea_box.ideas.router import (  # noqa: E402
+    IDEA_RELATIONS,
+    IDEA_ROW_COLUMNS,
+    LINK_ROW_COLUMNS,
+    _idea_rows,
+)
+from src.modules.idea_box.ideas.schemas import IdeaPublic  # noqa: E402
+from src.modules.tasks.router import TASK_ROW_COLUMNS  # noqa: E402
+from src.modules.tasks.schemas import TaskPublic, TaskRow  # noqa: E402
+
+TAGS = 20
+TAGS_PER_IDEA = 2
+
+
+def _populate(engine, rows: int) -> uuid.UUID:
+    with Session(engine) as session:
+        user = User(username="bench", email="bench@example.com")
+        session.add(user)
+        session.commit()
+        folder = IdeaFolder(name="bench", owner_id=user.id)
+        session.add(folder)
+        session.commit()
+        owner_id, folder_id = user.id, folder.id
+
+    start = datetime(2030, 1, 1, 8)
+    tags = [
+        {"id": uuid.uuid4(), "name": f"tag{i}", "owner_id": owner_id}
+        for i in range(TAGS)
+    ]
+    links = [
+        {
+            "id": uuid.uuid4(),
+            "url": f"https://example.com/{i}",
+            "title": f"Статья {i}",
+            "description": "Описание страницы " * 5,
+            "image_url": f"https://example.com/{i}.png",
+            "content_type": "text/html",
+        }
+        for i in range(rows // 2)
+    ]
+    ideas, idea_tags = [], []
+    for i in range(rows):
+        link = links[i // 2] if i % 2 == 0 else None
+        idea_id = uuid.uuid4()
+        ideas.append(
+            {
+                "id": idea_id,
+                "idea_type": IdeaType.LINK if link else IdeaType.TEXT,
+                "title": f"Идея {i}",
+                "content": "Текст заметки " * 20,
+                "url": link and link["url"],
+                "is_pinned": i % 50 == 0,
+                "created_at": start + timedelta(minutes=i),
+                "updated_at": start + timedelta(minutes=i),
+                "owner_id": owner_id,
+                "folder_id": folder_id,
+                "link_metadata_id": link and link["id"],
+            }
+        )
+        idea_tags += [
+            {"idea_id": idea_id, "tag_id": tags[(i + k) % TAGS]["id"]}
+            for k in range(TAGS_PER_IDEA)
+        ]
+    tasks = [
+        {
+            "id": uuid.uuid4(),
+            "title": f"Задача {i}",
+            "description": "Описание задачи",
+            "due_date": start + timedelta(hours=i),
+            "owner_id": owner_id,
+        }
+        for i in range(rows)
+    ]
+    events = [
+        {
+            "id": uuid.uuid4(),
+            "title": f"Встреча {i}",
+            "description": "Повестка",
+            "start_time": start + timedelta(hours=i),
+            "end_time": start + timedelta(hours=i, minutes=30),
+            "owner_id": owner_id,
+        }
+        for i in range(rows)
+    ]
+    with engine.begin() as connection:
+        connection.execute(insert(Tag), tags)
+        connection.execute(insert(LinkMetadata), links)
+        connection.execute(insert(Idea), ideas)
+        connection.execute(insert(IdeaTagLink), idea_tags)
+        connection.execute(insert(Task), tasks)
+        connection.execute(insert(CalendarEvent), events)
+    return owner_id
+
+
+def _stdlib_json(content) -> bytes:
+    # Как JSONResponse
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _validated(adapter: TypeAdapter, objects) -> bytes:
+    # Как FastAPI для response_model: проверка, сериализация, json
+    value = adapter.validate_python(objects, from_attributes=True)
+    return _stdlib_json(adapter.dump_python(value, mode="json"))
+
+
+def _normalized(body: bytes):
+    # Порядок тегов идеи не задан ни одним из путей
+    items = json.loads(body)
+    for item in items:
+        if "tags" in item:
+            item["tags"].sort(key=lambda tag: tag["id"])
+    return items
+
+
+async def _measure(repeat: int, fetch, serialize) -> tuple:
+    fetch_times, serialize_times, body = [], [], b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await fetch()
+        fetched = time.perf_counter()
+        body = serialize(rows)
+        done = time.perf_counter()
+        fetch_times.append(fetched - started)
+        serialize_times.append(done - fetched)
+    return statistics.median(fetch_times), statistics.median(serialize_times), body
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / "bench.db"
+        sync_engine = create_engine(f"sqlite:///{db_file}")
+        SQLModel.metadata.create_all(sync_engine)
+        owner_id = _populate(sync_engine, args.rows)
+        sync_engine.dispose()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+
+            async def all_rows(statement):
+                return (await db.exec(statement)).all()
+
+            async def orm(statement):
+                # Как в запросе: новые объекты, а не закэшированные сессией
+                rows = await all_rows(statement)
+                db.expunge_all()
+                return rows
+
+            async def idea_rows():
+                statement = (
+                    select(*IDEA_ROW_COLUMNS, *LINK_ROW_COLUMNS)
+                    .outerjoin_from(
+                        Idea, LinkMetadata, LinkMetadata.id == Idea.link_metadata_id
+                    )
+                    .where(Idea.owner_id == owner_id)
+                    .order_by(Idea.updated_at.desc(), Idea.id.desc())
+                )
+                return await _idea_rows(db, await all_rows(statement))
+
+            async def task_rows():
+                statement = select(*TASK_ROW_COLUMNS).where(Task.owner_id == owner_id)
+                return [TaskRow(*row) for row in await all_rows(statement)]
+
+            async def event_rows():
+                statement = select(*EVENT_ROW_COLUMNS).where(
+                    CalendarEvent.owner_id == owner_id
+                )
+                return [CalendarEventRow(*row) for row in await all_rows(statement)]
+
+            cases = [
+                (
+                    "tasks",
+                    lambda: orm(select(Task).where(Task.owner_id == owner_id)),
+                    TypeAdapter(List[TaskPublic]),
+                    task_rows,
+                ),
+                (
+                    "ideas",
+                    lambda: orm(
+                        select(Idea)
+                        .where(Idea.owner_id == owner_id)
+                        .options(*IDEA_RELATIONS)
+                        .order_by(Idea.updated_at.desc(), Idea.id.desc())
+                    ),
+                    TypeAdapter(List[IdeaPublic]),
+                    idea_rows,
+                ),
+                (
+                    "calendar events",
+                    lambda: orm(
+                        select(CalendarEvent).where(CalendarEvent.owner_id == owner_id)
+                    ),
+                    TypeAdapter(List[CalendarEventPublic]),
+                    event_rows,
+                ),
+            ]
+            per_1000 = 1000 / args.rows * 1000
+            print(f"rows: {args.rows}, ms per 1000 rows (median of {args.repeat})")
+            print(f"{'list':<16}{'path':<8}{'fetch':>10}{'serialize':>12}{'total':>10}")
+            for name, fetch_orm, adapter, fetch_rows in cases:
+                before = await _measure(
+                    args.repeat,
+                    fetch_orm,
+                    lambda objects, adapter=adapter: _validated(adapter, objects),
+                )
+                after = await _measure(args.repeat, fetch_rows, orjson.dumps)
+                assert _normalized(before[2]) == _normalized(after[2]), name
+                for path, (fetch, serialize, _) in (
+                    ("before", before),
+                    ("after", after),
+                ):
+                    print(
+                        f"{name:<16}{path:<8}{fetch * per_1000:>10.2f}"
+                        f"{serialize * per_1000:>12.2f}"
+                        f"{(fetch + serialize) * per_1000:>10.2f}"
+                    )
+                print(
+                    f"{'':<16}{'speedup':<8}{before[0] / after[0]:>9.1f}x"
+                    f"{before[1] / after[1]:>11.1f}x"
+                    f"{(before[0] + before[1]) / (after[0] + after[1]):>9.1f}x"
+                )
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
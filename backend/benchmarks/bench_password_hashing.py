@@ -0,0 +1,121 @@
+"""
+Входы под нагрузкой: пропускная способность POST /auth/token и задержки
+остального API, пока идут проверки паролей Argon2.
+
+Сервер запускается дважды: с хэшированием прямо в event loop
+(PASSWORD_HASH_WORKERS=0, как было раньше) и в отдельном пуле потоков.
+Одновременно работают --logins клиентов входа и --clients клиентов,
+читающих список задач.
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_password_hashing --logins 8 --clients 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.bench_async_db import (
+    BACKEND_DIR,
+    _bench_env,
+    _create_schema,
+    _free_port,
+    _login,
+    _wait_ready,
+)
+
+LOGIN = {"username": "bench@example.com", "password": "bench"}
+
+
+async def _login_worker(client, deadline, counts):
+    while time.perf_counter() < deadline:
+        response = await client.post("/auth/token", data=LOGIN)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+
+async def _api_worker(client, headers, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get("/tasks/", headers=headers)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_server(workers: int, args) -> dict:
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _bench_env(Path(tmp) / "bench.db")
+        env["PASSWORD_HASH_WORKERS"] = str(workers)
+        _create_schema(env)
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "src.main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", timeout=120
+            ) as client:
+                await _wait_ready(client)
+                headers = await _login(client)
+                counts: dict = {}
+                latencies: list[float] = []
+                deadline = time.perf_counter() + args.duration
+                await asyncio.gather(
+                    *(
+                        _login_worker(client, deadline, counts)
+                        for _ in range(args.logins)
+                    ),
+                    *(
+                        _api_worker(client, headers, deadline, latencies)
+                        for _ in range(args.clients)
+                    ),
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    return {
+        "logins/sec": counts.get(200, 0) / args.duration,
+        "login 503": counts.get(503, 0),
+        "api req/sec": len(latencies) / args.duration,
+        "api p50 ms": statistics.median(latencies) * 1000,
+        "api p99 ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(args):
+    results = {
+        "inline": await run_server(0, args),
+        f"executor({args.workers})": await run_server(args.workers, args),
+    }
+    print(f"{'':<14}" + "".join(f"{name:>14}" for name in results))
+    for metric in next(iter(results.values())):
+        row = "".join(f"{result[metric]:>14.1f}" for result in results.values())
+        print(f"{metric:<14}{row}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=15.0)
+    asyncio.run(main(parser.parse_args()))
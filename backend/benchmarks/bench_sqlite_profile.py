@@ -0,0 +1,123 @@
+"""
+Смешанный бенчмарк чтения/записи SQLite: профиль по умолчанию против
+производственного профиля (WAL, synchronous=NORMAL, busy_timeout, кэш,
+mmap и пул соединений из настроек).
+
+Каждый поток в цикле читает последние задачи пользователя, а с заданной
+вероятностью создает новую задачу. Считаются операции и ошибки
+"database is locked".
+
+Запуск из каталога backend/:
+    python -m benchmarks.bench_sqlite_profile --threads 32 --duration 10
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("DB_PATH", "sqlite:///./bench.db")
+os.environ.setdefault("DEBUG", "False")
+os.environ.setdefault("ENCRYPTION_KEY", "Zq3wZ0vQm0p2aG6cE9bH3mU8yVb1tLxN5sR7kJ4dF2c=")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("TIMEZONE", "UTC")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine, desc, select  # noqa: E402
+
+from src.core.database import (  # noqa: E402
+    apply_sqlite_profile,
+    pool_options,
+    sqlite_pragmas,
+)
+from src.models import Task, User  # noqa: E402
+
+
+def _build_engine(url: str, profile: bool):
+    if not profile:
+        # Так движок создавался до появления профиля
+        return create_engine(url, connect_args={"check_same_thread": False})
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False}, **pool_options(url)
+    )
+    apply_sqlite_profile(engine, sqlite_pragmas())
+    return engine
+
+
+def _worker(engine, owner_id, deadline, write_ratio, stats, lock):
+    ops = locked = 0
+    rnd = random.Random()
+    while time.perf_counter() < deadline:
+        try:
+            with Session(engine) as session:
+                if rnd.random() < write_ratio:
+                    session.add(Task(title="bench", owner_id=owner_id))
+                    session.commit()
+                else:
+                    session.exec(
+                        select(Task)
+                        .where(Task.owner_id == owner_id)
+                        .order_by(desc(Task.title))
+                        .limit(50)
+                    ).all()
+            ops += 1
+        except OperationalError as e:
+            if "database is locked" not in str(e):
+                raise
+            locked += 1
+    with lock:
+        stats["ops"] += ops
+        stats["locked"] += locked
+
+
+def run(profile: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = _build_engine(url, profile)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            user = User(username="bench", email="bench@example.com")
+            session.add(user)
+            session.commit()
+            owner_id = user.id
+            session.add_all(
+                [Task(title=f"seed {i}", owner_id=owner_id) for i in range(1000)]
+            )
+            session.commit()
+
+        stats = {"ops": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(
+                target=_worker,
+                args=(engine, owner_id, deadline, args.write_ratio, stats, lock),
+            )
+            for _ in range(args.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for name, profile in (("default", False), ("production", True)):
+        stats = run(profile, args)
+        print(
+            f"{name:>10}: {stats['ops'] / args.duration:8.1f} ops/sec, "
+            f"{stats['locked']} 'database is locked' errors"
+        )
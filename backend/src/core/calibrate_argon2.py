@@ -0,0 +1,79 @@
+"""
+Подбор параметров Argon2id под целевое время хэширования на этом железе.
+
+Память фиксируется (по умолчанию - ARGON2_MEMORY_COST_KIB из настроек), а
+число проходов растет, пока хэш укладывается в целевое время. Если даже один
+проход медленнее цели, память уменьшается вдвое, но не ниже минимума OWASP
+(19 МиБ). Результат печатается строками для .env.
+
+Запуск из каталога backend/ на том же железе, где работает API:
+    python -m src.core.calibrate_argon2 --target-ms 250
+"""
+
+import argparse
+import statistics
+import time
+
+from src.core.config import settings
+from src.core.crypto import build_password_hash
+
+# Минимум OWASP для Argon2id: 19 МиБ памяти и 2 прохода
+MIN_MEMORY_COST_KIB = 19 * 1024
+MAX_TIME_COST = 20
+
+
+def measure_ms(
+    time_cost: int, memory_cost_kib: int, parallelism: int, samples: int
+) -> float:
+    hasher = build_password_hash(time_cost, memory_cost_kib, parallelism)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def calibrate(
+    target_ms: float, memory_cost_kib: int, parallelism: int, samples: int
+) -> tuple[int, int, float]:
+    """Самые дорогие (time_cost, memory_cost_kib), укладывающиеся в target_ms."""
+    while True:
+        elapsed = measure_ms(1, memory_cost_kib, parallelism, samples)
+        if elapsed <= target_ms or memory_cost_kib // 2 < MIN_MEMORY_COST_KIB:
+            break
+        memory_cost_kib //= 2
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        next_elapsed = measure_ms(time_cost + 1, memory_cost_kib, parallelism, samples)
+        if next_elapsed > target_ms:
+            break
+        time_cost += 1
+        elapsed = next_elapsed
+    return time_cost, memory_cost_kib, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument(
+        "--memory-kib", type=int, default=settings.ARGON2_MEMORY_COST_KIB
+    )
+    parser.add_argument("--parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    time_cost, memory_cost_kib, elapsed = calibrate(
+        args.target_ms, args.memory_kib, args.parallelism, args.samples
+    )
+    if time_cost < 2 and elapsed > args.target_ms:
+        print(f"# Warning: even the minimum cost takes {elapsed:.0f} ms")
+    print(f"# Median hash time: {elapsed:.0f} ms (target {args.target_ms:.0f} ms)")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST_KIB={memory_cost_kib}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,6 +11,120 @@ class Settings(BaseSettings):
     TIMEZONE: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # Refresh-токены ротируются при каждом обмене; срок - с момента выдачи
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # Пул соединений. По умолчанию равен числу потоков AnyIO (40), в которых
+    # Starlette выполняет синхронные обработчики и фоновые задачи.
+    DB_POOL_SIZE: int = 40
+    DB_MAX_OVERFLOW: int = 0
+    DB_POOL_TIMEOUT: float = 30.0
+
+    # Необязательная реплика только для чтения (например, второе соединение
+    # SQLite в mode=ro или hot standby Postgres) и окно read-your-writes:
+    # столько секунд после записи чтения пользователя идут в основную БД.
+    DB_READ_REPLICA_PATH: str | None = None
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Что делать с ленивой подгрузкой связей в обработчиках запросов:
+    # "raise" - ошибка, "warn" - предупреждение в лог, "allow" - ничего
+    DB_LAZY_LOAD_POLICY: Literal["raise", "warn", "allow"] = "raise"
+
+    # Стоимость Argon2id (по умолчанию - значения argon2-cffi/RFC 9106 low
+    # memory). Хэши с другими параметрами пересчитываются при входе.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST_KIB: int = 64 * 1024
+    ARGON2_PARALLELISM: int = 4
+    # Хэширование паролей идет в отдельном пуле потоков, чтобы не блокировать
+    # event loop: не больше PASSWORD_HASH_WORKERS хэшей одновременно, а сверх
+    # PASSWORD_HASH_MAX_PENDING ожидающих запросы получают 503.
+    # 0 воркеров - хэшировать прямо в event loop (только для сравнения).
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Общий исходящий HTTP-клиент (превью ссылок и т.п.): пул соединений,
+    # не больше HTTP_CLIENT_PER_HOST_LIMIT одновременных запросов к одному
+    # хосту, HTTP/2 - только если установлен пакет h2
+    HTTP_CLIENT_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_PER_HOST_LIMIT: int = 4
+    HTTP_CLIENT_HTTP2: bool = False
+    # Превью ссылки читает тело только до </head>, но не больше этого
+    LINK_PREVIEW_MAX_BYTES: int = 512 * 1024
+    # Свежесть превью: Cache-Control/Expires страницы, ограниченные снизу и
+    # сверху, или LINK_PREVIEW_TTL_SECONDS, если сервер ничего не сообщил.
+    # Неудачные загрузки повторяются не раньше чем через NEGATIVE_TTL,
+    # удваивая паузу после каждой новой неудачи (до MAX_TTL).
+    LINK_PREVIEW_TTL_SECONDS: int = 24 * 3600
+    LINK_PREVIEW_MIN_TTL_SECONDS: int = 3600
+    LINK_PREVIEW_MAX_TTL_SECONDS: int = 30 * 24 * 3600
+    LINK_PREVIEW_NEGATIVE_TTL_SECONDS: int = 3600
+    # Фоновая перепроверка устаревших превью пачками; 0 - отключить
+    LINK_PREVIEW_SWEEP_INTERVAL_SECONDS: float = 300.0
+    LINK_PREVIEW_SWEEP_BATCH_SIZE: int = 50
+    # Очередь заданий на превью: столько воркеров работает в процессе API
+    # (0 - только отдельный процесс python -m ...services.link_worker),
+    # повторы с паузой RETRY * 2^(попытка-1), аренда задания воркером
+    LINK_PREVIEW_WORKERS: int = 4
+    LINK_PREVIEW_JOB_MAX_ATTEMPTS: int = 5
+    LINK_PREVIEW_JOB_RETRY_SECONDS: float = 30.0
+    LINK_PREVIEW_JOB_LEASE_SECONDS: float = 120.0
+    LINK_PREVIEW_WORKER_POLL_SECONDS: float = 2.0
+
+    # Массовый импорт: записей в одной транзакции и сколько ошибок в записях
+    # вернуть подробно (остальные только считаются)
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 100
+
+    # Повторяющиеся события: ограничение числа повторов одной серии в окне
+    # календаря и в правиле с COUNT, размер кэша развернутых повторов
+    # (0 - без кэша). Первый повтор серии должен быть не дальше
+    # RULE_HORIZON_YEARS от ее начала, серии разворачиваются в окне не
+    # длиннее этого, а серия с COUNT должна кончаться за MAX_SERIES_YEARS
+    CALENDAR_MAX_OCCURRENCES: int = 1000
+    CALENDAR_MAX_RULE_COUNT: int = 10_000
+    CALENDAR_RULE_HORIZON_YEARS: int = 10
+    CALENDAR_MAX_SERIES_YEARS: int = 100
+    CALENDAR_OCCURRENCE_CACHE_SIZE: int = 4096
+
+    # Подписки на внешние ICS-календари: раз в POLL_SECONDS берется до
+    # SOURCES_PER_POLL календарей, которые пора перепроверить (0 - не
+    # проверять в процессе API). Успешно загруженный календарь проверяется
+    # снова через REFRESH_SECONDS, неудачный - с удваивающейся паузой.
+    # Изменения применяются транзакциями по BATCH_SIZE событий; календарь
+    # больше MAX_BYTES не загружается. Календари во внутренней сети (частные,
+    # loopback и link-local адреса) не загружаются, кроме хостов из
+    # ALLOWED_HOSTS (JSON-список, например ["calendar.intranet"]).
+    CALENDAR_SUBSCRIPTION_POLL_SECONDS: float = 60.0
+    CALENDAR_SUBSCRIPTION_SOURCES_PER_POLL: int = 20
+    CALENDAR_SUBSCRIPTION_REFRESH_SECONDS: int = 3600
+    CALENDAR_SUBSCRIPTION_MAX_BACKOFF_SECONDS: int = 24 * 3600
+    CALENDAR_SUBSCRIPTION_LEASE_SECONDS: int = 600
+    CALENDAR_SUBSCRIPTION_BATCH_SIZE: int = 500
+    CALENDAR_SUBSCRIPTION_MAX_BYTES: int = 20 * 1024 * 1024
+    CALENDAR_SUBSCRIPTION_ALLOWED_HOSTS: list[str] = []
+
+    # Логирование: уровень корневого логгера, JSON или обычный текст и доля
+    # DEBUG-записей, которые доходят до вывода (остальные отбрасываются)
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
+    LOG_JSON: bool = True
+    LOG_DEBUG_SAMPLE_RATE: float = 0.01
+
+    # Кэш пользователей, найденных по токену: время жизни записи и размер.
+    # 0 в USER_CACHE_MAX_SIZE отключает кэш.
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_SIZE: int = 10_000
+
+    # Производственный профиль SQLite, применяется к каждому соединению
+    SQLITE_PRODUCTION_PROFILE: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KIB: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_FOREIGN_KEYS: bool = True
 
     model_config = SettingsConfigDict(env_file=".env")
 
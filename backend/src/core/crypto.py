@@ -1,6 +1,8 @@
 from cryptography.fernet import Fernet, InvalidToken
 from .config import settings
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
 
 class CryptoService:
     def __init__(self, key: str):
@@ -20,4 +22,29 @@ class CryptoService:
 
 
 crypto_service = CryptoService(settings.ENCRYPTION_KEY)
-password_hash = PasswordHash.recommended()
+
+
+def build_password_hash(
+    time_cost: int, memory_cost_kib: int, parallelism: int
+) -> PasswordHash:
+    """
+    Argon2id с заданной стоимостью. Хэши со старыми параметрами по-прежнему
+    проверяются, а check_needs_rehash/verify_and_update сообщают о них.
+    """
+    return PasswordHash(
+        (
+            Argon2Hasher(
+                time_cost=time_cost,
+                memory_cost=memory_cost_kib,
+                parallelism=parallelism,
+            ),
+        )
+    )
+
+
+# Параметры подбираются под железо командой python -m src.core.calibrate_argon2
+password_hash = build_password_hash(
+    settings.ARGON2_TIME_COST,
+    settings.ARGON2_MEMORY_COST_KIB,
+    settings.ARGON2_PARALLELISM,
+)
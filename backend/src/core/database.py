@@ -1,12 +1,209 @@
-from sqlmodel import create_engine, Session
+import logging
+import threading
+import time
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Асинхронные драйверы для синхронных URL из настроек (DB_PATH остается
+# общим для приложения и Alembic)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Переводит синхронный URL базы данных на асинхронный драйвер."""
+    db_url = make_url(url)
+    driver = ASYNC_DRIVERS.get(db_url.drivername, db_url.drivername)
+    return db_url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def sqlite_pragmas() -> dict[str, str | int]:
+    """Собирает производственный профиль PRAGMA из настроек."""
+    if not settings.SQLITE_PRODUCTION_PROFILE:
+        return {}
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        # Отрицательное значение задает размер кэша в КиБ, а не в страницах
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KIB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+        "foreign_keys": "ON" if settings.SQLITE_FOREIGN_KEYS else "OFF",
+    }
+
+
+def apply_sqlite_profile(sync_engine: Engine, pragmas: dict[str, str | int]) -> None:
+    """Выполняет PRAGMA на каждом новом соединении SQLite движка."""
+    if sync_engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def pool_options(url: str) -> dict:
+    """Параметры пула соединений; SQLite в памяти работает без пула."""
+    db_url = make_url(url)
+    if db_url.get_backend_name() == "sqlite" and db_url.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+# Синхронный движок нужен фоновым задачам в пуле потоков и служебным скриптам
 engine = create_engine(
-    settings.DB_PATH, echo=settings.DEBUG, connect_args={"check_same_thread": False}
+    settings.DB_PATH,
+    echo=settings.DEBUG,
+    connect_args={"check_same_thread": False},
+    **pool_options(settings.DB_PATH),
+)
+apply_sqlite_profile(engine, sqlite_pragmas())
+
+# Асинхронный движок обслуживает все запросы API, не блокируя event loop
+async_engine = create_async_engine(
+    to_async_url(settings.DB_PATH),
+    echo=settings.DEBUG,
+    **pool_options(settings.DB_PATH),
 )
+apply_sqlite_profile(async_engine.sync_engine, sqlite_pragmas())
+
+
+class RecentWrites:
+    """
+    Помнит пользователей, которые только что писали в основную БД.
+
+    Пока окно не истекло, их чтения обслуживает основная БД, чтобы реплика
+    с задержкой репликации не вернула данные без только что сделанной записи.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._deadlines: dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: UUID) -> None:
+        now = time.monotonic()
+        with self._lock:
+            # Заодно вычищаем истекшие записи, чтобы словарь не рос бесконечно
+            expired = [uid for uid, until in self._deadlines.items() if until <= now]
+            for uid in expired:
+                del self._deadlines[uid]
+            self._deadlines[user_id] = now + self.window_seconds
+
+    def is_recent(self, user_id: UUID) -> bool:
+        until = self._deadlines.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._deadlines.clear()
+
+
+recent_writes = RecentWrites(settings.READ_YOUR_WRITES_SECONDS)
+
+
+class LazyLoadError(RuntimeError):
+    """Обработчик запроса обратился к незагруженной связи модели."""
+
+
+class RequestSession(Session):
+    """
+    Синхронная часть AsyncSession, которой обслуживаются запросы API.
+
+    Отмечает пользователей, которые записывали данные (для read-your-writes),
+    и следит за ленивыми подгрузками связей согласно DB_LAZY_LOAD_POLICY.
+    """
+
+
+@event.listens_for(RequestSession, "do_orm_execute")
+def _guard_lazy_loads(orm_execute_state):
+    # Каждая ленивая подгрузка - лишний запрос на каждую строку списка (N+1).
+    # Связи должны загружаться явно: selectinload/joinedload в самом запросе.
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    if settings.DB_LAZY_LOAD_POLICY == "allow":
+        return
+    path = orm_execute_state.loader_strategy_path
+    relationship = path[-1] if path else "a relationship"
+    message = (
+        f"Lazy load of {relationship} in a request session; "
+        "load it explicitly with selectinload/joinedload"
+    )
+    if settings.DB_LAZY_LOAD_POLICY == "raise":
+        raise LazyLoadError(message)
+    logger.warning(message)
+
+
+@event.listens_for(RequestSession, "after_flush")
+def _remember_flush(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(RequestSession, "after_commit")
+def _start_read_your_writes(session):
+    # user_id кладет в сессию get_current_user
+    user_id = session.info.get("user_id")
+    if session.info.pop("has_writes", False) and user_id:
+        recent_writes.mark(user_id)
+
+
+async_session_maker = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RequestSession,
+    expire_on_commit=False,
+)
+
+# Реплика только для чтения. Без нее все чтения идут в основную БД.
+read_async_engine = None
+read_session_maker = None
+if settings.DB_READ_REPLICA_PATH:
+    read_async_engine = create_async_engine(
+        to_async_url(settings.DB_READ_REPLICA_PATH),
+        echo=settings.DEBUG,
+        **pool_options(settings.DB_READ_REPLICA_PATH),
+    )
+    # journal_mode нельзя переключить на соединении mode=ro, а query_only
+    # страхует от случайной записи в реплику
+    read_pragmas = {
+        name: value
+        for name, value in sqlite_pragmas().items()
+        if name != "journal_mode"
+    }
+    read_pragmas["query_only"] = "ON"
+    apply_sqlite_profile(read_async_engine.sync_engine, read_pragmas)
+    read_session_maker = async_sessionmaker(
+        read_async_engine,
+        class_=AsyncSession,
+        sync_session_class=RequestSession,
+        expire_on_commit=False,
+    )
 
 
-def get_db():
-    with Session(engine) as session:
+async def get_db():
+    async with async_session_maker() as session:
         yield session
@@ -0,0 +1,131 @@
+"""
+Условные GET по ETag (RFC 9110, If-None-Match).
+
+Ответ помечается ETag, построенным из версии данных; клиент присылает его в
+If-None-Match, и при совпадении сервер отвечает 304 без тела.
+
+Списки, которые фронтенд постоянно перезапрашивает, помечаются версией набора
+данных пользователя (models/version.py): неизменившийся список отдается как
+304 после чтения одной строки версии, без запросов к самим данным.
+"""
+
+import hashlib
+import threading
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Request, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.version import CollectionVersion
+
+# Ответ зависит от пользователя, и перед использованием его нужно перепроверить
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из частей версии: "a-b-c"."""
+    return '"{}"'.format("-".join(str(part) for part in parts))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match сравнивает теги слабо: префикс W/ не учитывается
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in header.split(",")
+    )
+
+
+def not_modified(etag: str, headers: dict | None = None) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, **(headers or {})},
+    )
+
+
+class ConditionalGetStats:
+    """Запросы списков в этом процессе и доля отданных как 304, по наборам."""
+
+    def __init__(self):
+        # набор -> [запросы, из них с If-None-Match, из них 304]
+        self._counts: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, collection: str, conditional: bool, hit: bool) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(collection, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += conditional
+            counts[2] += hit
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {key: list(value) for key, value in self._counts.items()}
+        total = [sum(column) for column in zip(*counts.values())]
+        counts["total"] = total or [0, 0, 0]
+        return {
+            collection: {
+                "requests": requests,
+                "conditional": conditional,
+                "not_modified": hits,
+                "not_modified_percent": (
+                    round(100 * hits / requests, 1) if requests else 0.0
+                ),
+            }
+            for collection, (requests, conditional, hits) in counts.items()
+        }
+
+
+conditional_get_stats = ConditionalGetStats()
+
+
+async def collection_etag(
+    db: AsyncSession, request: Request, owner_id: UUID, collection: str
+) -> str:
+    """
+    ETag списка: версия набора и хэш пользователя и параметров запроса
+    (фильтры, курсор и размер страницы дают разные ответы одной версии).
+    """
+    version = (
+        await db.exec(
+            select(CollectionVersion.version).where(
+                CollectionVersion.owner_id == owner_id,
+                CollectionVersion.collection == collection,
+            )
+        )
+    ).first()
+    variant = hashlib.blake2b(
+        f"{owner_id}?{request.url.query}".encode(), digest_size=8
+    ).hexdigest()
+    # До первой записи строки версии нет: это версия 0
+    return make_etag(collection, version or 0, variant)
+
+
+async def check_not_modified(
+    db: AsyncSession,
+    request: Request,
+    response: Response,
+    owner_id: UUID,
+    collection: str,
+) -> Optional[Response]:
+    """
+    Ответ 304, если список не менялся с версии из If-None-Match. Иначе None,
+    а ETag выставлен в response, и эндпоинт строит список как обычно.
+    """
+    etag = await collection_etag(db, request, owner_id, collection)
+    hit = etag_matches(request, etag)
+    conditional_get_stats.record(collection, "if-none-match" in request.headers, hit)
+    headers = {"Cache-Control": PRIVATE_REVALIDATE, "Vary": "Authorization"}
+    if hit:
+        return not_modified(etag, headers)
+    response.headers.update({"ETag": etag, **headers})
+    return None
@@ -0,0 +1,111 @@
+"""
+Общий исходящий HTTP-клиент процесса.
+
+Один httpx.AsyncClient на воркер переиспользует соединения (keep-alive, при
+желании HTTP/2) вместо нового TCP+TLS рукопожатия на каждый запрос. Клиент
+создается и закрывается в lifespan приложения.
+
+Поверх пула соединений действуют два ограничения: общее число одновременных
+исходящих запросов и отдельное - на каждый хост, чтобы массовый импорт
+ссылок с одного сайта не заваливал его запросами.
+"""
+
+import asyncio
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+
+class HostLimiter:
+    """Общий семафор и семафор на хост; семафоры хостов создаются по запросу."""
+
+    def __init__(self, total: int, per_host: int):
+        self.per_host = per_host
+        self._total = asyncio.Semaphore(total)
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._waiters: dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        self._waiters[host] = self._waiters.get(host, 0) + 1
+        try:
+            # Сначала место у хоста, потом общее: запросы к занятому хосту
+            # не держат общие места, пока ждут своей очереди
+            async with semaphore, self._total:
+                yield
+        finally:
+            self._waiters[host] -= 1
+            if not self._waiters[host]:
+                # Семафоры простаивающих хостов не копятся в памяти
+                del self._waiters[host]
+                del self._hosts[host]
+
+
+_client: Optional[httpx.AsyncClient] = None
+_limiter: Optional[HostLimiter] = None
+
+
+def _http2_enabled() -> bool:
+    if not settings.HTTP_CLIENT_HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning(
+            "HTTP_CLIENT_HTTP2 is set but h2 is not installed, using HTTP/1.1"
+        )
+        return False
+    return True
+
+
+def start_http_client() -> httpx.AsyncClient:
+    global _client, _limiter
+    _client = httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+        timeout=settings.HTTP_CLIENT_TIMEOUT_SECONDS,
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+        ),
+    )
+    _limiter = HostLimiter(
+        settings.HTTP_CLIENT_MAX_CONNECTIONS, settings.HTTP_CLIENT_PER_HOST_LIMIT
+    )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client, _limiter
+    if _client is not None:
+        await _client.aclose()
+    _client = _limiter = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("HTTP client is not started, see start_http_client()")
+    return _client
+
+
+def host_slot(url: str):
+    """Место в общем и хостовом лимитах на время одного запроса к url."""
+    if _limiter is None:
+        raise RuntimeError("HTTP client is not started, see start_http_client()")
+    return _limiter.slot(url)
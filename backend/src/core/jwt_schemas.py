@@ -1,7 +1,13 @@
 from pydantic import BaseModel
 from typing import Union
+from uuid import UUID
 
 
 class TokenData(BaseModel):
+    # id пользователя; в токенах, выданных до его появления, отсутствует
+    sub: Union[UUID, None] = None
+    # Версия токенов пользователя, см. User.token_version
+    ver: int = 0
+    is_superuser: bool = False
     username: Union[str, None] = None
     email: Union[str, None] = None
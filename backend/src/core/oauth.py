@@ -1,25 +1,29 @@
+import logging
+
 from authlib.integrations.starlette_client import OAuth
-from sqlmodel import Session, select
+from sqlmodel import select
 from src.core.crypto import crypto_service
-from src.core.database import engine
+from src.core.database import async_session_maker
 from src.models.oauth_config import OAuthProviderConfig
 
 oauth = OAuth()
+logger = logging.getLogger(__name__)
 
-def load_and_register_providers():
+async def load_and_register_providers():
     """Загружает активные конфигурации OAuth из БД и регистрирует их в Authlib."""
-    print("Loading and registering OAuth providers...")
-    with Session(engine) as session:
+    logger.info("Loading and registering OAuth providers")
+    async with async_session_maker() as session:
         statement = select(OAuthProviderConfig).where(
             OAuthProviderConfig.is_active == True  # noqa: E712
         )
-        active_providers = session.exec(statement).all()
+        active_providers = (await session.exec(statement)).all()
 
         for provider_config in active_providers:
             decrypted_secret = crypto_service.decrypt(provider_config.client_secret)
             if not decrypted_secret:
-                print(
-                    f"ERROR: Could not decrypt secret for provider '{provider_config.provider}'. Skipping."
+                logger.error(
+                    "Could not decrypt secret for provider %r, skipping",
+                    provider_config.provider,
                 )
                 continue
 
@@ -30,4 +34,6 @@ def load_and_register_providers():
                 server_metadata_url=provider_config.server_metadata_url,
                 client_kwargs={"scope": "openid email profile"},
             )
-    print(f"Successfully registered providers: {[p for p in oauth._clients.keys()]}")
+    logger.info(
+        "Registered OAuth providers", extra={"providers": list(oauth._clients.keys())}
+    )
@@ -0,0 +1,202 @@
+"""
+Курсорная (keyset) пагинация для списковых эндпоинтов.
+
+Вместо OFFSET страница продолжается строго после последней отданной строки:
+к запросу добавляется условие "ключ сортировки больше/меньше ключа курсора",
+поэтому стоимость запроса зависит только от размера страницы и опирается на
+составной индекс с тем же порядком колонок.
+
+Тело ответа остается списком, а метаданные страницы передаются заголовками:
+    X-Next-Cursor  - непрозрачный курсор следующей страницы (нет на последней)
+    X-Has-More     - "true", если за страницей есть еще строки
+    X-Total-Count  - общее число строк, только при with_total=true
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import and_, func, literal, or_, tuple_
+from sqlmodel import select
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+PAGE_HEADERS = ["X-Next-Cursor", "X-Has-More", "X-Total-Count"]
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """
+    Колонка ключа сортировки и источник ее значения в строке результата:
+    имя атрибута или функция (для вычисляемых ключей вроде ранга поиска).
+    """
+
+    column: Any
+    attr: Union[str, Callable[[Any], Any]]
+    descending: bool = False
+
+    def value(self, item: Any) -> Any:
+        if callable(self.attr):
+            return self.attr(item)
+        return getattr(item, self.attr)
+
+
+class PageParams:
+    """Параметры страницы, общие для всех списковых эндпоинтов."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(
+            None, description="Значение заголовка X-Next-Cursor прошлой страницы"
+        ),
+        with_total: bool = Query(
+            False, description="Посчитать общее число строк (X-Total-Count)"
+        ),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.with_total = with_total
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return {"u": value.hex}
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    if isinstance(value, dict):
+        return {"o": {key: _dump(item) for key, item in value.items()}}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_load(item) for item in value]
+    if isinstance(value, dict):
+        if "u" in value:
+            return UUID(value["u"])
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        return {key: _load(item) for key, item in value["o"].items()}
+    return value
+
+
+def encode_cursor(value: Any) -> str:
+    raw = json.dumps(_dump(value), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return _load(json.loads(base64.urlsafe_b64decode(padded)))
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def keyset_condition(keys: Sequence[SortKey], values: Sequence[Any]):
+    """Условие "строка идет после курсора" для заданного порядка сортировки."""
+    if len(values) != len(keys):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    bound = [literal(value, key.column.type) for key, value in zip(keys, values)]
+
+    # Одно направление у всех колонок: сравнение row value, его понимает индекс
+    if len({key.descending for key in keys}) == 1:
+        columns = tuple_(*[key.column for key in keys])
+        if keys[0].descending:
+            return columns < tuple_(*bound)
+        return columns > tuple_(*bound)
+
+    # Смешанные направления: (a > x) OR (a = x AND b < y) OR ...
+    branches = []
+    for i, key in enumerate(keys):
+        prefix = [keys[j].column == bound[j] for j in range(i)]
+        step = key.column < bound[i] if key.descending else key.column > bound[i]
+        branches.append(and_(*prefix, step))
+    return or_(*branches)
+
+
+def order_by_keys(keys: Sequence[SortKey]) -> list:
+    return [key.column.desc() if key.descending else key.column.asc() for key in keys]
+
+
+def paginate_statement(statement, keys: Sequence[SortKey], page: PageParams):
+    """Добавляет к запросу условие курсора, сортировку и LIMIT (+1 для has_more)."""
+    if page.cursor:
+        statement = statement.where(keyset_condition(keys, decode_cursor(page.cursor)))
+    return statement.order_by(*order_by_keys(keys)).limit(page.limit + 1)
+
+
+def cursor_after(item: Any, keys: Sequence[SortKey]) -> list:
+    return [key.value(item) for key in keys]
+
+
+def finish_page(
+    rows: Sequence[Any],
+    keys: Sequence[SortKey],
+    page: PageParams,
+    response: Response,
+) -> List[Any]:
+    """Обрезает лишнюю строку и выставляет заголовки страницы."""
+    items = list(rows[: page.limit])
+    has_more = len(rows) > page.limit
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor(cursor_after(items[-1], keys))
+    return items
+
+
+async def count_total(db, statement) -> int:
+    """Общее число строк запроса без учета сортировки и пагинации."""
+    count_statement = select(func.count()).select_from(
+        statement.order_by(None).limit(None).subquery()
+    )
+    return (await db.exec(count_statement)).one()
+
+
+async def fetch_page(
+    db,
+    statement,
+    keys: Sequence[SortKey],
+    page: PageParams,
+    response: Response,
+) -> List[Any]:
+    """Выполняет запрос одной страницы и заполняет заголовки ответа."""
+    rows = (await db.exec(paginate_statement(statement, keys, page))).all()
+    items = finish_page(rows, keys, page, response)
+    if page.with_total:
+        response.headers["X-Total-Count"] = str(await count_total(db, statement))
+    return items
+
+
+async def fetch_after(
+    db, statement, keys: Sequence[SortKey], after: Optional[list], limit: int
+) -> Tuple[List[Any], Optional[list]]:
+    """
+    Строки после позиции after и позиция для следующей страницы.
+
+    Нужна эндпоинтам, которые отдают несколько списков под одним курсором:
+    пустая позиция означает начало списка, None - список уже исчерпан.
+    """
+    if after is None:
+        return [], None
+    if after:
+        statement = statement.where(keyset_condition(keys, after))
+    statement = statement.order_by(*order_by_keys(keys)).limit(limit + 1)
+    rows = (await db.exec(statement)).all()
+    items = list(rows[:limit])
+    if len(rows) > limit:
+        return items, cursor_after(items[-1], keys)
+    return items, None
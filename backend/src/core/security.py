@@ -1,15 +1,23 @@
 # backend/src/core/security.py
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import jwt
 from typing import Optional
+from uuid import UUID
 from datetime import timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
+from pydantic import ValidationError
 from .crypto import password_hash
 from .jwt_schemas import TokenData
 from .config import settings
-from sqlmodel import select, or_, Session
-from .database import get_db
+from sqlmodel import select, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .database import get_db, read_session_maker, recent_writes
+from .user_cache import user_cache
 from .utils import get_current_time
 
 # ...Здесь будет ваша логика для JWT и get_current_user...
@@ -18,39 +26,100 @@ from src.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer("auth/token")
 
+logger = logging.getLogger(__name__)
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def decode_access_token(token: str) -> TokenData:
+    # Сам токен и его содержимое в лог не пишем
     try:
-        print(f"Входящий токен: {token}")
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
         )
-        print(f"Payload токена: {payload}")
-        username = payload.get("username")
-        email = payload.get("email")
-        if not username and not email:
-            raise credentials_exception
-        token_data = TokenData(username=username, email=email)
-    except InvalidTokenError as e:
-        print(f"Ошибка декодирования токена: {e}")
-        raise credentials_exception
-    user = db.exec(
-        select(User).where(
-            or_(User.email == token_data.email, User.username == token_data.username)
-        )
-    ).first()
-    if not user:
-        raise credentials_exception
+        token_data = TokenData.model_validate(payload)
+    except (InvalidTokenError, ValidationError) as e:
+        logger.info("Rejected access token: %s", type(e).__name__)
+        raise _credentials_exception()
+    if not token_data.sub and not token_data.username and not token_data.email:
+        raise _credentials_exception()
+    return token_data
+
+
+async def _resolve_user(token_data: TokenData, db: AsyncSession) -> User:
+    """
+    Пользователь токена из кэша, а при промахе - из БД.
+
+    Токены с sub ищутся по первичному ключу. Старые токены (только username
+    и email) продолжают работать до истечения срока.
+    """
+    cache_key = token_data.sub or (token_data.username, token_data.email)
+    user = user_cache.get(cache_key)
+    if user is None:
+        if token_data.sub:
+            statement = select(User).where(User.id == token_data.sub)
+        else:
+            statement = select(User).where(
+                or_(
+                    User.email == token_data.email,
+                    User.username == token_data.username,
+                )
+            )
+        user = (await db.exec(statement)).first()
+        if not user:
+            raise _credentials_exception()
+        # Отсоединяем объект: он переживет сессию запроса и уйдет в кэш
+        db.expunge(user)
+        user_cache.put(cache_key, user)
+
+    # Отзыв токенов: увеличенная token_version отменяет все выданные ранее
+    if not user.is_active or token_data.ver != user.token_version:
+        raise _credentials_exception()
+    # По этой метке сессия запускает окно read-your-writes после коммита
+    db.info["user_id"] = user.id
     return user
 
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> User:
+    return await _resolve_user(decode_access_token(token), db)
+
+
+async def get_current_user_id(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> UUID:
+    """
+    Только id пользователя - для эндпоинтов, которым нужна лишь проверка
+    владельца. При попадании в кэш запрос к БД не выполняется: id берется из
+    sub, а из кэша - только версия токена и признак активности.
+    """
+    user = await _resolve_user(decode_access_token(token), db)
+    return user.id
+
+
+async def get_read_db(
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Сессия для GET-эндпоинтов: реплика, если она настроена и пользователь
+    ничего не записывал в последние READ_YOUR_WRITES_SECONDS секунд,
+    иначе основная БД.
+    """
+    if read_session_maker is None or recent_writes.is_recent(current_user_id):
+        yield db
+        return
+    async with read_session_maker() as session:
+        yield session
+
+
 def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
@@ -60,16 +129,73 @@ def get_current_superuser(current_user: User = Depends(get_current_user)) -> Use
     return current_user
 
 
-def verify_password(plain_password, hashed_password):
-    return password_hash.verify(plain_password, hashed_password)
+# Argon2 занимает десятки миллисекунд CPU и отпускает GIL, поэтому выполняется
+# в своем пуле потоков: event loop продолжает обслуживать другие запросы, а
+# размер пула ограничивает число одновременных хэшей
+_password_executor = (
+    ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        thread_name_prefix="password-hash",
+    )
+    if settings.PASSWORD_HASH_WORKERS > 0
+    else None
+)
+_pending_hashes = 0
+
+
+async def _run_password_hash(func, *args):
+    global _pending_hashes
+    if _password_executor is None:
+        return func(*args)
+    if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+        # Всплеск входов: лучше сразу отказать, чем копить очередь минутами
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password checks, retry later",
+            headers={"Retry-After": "1"},
+        )
+    _pending_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _pending_hashes -= 1
+
+
+async def verify_password(plain_password, hashed_password) -> bool:
+    return await _run_password_hash(
+        password_hash.verify, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password(
+    plain_password, hashed_password
+) -> tuple[bool, Optional[str]]:
+    """
+    Проверяет пароль и, если хэш построен со старыми параметрами Argon2,
+    возвращает новый хэш, который нужно сохранить вместо прежнего.
+    """
+    return await _run_password_hash(
+        password_hash.verify_and_update, plain_password, hashed_password
+    )
+
 
+async def get_password_hash(plain_password) -> str:
+    return await _run_password_hash(password_hash.hash, plain_password)
 
-def get_password_hash(plain_password):
-    return password_hash.hash(plain_password)
+
+def token_data_for(user: User) -> TokenData:
+    return TokenData(
+        sub=user.id,
+        ver=user.token_version,
+        is_superuser=user.is_superuser,
+        username=user.username,
+        email=user.email,
+    )
 
 
 def create_access_token(data: TokenData, expires_delta: Optional[timedelta] = None):
-    to_encode = data.model_dump()
+    to_encode = data.model_dump(mode="json", exclude_none=True)
 
     if expires_delta:
         expire = get_current_time() + expires_delta
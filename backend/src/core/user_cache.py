@@ -0,0 +1,111 @@
+"""
+Кэш пользователей, найденных по токену.
+
+get_current_user вызывается почти на каждый запрос, и без кэша каждый раз
+читает строку пользователя из БД. Кэш живет в памяти процесса: TTL
+ограничивает устаревание (в том числе изменения, сделанные другими
+процессами), а изменения через ORM в этом процессе сбрасывают запись сразу.
+Массовые UPDATE/DELETE в обход ORM кэш не видит - их ловит только TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from src.core.config import settings
+from src.models.user import User
+
+
+class UserCache:
+    """
+    LRU-кэш с TTL: ключ - субъект токена, значение - отсоединенный от сессии
+    объект User. Объект общий для всех запросов, его нельзя изменять.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, User]] = OrderedDict()
+        self._keys_by_user: dict[UUID, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, user: User) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, user)
+            self._keys_by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, user_id: UUID) -> None:
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[1].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[1].id]
+
+
+user_cache = UserCache(settings.USER_CACHE_TTL_SECONDS, settings.USER_CACHE_MAX_SIZE)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    # Пока транзакция не завершена, параллельный запрос может снова положить
+    # в кэш старую строку, поэтому после коммита сбрасываем запись еще раз
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
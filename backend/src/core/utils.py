@@ -5,3 +5,10 @@ from .config import settings
 
 def get_current_time():
     return datetime.now(ZoneInfo(settings.TIMEZONE))
+
+
+def as_local_time(value: datetime) -> datetime:
+    """SQLite отдает время без пояса: это время в settings.TIMEZONE."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=ZoneInfo(settings.TIMEZONE))
+    return value
@@ -1,20 +1,58 @@
+import asyncio
+import contextlib
+import logging
+
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from .modules.routers import routers
 from .core.oauth import load_and_register_providers
+from .core.database import async_engine, read_async_engine
+from .core.http_client import close_http_client, start_http_client
+from .core.log import REQUEST_ID_HEADER, RequestIdMiddleware, setup_logging
+from .core.pagination import PAGE_HEADERS
+from .core.config import settings
+from .modules.calendar.subscriptions import run_subscription_sync
+from .modules.idea_box.services.link_jobs import run_link_workers
+from .modules.idea_box.services.link_sweeper import run_link_sweeper
 
 # 1. Импортируем middleware
 from fastapi.middleware.cors import CORSMiddleware
 
+log_listener = setup_logging()
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Your startup logic here
-    load_and_register_providers()
-    print("Application startup")
+    log_listener.start()
+    start_http_client()
+    await load_and_register_providers()
+    # Превью ссылок: воркеры очереди и перепроверка устаревших в этом
+    # процессе, если они не вынесены в отдельный (services.link_worker)
+    background = []
+    if settings.LINK_PREVIEW_WORKERS > 0:
+        background.append(
+            asyncio.create_task(run_link_workers(settings.LINK_PREVIEW_WORKERS))
+        )
+    if settings.LINK_PREVIEW_SWEEP_INTERVAL_SECONDS > 0:
+        background.append(asyncio.create_task(run_link_sweeper()))
+    # Загрузка подписок на внешние календари
+    if settings.CALENDAR_SUBSCRIPTION_POLL_SECONDS > 0:
+        background.append(asyncio.create_task(run_subscription_sync()))
+    logger.info("Application startup")
     yield
     # Your shutdown logic here
-    print("Application shutdown")
+    for task in background:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await close_http_client()
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
+    logger.info("Application shutdown")
+    log_listener.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -32,7 +70,11 @@ app.add_middleware(
     allow_credentials=True,  # Разрешаем передачу cookie/авторизационных заголовков
     allow_methods=["*"],  # Разрешаем все методы (GET, POST, PUT, DELETE и т.д.)
     allow_headers=["*"],  # Разрешаем все заголовки
+    # Заголовки курсорной пагинации, версии списка и id запроса для фронтенда
+    expose_headers=[*PAGE_HEADERS, "ETag", REQUEST_ID_HEADER],
 )
+# id запроса для логов; добавлен последним, чтобы охватить и CORS
+app.add_middleware(RequestIdMiddleware)
 
 
 for router in routers:
@@ -1,19 +1,43 @@
-from .calendar import CalendarEvent
-from .idea import Idea, IdeaFolder, IdeaTagLink, IdeaType, LinkMetadata, Tag
+from .calendar import (
+    CalendarEvent,
+    CalendarFeedToken,
+    CalendarSource,
+    CalendarSubscription,
+    RemoteEvent,
+)
+from .idea import (
+    FolderTagCount,
+    Idea,
+    IdeaFolder,
+    IdeaTagLink,
+    IdeaType,
+    LinkMetadata,
+    LinkPreviewJob,
+    Tag,
+)
 from .oauth_config import OAuthProviderConfig
 from .task import Task
-from .user import OAuthAccount, User
+from .user import OAuthAccount, RefreshToken, User
+from .version import CollectionVersion
 
 __all__ = [
     "User",
     "OAuthAccount",
+    "RefreshToken",
     "OAuthProviderConfig",
     "Task",
     "CalendarEvent",
+    "CalendarFeedToken",
+    "CalendarSource",
+    "CalendarSubscription",
+    "RemoteEvent",
+    "CollectionVersion",
     "IdeaFolder",
+    "FolderTagCount",
     "Idea",
     "IdeaTagLink",
     "LinkMetadata",
+    "LinkPreviewJob",
     "IdeaType",
     "Tag",
 ]
@@ -1,20 +1,71 @@
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import List, Optional
 from uuid import UUID, uuid4
 
+from sqlalchemy import JSON, Column, Index, UniqueConstraint, event, text
 from sqlmodel import Field, Relationship, SQLModel
 
+from src.core.utils import get_current_time
+
 from .task import Task
 from .user import User
 
+# Событие пересекает окно, если start_time < конца окна и end_time > начала.
+# У событий не длиннее LONG_EVENT начало к тому же не раньше начала окна минус
+# LONG_EVENT, и диапазон индекса (owner_id, start_time) ограничен с обеих
+# сторон; более длинные события помечены is_long и ищутся по концу.
+LONG_EVENT = timedelta(days=1)
+
 
 class CalendarEvent(SQLModel, table=True):
+    __table_args__ = (
+        # События пользователя в окне календаря, курсор по (start_time, id)
+        Index("ix_calendarevent_owner_start", "owner_id", "start_time", "id"),
+        # Длинные события, пересекающие окно
+        Index(
+            "ix_calendarevent_owner_long_end",
+            "owner_id",
+            "end_time",
+            sqlite_where=text("is_long = 1"),
+            postgresql_where=text("is_long"),
+        ),
+        # Серии повторяющихся событий: их немного, но окно календаря должно
+        # находить их, не перебирая все одиночные события до своего конца
+        Index(
+            "ix_calendarevent_owner_series",
+            "owner_id",
+            "start_time",
+            sqlite_where=text("rrule IS NOT NULL"),
+            postgresql_where=text("rrule IS NOT NULL"),
+        ),
+        # Измененные повторы серии по исходному времени повтора
+        Index("ix_calendarevent_series_recurrence", "series_id", "recurrence_id"),
+    )
+
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     title: str = Field(index=True)
     description: Optional[str] = None
 
+    # У серии - первый повтор; длительность всех повторов та же
     start_time: datetime = Field(index=True)
     end_time: datetime = Field(index=True)
+    # Длиннее LONG_EVENT; выставляется при каждой записи через ORM
+    is_long: bool = Field(default=False, sa_column_kwargs={"server_default": "0"})
+
+    # Серия: правило RRULE по RFC 5545 (без префикса "RRULE:") и исключенные
+    # повторы (EXDATE) - ISO-строки времени их начала
+    rrule: Optional[str] = None
+    exdates: List[str] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False, server_default="[]"),
+    )
+    # Конец последнего повтора серии; NULL - у бесконечной серии
+    recurrence_end: Optional[datetime] = None
+
+    # Измененный повтор серии (RECURRENCE-ID): отдельное событие, которое
+    # заменяет повтор серии series_id, начинавшийся в recurrence_id
+    series_id: Optional[UUID] = Field(default=None, foreign_key="calendarevent.id")
+    recurrence_id: Optional[datetime] = None
 
     owner_id: UUID = Field(foreign_key="user.id")
     owner: User = Relationship(back_populates="calendar_events")
@@ -22,3 +73,113 @@ class CalendarEvent(SQLModel, table=True):
     # Не каждое событие - это задача, поэтому task_id может быть NULL
     task_id: Optional[UUID] = Field(default=None, foreign_key="task.id")
     task: Optional[Task] = Relationship()
+
+
+class CalendarSource(SQLModel, table=True):
+    """
+    Внешний ICS-календарь. Один на URL: подписки разных пользователей на ту
+    же ссылку делят и загрузку, и сохраненные события.
+    """
+
+    # Выборка календарей, которые пора перепроверить
+    __table_args__ = (Index("ix_calendarsource_next_fetch_at", "next_fetch_at"),)
+
+    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    url: str = Field(unique=True)
+    # Валидаторы для условной перепроверки (If-None-Match/If-Modified-Since);
+    # сохраняются только после полностью примененной загрузки
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: Optional[datetime] = None
+    # Следующая проверка; NULL - еще не загружался. Пока идет загрузка,
+    # здесь срок аренды, чтобы календарь не взял второй воркер
+    next_fetch_at: Optional[datetime] = None
+    # Неудачные загрузки подряд и последняя ошибка
+    failure_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    last_error: Optional[str] = None
+
+
+class CalendarSubscription(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("owner_id", "source_id"),
+        # Подписчики календаря (удаление последней подписки)
+        Index("ix_calendarsubscription_source", "source_id"),
+    )
+
+    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    name: str
+    created_at: datetime = Field(default_factory=get_current_time)
+    owner_id: UUID = Field(foreign_key="user.id")
+    source_id: UUID = Field(foreign_key="calendarsource.id")
+
+
+class RemoteEvent(SQLModel, table=True):
+    """
+    VEVENT внешнего календаря. Время, повторение и is_long устроены так же,
+    как у CalendarEvent, и окно календаря ищет их теми же запросами.
+    """
+
+    __table_args__ = (
+        # Сверка загруженного календаря с сохраненным по UID
+        Index("ix_remoteevent_source_uid", "source_id", "uid", "recurrence_id"),
+        Index("ix_remoteevent_source_start", "source_id", "start_time", "id"),
+        Index(
+            "ix_remoteevent_source_long_end",
+            "source_id",
+            "end_time",
+            sqlite_where=text("is_long = 1"),
+            postgresql_where=text("is_long"),
+        ),
+        Index(
+            "ix_remoteevent_source_series",
+            "source_id",
+            "start_time",
+            sqlite_where=text("rrule IS NOT NULL"),
+            postgresql_where=text("rrule IS NOT NULL"),
+        ),
+    )
+
+    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    source_id: UUID = Field(foreign_key="calendarsource.id")
+    uid: str
+    # Измененный повтор серии с тем же UID (RECURRENCE-ID)
+    recurrence_id: Optional[datetime] = None
+    # SHA-256 исходного текста VEVENT: по нему видно, что событие изменилось
+    digest: str
+
+    title: str
+    description: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    is_long: bool = Field(default=False, sa_column_kwargs={"server_default": "0"})
+    rrule: Optional[str] = None
+    exdates: List[str] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False, server_default="[]"),
+    )
+    recurrence_end: Optional[datetime] = None
+
+
+@event.listens_for(CalendarEvent, "before_insert")
+@event.listens_for(CalendarEvent, "before_update")
+@event.listens_for(RemoteEvent, "before_insert")
+@event.listens_for(RemoteEvent, "before_update")
+def _mark_long_event(mapper, connection, target):
+    target.is_long = is_long_event(target.start_time, target.end_time)
+
+
+def is_long_event(start_time: datetime, end_time: datetime) -> bool:
+    # Пояс отбрасывается так же, как при записи в колонку без пояса
+    return end_time.replace(tzinfo=None) - start_time.replace(tzinfo=None) > LONG_EVENT
+
+
+class CalendarFeedToken(SQLModel, table=True):
+    """
+    Секрет ссылки на ICS-ленту календаря пользователя. Календарные приложения
+    не умеют передавать заголовок Authorization, поэтому секрет идет в самой
+    ссылке; хранится только SHA-256 от него, как у refresh-токенов.
+    """
+
+    owner_id: UUID = Field(foreign_key="user.id", primary_key=True)
+    token_hash: str = Field(unique=True, index=True)
+    created_at: datetime = Field(default_factory=get_current_time)
@@ -4,7 +4,7 @@ from enum import Enum
 from typing import TYPE_CHECKING, List, Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import TEXT, Column
+from sqlalchemy import DDL, TEXT, Column, Index, event, literal_column
 from sqlmodel import Field, Relationship, SQLModel
 from src.core.utils import get_current_time
 
@@ -14,9 +14,14 @@ if TYPE_CHECKING:
 
 
 class IdeaFolder(SQLModel, table=True):
+    # Список папок пользователя: сортировка и курсор по (name, id)
+    __table_args__ = (Index("ix_ideafolder_owner_name", "owner_id", "name", "id"),)
+
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
-    name: str = Field(index=True)
+    name: str
     icon: Optional[str] = None
+    # Число идей в папке; поддерживается триггерами (см. COUNTER_DDL ниже)
+    idea_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     owner_id: UUID = Field(foreign_key="user.id")
     owner: "User" = Relationship(back_populates="idea_folders")
@@ -36,7 +41,39 @@ class LinkMetadata(SQLModel, table=True):
     title: Optional[str] = None
     description: Optional[str] = None
     image_url: Optional[str] = None
+    # MIME-тип ответа: text/html или, например, application/pdf и image/png
+    # для ссылок на файлы, у которых превью строится по типу, а не по HTML
+    content_type: Optional[str] = None
     fetched_at: datetime = Field(default_factory=get_current_time)
+    # Валидаторы для условной перепроверки (If-None-Match/If-Modified-Since)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # Когда превью устареет; NULL - не проверялось с момента миграции
+    expires_at: Optional[datetime] = Field(default=None, index=True)
+    # Неудачные загрузки подряд: запись без данных - негативный кэш
+    failure_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    last_error: Optional[str] = None
+
+
+class LinkPreviewJob(SQLModel, table=True):
+    """
+    Задание на загрузку превью. Одно на URL: идеи с той же ссылкой,
+    сохраненные, пока задание ждет или выполняется, присоединяются к нему.
+    Выполненные задания удаляются.
+    """
+
+    # Выборка готовых к запуску заданий: run_after <= now, старые первыми
+    __table_args__ = (Index("ix_linkpreviewjob_run_after", "run_after"),)
+
+    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    url: str = Field(unique=True)
+    attempts: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    created_at: datetime = Field(default_factory=get_current_time)
+    # Не раньше этого времени (повтор после неудачи - с растущей паузой)
+    run_after: datetime = Field(default_factory=get_current_time)
+    # Аренда воркера: задание упавшего воркера снова берется после истечения
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
 
 
 class IdeaTagLink(SQLModel, table=True):
@@ -45,10 +82,31 @@ class IdeaTagLink(SQLModel, table=True):
     )
     tag_id: Optional[UUID] = Field(default=None, foreign_key="tag.id", primary_key=True)
 
+    # Первичный ключ начинается с idea_id; идеи по тегу (фильтр ленты,
+    # удаление тега) ищутся по этому индексу
+    __table_args__ = (Index("ix_ideataglink_tag_idea", "tag_id", "idea_id"),)
+
 
 class Tag(SQLModel, table=True):
+    __table_args__ = (
+        # Имя тега уникально у владельца: параллельные запросы с новым тегом
+        # не создают дублей, а вставка тегов идет через ON CONFLICT DO NOTHING
+        Index("ix_tag_owner_name", "owner_id", "name", unique=True),
+        # Словарь тегов: популярные первыми, затем по имени - тот же порядок,
+        # что у списка тегов, поэтому страница читается из индекса без сортировки
+        Index(
+            "ix_tag_owner_count",
+            "owner_id",
+            literal_column("idea_count").desc(),
+            "name",
+            "id",
+        ),
+    )
+
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
-    name: str = Field(index=True)
+    name: str
+    # Число идей с тегом; поддерживается триггерами (см. COUNTER_DDL ниже)
+    idea_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     owner_id: UUID = Field(foreign_key="user.id")
     owner: "User" = Relationship(back_populates="tags")
@@ -56,13 +114,52 @@ class Tag(SQLModel, table=True):
     ideas: List["Idea"] = Relationship(back_populates="tags", link_model=IdeaTagLink)
 
 
+class FolderTagCount(SQLModel, table=True):
+    """Число идей папки с тегом; строки с нулем удаляются."""
+
+    __table_args__ = (
+        Index(
+            "ix_foldertagcount_folder_count",
+            "folder_id",
+            literal_column("idea_count").desc(),
+        ),
+    )
+
+    folder_id: UUID = Field(foreign_key="ideafolder.id", primary_key=True)
+    tag_id: UUID = Field(foreign_key="tag.id", primary_key=True)
+    idea_count: int = 0
+
+
 class Idea(SQLModel, table=True):
+    # Лента идей: (is_pinned desc, updated_at desc, id desc) внутри владельца
+    # и, с тем же порядком, внутри папки. owner_id в начале второго индекса
+    # дает фильтру по папке два равенства против одного: без статистики SQLite
+    # иначе выбирает между индексами по порядку их создания
+    __table_args__ = (
+        Index(
+            "ix_idea_owner_pinned_updated",
+            "owner_id",
+            "is_pinned",
+            "updated_at",
+            "id",
+        ),
+        Index(
+            "ix_idea_owner_folder_pinned_updated",
+            "owner_id",
+            "folder_id",
+            "is_pinned",
+            "updated_at",
+            "id",
+        ),
+    )
+
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     idea_type: IdeaType = Field(default=IdeaType.TEXT)
     title: Optional[str] = Field(default=None, index=True)
     content: Optional[str] = Field(default=None, sa_column=Column(TEXT))
-    url: Optional[str] = Field(default=None)
-    is_pinned: bool = Field(default=False, index=True)
+    # Индекс - для привязки превью ко всем идеям с этой ссылкой
+    url: Optional[str] = Field(default=None, index=True)
+    is_pinned: bool = False
 
     created_at: datetime = Field(default_factory=get_current_time)
     updated_at: datetime = Field(
@@ -85,3 +182,227 @@ class Idea(SQLModel, table=True):
     generated_task: Optional["Task"] = Relationship(back_populates="source_idea")
 
     tags: List["Tag"] = Relationship(back_populates="ideas", link_model=IdeaTagLink)
+
+
+# --- Полнотекстовый индекс идей ---
+# Индекс живет вне моделей: в SQLite это внешняя (external content) таблица
+# FTS5 поверх idea, в Postgres - колонка tsvector с GIN-индексом. Оба
+# поддерживаются триггерами, поэтому код записи идей о них не знает.
+# Миграция создает те же объекты, а события ниже - для create_all (тесты).
+
+# Таблица FTS5 ссылается на rowid идеи. VACUUM может перенумеровать rowid
+# таблицы без INTEGER PRIMARY KEY, после него индекс нужно перестроить:
+#     INSERT INTO idea_fts(idea_fts) VALUES ('rebuild')
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS idea_fts USING fts5(
+        title, content,
+        content='idea', content_rowid='rowid',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_fts_ai AFTER INSERT ON idea BEGIN
+        INSERT INTO idea_fts(rowid, title, content)
+        VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_fts_ad AFTER DELETE ON idea BEGIN
+        INSERT INTO idea_fts(idea_fts, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_fts_au AFTER UPDATE OF title, content ON idea
+    BEGIN
+        INSERT INTO idea_fts(idea_fts, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+        INSERT INTO idea_fts(rowid, title, content)
+        VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+]
+
+# Заголовок весит больше содержания; вектор строится сразу для русской и
+# английской морфологии, так как пользователи пишут на обоих языках
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE idea ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION idea_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.content, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER idea_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON idea
+    FOR EACH ROW EXECUTE FUNCTION idea_search_vector_update()
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_idea_search_vector
+    ON idea USING GIN (search_vector)
+    """,
+]
+
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Idea.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+for _statement in POSTGRES_SEARCH_DDL:
+    event.listen(
+        Idea.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql"),
+    )
+event.listen(
+    Idea.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS idea_fts").execute_if(dialect="sqlite"),
+)
+
+
+# --- Счетчики идей по тегам и папкам ---
+# Tag.idea_count, IdeaFolder.idea_count и FolderTagCount меняются триггерами
+# на idea и ideataglink в той же транзакции, что и сами идеи: их одинаково
+# обновляют ORM, массовый импорт и ручные правки в БД. Связи идеи с тегами
+# удаляются раньше самой идеи (внешний ключ), поэтому при удалении связи
+# папка идеи еще известна. Если счетчики все же разойдутся с данными,
+# их пересчитывает services/counters.py.
+
+SQLITE_COUNTER_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_counts_ai AFTER INSERT ON idea BEGIN
+        UPDATE ideafolder SET idea_count = idea_count + 1
+        WHERE id = new.folder_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_counts_ad AFTER DELETE ON idea BEGIN
+        UPDATE ideafolder SET idea_count = idea_count - 1
+        WHERE id = old.folder_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS idea_counts_au AFTER UPDATE OF folder_id ON idea
+    WHEN old.folder_id IS NOT new.folder_id
+    BEGIN
+        UPDATE ideafolder SET idea_count = idea_count - 1
+        WHERE id = old.folder_id;
+        UPDATE ideafolder SET idea_count = idea_count + 1
+        WHERE id = new.folder_id;
+        UPDATE foldertagcount SET idea_count = idea_count - 1
+        WHERE folder_id = old.folder_id
+          AND tag_id IN (SELECT tag_id FROM ideataglink WHERE idea_id = new.id);
+        DELETE FROM foldertagcount
+        WHERE folder_id = old.folder_id AND idea_count <= 0;
+        INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+        SELECT new.folder_id, tag_id, 1 FROM ideataglink WHERE idea_id = new.id
+        ON CONFLICT (folder_id, tag_id)
+        DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ideataglink_counts_ai AFTER INSERT ON ideataglink
+    BEGIN
+        UPDATE tag SET idea_count = idea_count + 1 WHERE id = new.tag_id;
+        INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+        SELECT folder_id, new.tag_id, 1 FROM idea WHERE id = new.idea_id
+        ON CONFLICT (folder_id, tag_id)
+        DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ideataglink_counts_ad AFTER DELETE ON ideataglink
+    BEGIN
+        UPDATE tag SET idea_count = idea_count - 1 WHERE id = old.tag_id;
+        UPDATE foldertagcount SET idea_count = idea_count - 1
+        WHERE tag_id = old.tag_id
+          AND folder_id = (SELECT folder_id FROM idea WHERE id = old.idea_id);
+        DELETE FROM foldertagcount
+        WHERE tag_id = old.tag_id AND idea_count <= 0;
+    END
+    """,
+]
+
+POSTGRES_COUNTER_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION idea_counts_update() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE ideafolder SET idea_count = idea_count + 1
+            WHERE id = NEW.folder_id;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE ideafolder SET idea_count = idea_count - 1
+            WHERE id = OLD.folder_id;
+        ELSIF NEW.folder_id IS DISTINCT FROM OLD.folder_id THEN
+            UPDATE ideafolder SET idea_count = idea_count - 1
+            WHERE id = OLD.folder_id;
+            UPDATE ideafolder SET idea_count = idea_count + 1
+            WHERE id = NEW.folder_id;
+            UPDATE foldertagcount SET idea_count = idea_count - 1
+            WHERE folder_id = OLD.folder_id
+              AND tag_id IN (SELECT tag_id FROM ideataglink WHERE idea_id = NEW.id);
+            DELETE FROM foldertagcount
+            WHERE folder_id = OLD.folder_id AND idea_count <= 0;
+            INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+            SELECT NEW.folder_id, tag_id, 1 FROM ideataglink WHERE idea_id = NEW.id
+            ON CONFLICT (folder_id, tag_id)
+            DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER idea_counts_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF folder_id ON idea
+    FOR EACH ROW EXECUTE FUNCTION idea_counts_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION ideataglink_counts_update() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE tag SET idea_count = idea_count + 1 WHERE id = NEW.tag_id;
+            INSERT INTO foldertagcount (folder_id, tag_id, idea_count)
+            SELECT folder_id, NEW.tag_id, 1 FROM idea WHERE id = NEW.idea_id
+            ON CONFLICT (folder_id, tag_id)
+            DO UPDATE SET idea_count = foldertagcount.idea_count + 1;
+        ELSE
+            UPDATE tag SET idea_count = idea_count - 1 WHERE id = OLD.tag_id;
+            UPDATE foldertagcount SET idea_count = idea_count - 1
+            WHERE tag_id = OLD.tag_id
+              AND folder_id = (SELECT folder_id FROM idea WHERE id = OLD.idea_id);
+            DELETE FROM foldertagcount
+            WHERE tag_id = OLD.tag_id AND idea_count <= 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER ideataglink_counts_trigger
+    AFTER INSERT OR DELETE ON ideataglink
+    FOR EACH ROW EXECUTE FUNCTION ideataglink_counts_update()
+    """,
+]
+
+# ideataglink создается после idea, к этому моменту есть все таблицы триггеров
+for _statement in SQLITE_COUNTER_DDL:
+    event.listen(
+        IdeaTagLink.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
+for _statement in POSTGRES_COUNTER_DDL:
+    event.listen(
+        IdeaTagLink.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql"),
+    )
@@ -4,6 +4,7 @@ from enum import Enum
 from typing import TYPE_CHECKING, Optional
 from uuid import UUID, uuid4
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -24,6 +25,13 @@ class TaskPriority(str, Enum):
 
 
 class Task(SQLModel, table=True):
+    __table_args__ = (
+        # Список задач пользователя с курсором по id
+        Index("ix_task_owner_id", "owner_id", "id"),
+        # Задачи с дедлайном в окне календаря
+        Index("ix_task_owner_due", "owner_id", "due_date", "id"),
+    )
+
     id: Optional[UUID] = Field(primary_key=True, default_factory=uuid4)
     title: str = Field(index=True)
     description: Optional[str] = None
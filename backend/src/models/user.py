@@ -1,8 +1,11 @@
+from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional
 from uuid import UUID, uuid4
 
 from sqlmodel import Field, Relationship, SQLModel
 
+from src.core.utils import get_current_time
+
 if TYPE_CHECKING:
     from .calendar import CalendarEvent
     from .idea import Idea, IdeaFolder, Tag
@@ -16,6 +19,8 @@ class User(SQLModel, table=True):
     is_active: bool = True
     email: str = Field(unique=True, index=True)
     is_superuser: bool = Field(default=False)
+    # Увеличение версии отзывает все выданные пользователю токены
+    token_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     oauth_accounts: List["OAuthAccount"] = Relationship(back_populates="user")
     tasks: List["Task"] = Relationship(back_populates="owner")
@@ -32,3 +37,24 @@ class OAuthAccount(SQLModel, table=True):
     user_id: UUID = Field(foreign_key="user.id")
 
     user: "User" = Relationship(back_populates="oauth_accounts")
+
+
+class RefreshToken(SQLModel, table=True):
+    """
+    Выданный refresh-токен. Хранится только SHA-256 от случайного значения:
+    у токена 256 бит энтропии, поэтому медленный хэш не нужен, а поиск
+    идет по уникальному индексу.
+
+    Токены одной цепочки ротации делят family_id. Повторное использование
+    уже обмененного токена означает утечку, и вся цепочка отзывается.
+    """
+
+    id: Optional[UUID] = Field(primary_key=True, default_factory=uuid4)
+    token_hash: str = Field(unique=True, index=True)
+    family_id: UUID = Field(index=True)
+    user_id: UUID = Field(foreign_key="user.id", index=True)
+    created_at: datetime = Field(default_factory=get_current_time)
+    expires_at: datetime
+    # Токен обменян на новую пару
+    used_at: Optional[datetime] = None
+    revoked_at: Optional[datetime] = None
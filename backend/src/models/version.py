@@ -0,0 +1,305 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import DDL, event, text
+from sqlmodel import Field, SQLModel
+
+# Наборы данных пользователя, у которых есть своя версия
+CALENDAR_COLLECTION = "calendar"
+TASKS_COLLECTION = "tasks"
+IDEAS_COLLECTION = "ideas"
+TAGS_COLLECTION = "tags"
+
+
+class CollectionVersion(SQLModel, table=True):
+    """
+    Версия набора данных пользователя: растет при каждом изменении его строк.
+    По ней строится ETag, и неизмененный набор отдается как 304 после чтения
+    одной строки этой таблицы, без запросов к самим данным.
+    """
+
+    owner_id: UUID = Field(foreign_key="user.id", primary_key=True)
+    collection: str = Field(primary_key=True)
+    version: int = Field(default=0)
+    # Время последнего изменения (UTC, без пояса)
+    updated_at: Optional[datetime] = Field(
+        default=None, sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")}
+    )
+
+
+# --- Версия календаря ---
+# Версию меняют триггеры в той же транзакции, что и сами строки, поэтому ее
+# одинаково увеличивают роутеры, повторы серий и ручные правки в БД. Задачи
+# входят в календарь только с дедлайном.
+
+
+def _sqlite_version_trigger(
+    name: str,
+    operation: str,
+    table: str,
+    row: str,
+    collection: str,
+    when: str = "",
+    owners: str = "",
+) -> str:
+    # owners - "FROM ... WHERE ..." для таблиц без owner_id: версия растет у
+    # владельцев найденных строк
+    values = (
+        f"SELECT DISTINCT owner_id, '{collection}', 1, CURRENT_TIMESTAMP {owners}"
+        if owners
+        else f"VALUES ({row}.owner_id, '{collection}', 1, CURRENT_TIMESTAMP)"
+    )
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS {name} AFTER {operation} ON {table}
+    {when}
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        {values}
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    END
+    """
+
+
+SQLITE_CALENDAR_VERSION_DDL = [
+    *(
+        _sqlite_version_trigger(
+            f"calendarevent_calendar_version_{suffix}",
+            operation,
+            "calendarevent",
+            row,
+            CALENDAR_COLLECTION,
+        )
+        for suffix, operation, row in [
+            ("ai", "INSERT", "new"),
+            ("au", "UPDATE", "new"),
+            ("ad", "DELETE", "old"),
+        ]
+    ),
+    _sqlite_version_trigger(
+        "task_calendar_version_ai",
+        "INSERT",
+        "task",
+        "new",
+        CALENDAR_COLLECTION,
+        when="WHEN new.due_date IS NOT NULL",
+    ),
+    # Задача, у которой убрали дедлайн, тоже меняет календарь
+    _sqlite_version_trigger(
+        "task_calendar_version_au",
+        "UPDATE",
+        "task",
+        "new",
+        CALENDAR_COLLECTION,
+        when="WHEN new.due_date IS NOT NULL OR old.due_date IS NOT NULL",
+    ),
+    _sqlite_version_trigger(
+        "task_calendar_version_ad",
+        "DELETE",
+        "task",
+        "old",
+        CALENDAR_COLLECTION,
+        when="WHEN old.due_date IS NOT NULL",
+    ),
+]
+
+POSTGRES_CALENDAR_VERSION_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION collection_version_bump() RETURNS trigger AS $$
+    DECLARE
+        row_owner uuid;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_owner := OLD.owner_id;
+        ELSE
+            row_owner := NEW.owner_id;
+        END IF;
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        VALUES (row_owner, TG_ARGV[0], 1, timezone('utc', now()))
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = collectionversion.version + 1,
+            updated_at = timezone('utc', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER calendarevent_calendar_version
+    AFTER INSERT OR UPDATE OR DELETE ON calendarevent
+    FOR EACH ROW EXECUTE FUNCTION collection_version_bump('{CALENDAR_COLLECTION}')
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER task_calendar_version_write
+    AFTER INSERT OR UPDATE ON task
+    FOR EACH ROW WHEN (NEW.due_date IS NOT NULL)
+    EXECUTE FUNCTION collection_version_bump('{CALENDAR_COLLECTION}')
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER task_calendar_version_clear
+    AFTER UPDATE ON task
+    FOR EACH ROW WHEN (NEW.due_date IS NULL AND OLD.due_date IS NOT NULL)
+    EXECUTE FUNCTION collection_version_bump('{CALENDAR_COLLECTION}')
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER task_calendar_version_delete
+    AFTER DELETE ON task
+    FOR EACH ROW WHEN (OLD.due_date IS NOT NULL)
+    EXECUTE FUNCTION collection_version_bump('{CALENDAR_COLLECTION}')
+    """,
+]
+
+
+# --- Версии списков задач, идей и тегов ---
+# Идея в списке несет имена тегов и превью ссылки, поэтому версию идей меняют
+# и связи с тегами, и переименование тега, и обновленное превью. Счетчики
+# тегов ведут свои триггеры, их UPDATE меняет версию тегов. Подписки
+# календаря - тоже часть календаря; версию подписчиков при загрузке внешнего
+# календаря меняет сама загрузка (calendar/subscriptions.py), одним запросом
+# на пачку событий.
+
+# Превью меняется у всех идей с этой ссылкой; url идеи индексирован
+_LINK_METADATA_OWNERS = (
+    "FROM idea WHERE idea.url = new.url AND idea.link_metadata_id = new.id"
+)
+_LINK_METADATA_CHANGED = (
+    "new.title IS NOT old.title OR new.description IS NOT old.description"
+    " OR new.image_url IS NOT old.image_url"
+    " OR new.content_type IS NOT old.content_type"
+)
+
+SQLITE_COLLECTION_VERSION_DDL = [
+    *(
+        _sqlite_version_trigger(
+            f"{table}_{collection}_version_{suffix}",
+            operation,
+            table,
+            row,
+            collection,
+        )
+        for table, collection in [
+            ("task", TASKS_COLLECTION),
+            ("idea", IDEAS_COLLECTION),
+            ("tag", TAGS_COLLECTION),
+            ("calendarsubscription", CALENDAR_COLLECTION),
+        ]
+        for suffix, operation, row in [
+            ("ai", "INSERT", "new"),
+            ("au", "UPDATE", "new"),
+            ("ad", "DELETE", "old"),
+        ]
+    ),
+    *(
+        _sqlite_version_trigger(
+            f"ideataglink_ideas_version_{suffix}",
+            operation,
+            "ideataglink",
+            row,
+            IDEAS_COLLECTION,
+            owners=f"FROM tag WHERE tag.id = {row}.tag_id",
+        )
+        for suffix, operation, row in [("ai", "INSERT", "new"), ("ad", "DELETE", "old")]
+    ),
+    _sqlite_version_trigger(
+        "tag_ideas_version_au",
+        "UPDATE OF name",
+        "tag",
+        "new",
+        IDEAS_COLLECTION,
+        when="WHEN new.name IS NOT old.name",
+    ),
+    _sqlite_version_trigger(
+        "linkmetadata_ideas_version_au",
+        "UPDATE",
+        "linkmetadata",
+        "new",
+        IDEAS_COLLECTION,
+        when=f"WHEN {_LINK_METADATA_CHANGED}",
+        owners=_LINK_METADATA_OWNERS,
+    ),
+]
+
+POSTGRES_COLLECTION_VERSION_DDL = [
+    *(
+        f"""
+    CREATE OR REPLACE TRIGGER {table}_{collection}_version
+    AFTER INSERT OR UPDATE OR DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION collection_version_bump('{collection}')
+    """
+        for table, collection in [
+            ("task", TASKS_COLLECTION),
+            ("idea", IDEAS_COLLECTION),
+            ("tag", TAGS_COLLECTION),
+            ("calendarsubscription", CALENDAR_COLLECTION),
+        ]
+    ),
+    """
+    CREATE OR REPLACE FUNCTION ideataglink_version_bump() RETURNS trigger AS $$
+    DECLARE
+        link_tag uuid;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            link_tag := OLD.tag_id;
+        ELSE
+            link_tag := NEW.tag_id;
+        END IF;
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        SELECT owner_id, TG_ARGV[0], 1, timezone('utc', now())
+        FROM tag WHERE id = link_tag
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = collectionversion.version + 1,
+            updated_at = timezone('utc', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER ideataglink_ideas_version
+    AFTER INSERT OR DELETE ON ideataglink
+    FOR EACH ROW EXECUTE FUNCTION ideataglink_version_bump('{IDEAS_COLLECTION}')
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER tag_ideas_version
+    AFTER UPDATE OF name ON tag
+    FOR EACH ROW WHEN (NEW.name IS DISTINCT FROM OLD.name)
+    EXECUTE FUNCTION collection_version_bump('{IDEAS_COLLECTION}')
+    """,
+    """
+    CREATE OR REPLACE FUNCTION linkmetadata_version_bump() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO collectionversion (owner_id, collection, version, updated_at)
+        SELECT DISTINCT owner_id, TG_ARGV[0], 1, timezone('utc', now())
+        FROM idea WHERE url = NEW.url AND link_metadata_id = NEW.id
+        ON CONFLICT (owner_id, collection) DO UPDATE
+        SET version = collectionversion.version + 1,
+            updated_at = timezone('utc', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER linkmetadata_ideas_version
+    AFTER UPDATE ON linkmetadata
+    FOR EACH ROW WHEN (
+        NEW.title IS DISTINCT FROM OLD.title
+        OR NEW.description IS DISTINCT FROM OLD.description
+        OR NEW.image_url IS DISTINCT FROM OLD.image_url
+        OR NEW.content_type IS DISTINCT FROM OLD.content_type
+    )
+    EXECUTE FUNCTION linkmetadata_version_bump('{IDEAS_COLLECTION}')
+    """,
+]
+
+# Триггеры ставятся на чужие таблицы: к after_create всей схемы они уже есть
+for _statement in [*SQLITE_CALENDAR_VERSION_DDL, *SQLITE_COLLECTION_VERSION_DDL]:
+    event.listen(
+        SQLModel.metadata,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
+for _statement in [*POSTGRES_CALENDAR_VERSION_DDL, *POSTGRES_COLLECTION_VERSION_DDL]:
+    event.listen(
+        SQLModel.metadata,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql"),
+    )
@@ -1,6 +1,7 @@
 from typing import List
 from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.core.database import get_db
 from src.models.oauth_config import OAuthProviderConfig
@@ -11,19 +12,22 @@ oauth_router = APIRouter(prefix="/oauth")
 
 
 @oauth_router.post("/", response_model=OAuthProviderConfig)
-def create_oauth_provider(config: OAuthProviderConfig, db: Session = Depends(get_db)):
+async def create_oauth_provider(
+    config: OAuthProviderConfig, db: AsyncSession = Depends(get_db)
+):
     encrypted_secret = crypto_service.encrypt(config.client_secret)
     db_config = OAuthProviderConfig.from_orm(
         config, {"client_secret": encrypted_secret}
     )
     db.add(db_config)
-    db.commit()
-    db.refresh(db_config)
+    await db.commit()
+    await db.refresh(db_config)
     return db_config
 
 @oauth_router.get("/", response_model=List[OAuthProviderConfig])
-def get_all_oauth_providers(db: Session = Depends(get_db)):
-    return db.exec(select(OAuthProviderConfig)).all()
+async def get_all_oauth_providers(db: AsyncSession = Depends(get_db)):
+    result = await db.exec(select(OAuthProviderConfig))
+    return result.all()
 
 
 # TODO PUT, DELETE
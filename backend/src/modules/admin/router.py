@@ -1,5 +1,11 @@
 from fastapi import APIRouter, Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.database import get_db
+from src.core.etag import conditional_get_stats
 from src.core.security import get_current_superuser
+from src.core.user_cache import user_cache
+from src.modules.idea_box.services.link_jobs import link_job_stats, queue_stats
 from .oauth.router import oauth_router
 
 admin_router = APIRouter(
@@ -7,3 +13,27 @@ admin_router = APIRouter(
 )
 
 admin_router.include_router(oauth_router)
+
+
+@admin_router.get("/stats/user-cache")
+async def get_user_cache_stats():
+    """Размер кэша пользователей и его попадания/промахи в этом процессе."""
+    return user_cache.stats()
+
+
+@admin_router.get("/stats/conditional-gets")
+async def get_conditional_get_stats():
+    """
+    Запросы списков в этом процессе: сколько пришло с If-None-Match и какая
+    доля отдана как 304 без запросов к данным, по наборам и всего.
+    """
+    return conditional_get_stats.stats()
+
+
+@admin_router.get("/stats/link-previews")
+async def get_link_preview_stats(db: AsyncSession = Depends(get_db)):
+    """
+    Очередь превью ссылок: глубина и возраст старейшего задания (по БД, для
+    всех воркеров), счетчики и задержки воркеров этого процесса.
+    """
+    return {"queue": await queue_stats(db), "workers": link_job_stats.stats()}
@@ -1,16 +1,22 @@
 from typing import List
+from urllib.parse import urlencode
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select, or_
+from sqlmodel import select, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.core.oauth import oauth
 from src.core.database import get_db
-from src.core.security import get_password_hash, verify_password, create_access_token
-from src.core.jwt_schemas import TokenData
+from src.core.security import (
+    get_current_user,
+    get_password_hash,
+    verify_and_update_password,
+)
 from src.models import User, OAuthAccount
 
-from .schemas import ProviderInfo, UserCreate, UserPublic, Token
+from .schemas import ProviderInfo, RefreshRequest, UserCreate, UserPublic, Token
+from .tokens import issue_token_pair, revoke_user_tokens, rotate_refresh_token
 
 auth_router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -31,7 +37,9 @@ async def login_via_provider(request: Request, provider: str):
 
 
 @auth_router.get("/{provider}/callback")
-async def auth_callback(request: Request, provider: str, db: Session = Depends(get_db)):
+async def auth_callback(
+    request: Request, provider: str, db: AsyncSession = Depends(get_db)
+):
     if provider not in oauth._clients:
         raise HTTPException(
             status_code=404, detail="Provider not configured or inactive"
@@ -45,76 +53,111 @@ async def auth_callback(request: Request, provider: str, db: Session = Depends(g
     email = user_info["email"]
     provider_account_id = user_info["sub"]
 
-    oauth_account = db.exec(
-        select(OAuthAccount).where(
-            OAuthAccount.provider == provider,
-            OAuthAccount.account_id == provider_account_id,
+    oauth_account = (
+        await db.exec(
+            select(OAuthAccount).where(
+                OAuthAccount.provider == provider,
+                OAuthAccount.account_id == provider_account_id,
+            )
         )
     ).first()
 
     if oauth_account:
-        user = oauth_account.user
+        user = await db.get(User, oauth_account.user_id)
     else:
-        user = db.exec(select(User).where(User.email == email)).first()
+        user = (await db.exec(select(User).where(User.email == email))).first()
         if not user:
             user = User(email=email, username=email)  # Простое создание юзера
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
 
         new_oauth_account = OAuthAccount(
             provider=provider, account_id=provider_account_id, user_id=user.id
         )
         db.add(new_oauth_account)
-        db.commit()
+        await db.commit()
 
-    # ЗАГЛУШКА: Здесь вы должны создать свой JWT токен
-    access_token = f"jwt-token-for-{user.email}"
+    tokens = issue_token_pair(db, user)
+    await db.commit()
 
-    # Редирект на фронтенд с токеном
-    response = RedirectResponse(
-        url=f"http://localhost:3000/auth/callback?token={access_token}"
+    # Редирект на фронтенд с парой токенов
+    query = urlencode(
+        {"token": tokens.access_token, "refresh_token": tokens.refresh_token}
     )
+    response = RedirectResponse(url=f"http://localhost:3000/auth/callback?{query}")
     return response
 
 
 @auth_router.post("/register")
-async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> UserPublic:
-    if db.exec(
+async def register(
+    user_data: UserCreate, db: AsyncSession = Depends(get_db)
+) -> UserPublic:
+    existing = await db.exec(
         select(User).where(
             or_(User.username == user_data.username, User.email == user_data.email)
         )
-    ).first():
+    )
+    if existing.first():
         raise HTTPException(
             status_code=409,
             detail="User with provided email or username already exists",
         )
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
         hashed_password=hashed_password,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return user
 
 
 @auth_router.post("/token", response_model=Token)
 async def get_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = db.exec(
+    result = await db.exec(
         select(User).where(
             or_(User.username == form_data.username, User.email == form_data.username)
         )
-    ).first()
-    if not user:
+    )
+    user = result.first()
+    if not user or not user.hashed_password:
         raise HTTPException(401, "username/email or password are incorrect")
-    if not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = await verify_and_update_password(
+        form_data.password, user.hashed_password
+    )
+    if not verified:
         raise HTTPException(401, "username/email or password are incorrect")
-    token_data = TokenData(username=user.username, email=user.email)
-    token = create_access_token(token_data)
-    return Token(access_token=token, token_type="bearer").model_dump()
+    if new_hash:
+        # Хэш со старыми параметрами Argon2: пересчитываем, пока знаем пароль
+        user.hashed_password = new_hash
+        db.add(user)
+        await db.commit()
+    tokens = issue_token_pair(db, user)
+    await db.commit()
+    return tokens
+
+
+@auth_router.post("/refresh", response_model=Token)
+async def refresh_token(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Обменивает refresh-токен на новую пару токенов без проверки пароля."""
+    return await rotate_refresh_token(db, body.refresh_token)
+
+
+@auth_router.post("/logout-all", status_code=204)
+async def logout_all(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Отзывает все токены пользователя, включая текущий."""
+    user = await db.get(User, current_user.id)
+    user.token_version += 1
+    db.add(user)
+    await revoke_user_tokens(db, user.id)
+    await db.commit()
@@ -1,8 +1,18 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    # Время жизни access-токена в секундах
+    expires_in: Optional[int] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 
 class UserCreate(BaseModel):
     email: str
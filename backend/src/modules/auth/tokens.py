@@ -0,0 +1,140 @@
+"""
+Пары токенов: короткоживущий access-токен (JWT) и ротируемый refresh-токен.
+
+Пароль проверяется только при входе; дальше клиент обновляет access-токен
+через POST /auth/refresh, и на этом пути нет ни Argon2, ни поиска по паролю.
+"""
+
+import hashlib
+import logging
+import secrets
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, status
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.security import create_access_token, token_data_for
+from src.core.utils import get_current_time
+from src.models import RefreshToken, User
+
+from .schemas import Token
+
+logger = logging.getLogger(__name__)
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token_pair(
+    db: AsyncSession, user: User, family_id: Optional[UUID] = None
+) -> Token:
+    """
+    Создает access-токен и новый refresh-токен (в цепочке family_id или в
+    новой). Коммит остается за вызывающим кодом.
+    """
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(
+        RefreshToken(
+            token_hash=hash_refresh_token(refresh_token),
+            family_id=family_id or uuid4(),
+            user_id=user.id,
+            expires_at=get_current_time()
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return Token(
+        access_token=create_access_token(token_data_for(user)),
+        token_type="bearer",
+        refresh_token=refresh_token,
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+
+
+async def revoke_family(db: AsyncSession, family_id: UUID) -> None:
+    await db.exec(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=get_current_time())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: UUID) -> None:
+    await db.exec(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=get_current_time())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rotate_refresh_token(db: AsyncSession, refresh_token: str) -> Token:
+    """
+    Обменивает refresh-токен на новую пару.
+
+    Каждый токен обменивается один раз. Предъявление уже обмененного токена
+    значит, что его скопировал кто-то еще: отзываем всю цепочку, и владельцу
+    придется войти заново.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    now = get_current_time()
+    stored = (
+        await db.exec(
+            select(RefreshToken).where(
+                RefreshToken.token_hash == hash_refresh_token(refresh_token)
+            )
+        )
+    ).first()
+    if not stored or stored.revoked_at is not None:
+        raise invalid
+
+    # Условный UPDATE: из двух одновременных обменов пройдет только один
+    claimed = await db.exec(
+        update(RefreshToken)
+        .where(
+            RefreshToken.id == stored.id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        # Не истек - значит, уже обменян: здесь или в параллельном запросе
+        if not await _is_expired(db, stored.id):
+            logger.warning(
+                "Refresh token reuse detected, revoking family",
+                extra={"user_id": stored.user_id, "family_id": stored.family_id},
+            )
+            await revoke_family(db, stored.family_id)
+            await db.commit()
+        raise invalid
+
+    user = await db.get(User, stored.user_id)
+    if not user or not user.is_active:
+        await db.rollback()
+        raise invalid
+    token = issue_token_pair(db, user, stored.family_id)
+    await db.commit()
+    return token
+
+
+async def _is_expired(db: AsyncSession, token_id: UUID) -> bool:
+    # Сравнение в SQL: SQLite хранит время без часового пояса
+    expired = await db.exec(
+        select(RefreshToken.id).where(
+            RefreshToken.id == token_id,
+            RefreshToken.expires_at <= get_current_time(),
+        )
+    )
+    return expired.first() is not None
@@ -0,0 +1,46 @@
+"""
+Свободное и занятое время: склейка интервалов событий.
+
+Интервалы приходят отсортированными по началу (из индекса и из слияния с
+развернутыми повторами), поэтому и склейка, и поиск окон идут за один проход.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable
+
+Interval = tuple[datetime, datetime]
+
+
+def busy_blocks(
+    intervals: Iterable[Interval], window_start: datetime, window_end: datetime
+) -> list[Interval]:
+    """Склеивает пересекающиеся и смежные интервалы в пределах окна."""
+    blocks: list[Interval] = []
+    for start, end in intervals:
+        start, end = max(start, window_start), min(end, window_end)
+        if start >= end:
+            continue
+        if blocks and start <= blocks[-1][1]:
+            if end > blocks[-1][1]:
+                blocks[-1] = (blocks[-1][0], end)
+        else:
+            blocks.append((start, end))
+    return blocks
+
+
+def free_slots(
+    busy: Iterable[Interval],
+    window_start: datetime,
+    window_end: datetime,
+    min_duration: timedelta,
+) -> list[Interval]:
+    """Промежутки между занятыми блоками не короче min_duration."""
+    slots: list[Interval] = []
+    free_from = window_start
+    for start, end in busy:
+        if start - free_from >= min_duration:
+            slots.append((free_from, start))
+        free_from = max(free_from, end)
+    if window_end - free_from >= min_duration:
+        slots.append((free_from, window_end))
+    return slots
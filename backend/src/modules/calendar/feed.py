@@ -0,0 +1,163 @@
+"""
+ICS-лента календаря пользователя для подписки из календарных приложений.
+
+Приложения опрашивают ленту каждые несколько минут. Ответ помечается ETag из
+версии календаря (см. models/version.py), и неизмененная лента отдается как
+304 после одного запроса: токен, пользователь и версия. Измененная лента
+строится потоком из курсоров по событиям и задачам.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlmodel import and_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.database import get_db
+from src.core.etag import etag_matches, make_etag, not_modified
+from src.models import (
+    CalendarEvent,
+    CalendarFeedToken,
+    CollectionVersion,
+    Task,
+    User,
+)
+from src.models.version import CALENDAR_COLLECTION
+
+from . import ics
+from .recurrence import local_zone
+
+# Меняется вместе с форматом ленты, чтобы клиенты не держали старый по ETag
+FEED_FORMAT = 1
+# Строк из курсора БД за одну выборку
+FEED_BATCH_SIZE = 500
+FEED_CACHE_CONTROL = "private, no-cache"
+# DTSTAMP ленты без единого изменения (в ней и нет компонентов)
+EPOCH = datetime(1970, 1, 1)
+
+calendar_feed_router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+
+def hash_feed_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def _feed_rows(db: AsyncSession, owner_id: UUID, stamp: datetime):
+    tz = local_zone()
+    yield ics.calendar_header("Ascend", tz)
+    events = await db.stream(
+        select(
+            CalendarEvent.id,
+            CalendarEvent.title,
+            CalendarEvent.description,
+            CalendarEvent.start_time,
+            CalendarEvent.end_time,
+            CalendarEvent.rrule,
+            CalendarEvent.exdates,
+            CalendarEvent.series_id,
+            CalendarEvent.recurrence_id,
+        )
+        .where(CalendarEvent.owner_id == owner_id)
+        .order_by(CalendarEvent.start_time, CalendarEvent.id)
+        .execution_options(yield_per=FEED_BATCH_SIZE)
+    )
+    async for row in events:
+        yield ics.vevent(
+            uid=str(row.series_id or row.id),
+            stamp=stamp,
+            title=row.title,
+            description=row.description,
+            start_time=row.start_time,
+            end_time=row.end_time,
+            rrule=row.rrule,
+            exdates=row.exdates,
+            recurrence_id=row.recurrence_id,
+            tz=tz,
+        )
+    tasks = await db.stream(
+        select(
+            Task.id,
+            Task.title,
+            Task.description,
+            Task.due_date,
+            Task.status,
+            Task.priority,
+        )
+        .where(Task.owner_id == owner_id, Task.due_date.is_not(None))
+        .order_by(Task.due_date, Task.id)
+        .execution_options(yield_per=FEED_BATCH_SIZE)
+    )
+    async for row in tasks:
+        yield ics.vtodo(
+            uid=str(row.id),
+            stamp=stamp,
+            title=row.title,
+            description=row.description,
+            due=row.due_date,
+            status=row.status,
+            priority=row.priority,
+            tz=tz,
+        )
+    yield ics.calendar_footer()
+
+
+@calendar_feed_router.get(
+    "/feed.ics",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/calendar": {}}},
+        304: {"description": "Календарь не менялся с версии из If-None-Match"},
+    },
+)
+async def get_calendar_feed(
+    request: Request,
+    token: str = Query(..., description="Секрет из POST /calendar/feed-token"),
+    db: AsyncSession = Depends(get_db),
+):
+    """События и задачи с дедлайном в формате iCalendar."""
+    found = (
+        await db.exec(
+            select(
+                CalendarFeedToken.owner_id,
+                CollectionVersion.version,
+                CollectionVersion.updated_at,
+            )
+            .join(User, User.id == CalendarFeedToken.owner_id)
+            .outerjoin(
+                CollectionVersion,
+                and_(
+                    CollectionVersion.owner_id == CalendarFeedToken.owner_id,
+                    CollectionVersion.collection == CALENDAR_COLLECTION,
+                ),
+            )
+            .where(
+                CalendarFeedToken.token_hash == hash_feed_token(token),
+                User.is_active == True,  # noqa: E712
+            )
+        )
+    ).first()
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Calendar feed not found"
+        )
+    owner_id, version, updated_at = found
+    stamp = updated_at or EPOCH
+    etag = make_etag(FEED_FORMAT, version or 0)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": FEED_CACHE_CONTROL,
+        "Last-Modified": format_datetime(
+            stamp.replace(tzinfo=timezone.utc), usegmt=True
+        ),
+    }
+    if etag_matches(request, etag):
+        return not_modified(etag, headers)
+    return StreamingResponse(
+        _feed_rows(db, owner_id, stamp),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
+    )
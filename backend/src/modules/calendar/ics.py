@@ -0,0 +1,323 @@
+"""
+Сериализация календаря в iCalendar (RFC 5545) и потоковый разбор чужих
+календарей.
+
+Компоненты собираются и разбираются по одному: ни лента, ни загружаемый
+календарь не держатся в памяти целиком. Время событий хранится без пояса в
+settings.TIMEZONE и выводится с TZID этого пояса (в UTC - с суффиксом Z).
+Описания поясов
+(VTIMEZONE) не выводятся: календарные приложения знают пояса IANA по имени.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from src.models.task import TaskPriority, TaskStatus
+
+CRLF = "\r\n"
+# Длина строки без CRLF в октетах, дальше строка переносится
+LINE_LIMIT = 75
+
+PRODID = "-//Ascend//Calendar feed//RU"
+
+TODO_STATUS = {
+    TaskStatus.TODO: "NEEDS-ACTION",
+    TaskStatus.IN_PROGRESS: "IN-PROCESS",
+    TaskStatus.DONE: "COMPLETED",
+}
+# В iCalendar 1 - наивысший приоритет, 9 - наинизший
+TODO_PRIORITY = {TaskPriority.HIGH: 1, TaskPriority.MEDIUM: 5, TaskPriority.LOW: 9}
+
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """Переносит строку длиннее 75 октетов, не разрывая символы UTF-8."""
+    if len(line.encode()) <= LINE_LIMIT:
+        return line
+    parts, current, size = [], [], 0
+    for char in line:
+        width = len(char.encode())
+        # У продолжения первый октет - пробел
+        if size + width > (LINE_LIMIT if not parts else LINE_LIMIT - 1):
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return (CRLF + " ").join(parts)
+
+
+def _is_utc(tz: ZoneInfo) -> bool:
+    return tz.key in ("UTC", "Etc/UTC")
+
+
+def format_utc(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _format_local(value: datetime, tz: ZoneInfo) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ" if _is_utc(tz) else "%Y%m%dT%H%M%S")
+
+
+def _time_property(name: str, values: Iterable[datetime], tz: ZoneInfo) -> str:
+    params = "" if _is_utc(tz) else f";TZID={tz.key}"
+    moments = ",".join(_format_local(value, tz) for value in values)
+    return f"{name}{params}:{moments}"
+
+
+def component(name: str, lines: Iterable[Optional[str]]) -> str:
+    """Компонент BEGIN/END с уже собранными строками (None пропускаются)."""
+    body = [f"BEGIN:{name}", *(line for line in lines if line), f"END:{name}"]
+    return CRLF.join(fold(line) for line in body) + CRLF
+
+
+def calendar_header(name: str, tz: ZoneInfo) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+        f"X-WR-TIMEZONE:{tz.key}",
+    ]
+    return CRLF.join(fold(line) for line in lines) + CRLF
+
+
+def calendar_footer() -> str:
+    return "END:VCALENDAR" + CRLF
+
+
+def vevent(
+    *,
+    uid: str,
+    stamp: datetime,
+    title: str,
+    description: Optional[str],
+    start_time: datetime,
+    end_time: datetime,
+    rrule: Optional[str],
+    exdates: Iterable[str],
+    recurrence_id: Optional[datetime],
+    tz: ZoneInfo,
+) -> str:
+    # Измененный повтор - VEVENT с UID серии и RECURRENCE-ID повтора
+    exdates = [datetime.fromisoformat(value) for value in exdates]
+    return component(
+        "VEVENT",
+        [
+            f"UID:{uid}",
+            f"DTSTAMP:{format_utc(stamp)}",
+            recurrence_id and _time_property("RECURRENCE-ID", [recurrence_id], tz),
+            _time_property("DTSTART", [start_time], tz),
+            _time_property("DTEND", [end_time], tz),
+            f"SUMMARY:{escape_text(title)}",
+            description and f"DESCRIPTION:{escape_text(description)}",
+            rrule and f"RRULE:{rrule}",
+            exdates and _time_property("EXDATE", sorted(exdates), tz),
+        ],
+    )
+
+
+def vtodo(
+    *,
+    uid: str,
+    stamp: datetime,
+    title: str,
+    description: Optional[str],
+    due: datetime,
+    status: TaskStatus,
+    priority: TaskPriority,
+    tz: ZoneInfo,
+) -> str:
+    return component(
+        "VTODO",
+        [
+            f"UID:{uid}",
+            f"DTSTAMP:{format_utc(stamp)}",
+            _time_property("DUE", [due], tz),
+            f"SUMMARY:{escape_text(title)}",
+            description and f"DESCRIPTION:{escape_text(description)}",
+            f"STATUS:{TODO_STATUS[status]}",
+            f"PRIORITY:{TODO_PRIORITY[priority]}",
+        ],
+    )
+
+
+# --- Разбор ---
+
+PROPERTY_NAME = re.compile(r"[A-Za-z0-9-]+")
+PARAMETER = re.compile(r';([A-Za-z0-9-]+)=("[^"]*"(?:,"[^"]*")*|[^;:]*)')
+ESCAPED = re.compile(r"\\([\\;,nN])")
+DURATION = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+
+
+class EventReader:
+    """
+    Потоковый разбор календаря: строки подаются по одной, и на END:VEVENT
+    возвращаются склеенные строки свойств события. Вложенные компоненты
+    (VALARM) и все, кроме VEVENT, пропускаются.
+    """
+
+    def __init__(self):
+        self._pending: Optional[str] = None
+        self._stack: list[str] = []
+        self._properties: list[str] = []
+        # Календарь дочитан до END:VCALENDAR, а не оборван на середине
+        self.complete = False
+
+    def feed(self, line: str) -> Optional[list[str]]:
+        line = line.rstrip("\r\n")
+        # Продолжение перенесенной строки начинается с пробела или табуляции
+        if line[:1] in (" ", "\t"):
+            if self._pending is not None:
+                self._pending += line[1:]
+            return None
+        pending, self._pending = self._pending, line
+        return self._process(pending)
+
+    def close(self) -> Optional[list[str]]:
+        pending, self._pending = self._pending, None
+        return self._process(pending)
+
+    def _process(self, line: Optional[str]) -> Optional[list[str]]:
+        if not line:
+            return None
+        name, _, value = line.partition(":")
+        name = name.upper()
+        if name == "BEGIN":
+            self._stack.append(value.strip().upper())
+            if self._stack[-1] == "VEVENT":
+                self._properties = []
+            return None
+        if name == "END":
+            component = self._stack.pop() if self._stack else None
+            if component == "VCALENDAR":
+                self.complete = True
+            return self._properties if component == "VEVENT" else None
+        if self._stack and self._stack[-1] == "VEVENT":
+            self._properties.append(line)
+        return None
+
+
+def parse_property(line: str) -> tuple[str, dict[str, str], str]:
+    """Имя, параметры и значение строки свойства: NAME;PARAM=x:value."""
+    name = PROPERTY_NAME.match(line)
+    if name is None:
+        raise ValueError(f"Malformed content line: {line[:80]!r}")
+    params, position = {}, name.end()
+    while line.startswith(";", position):
+        param = PARAMETER.match(line, position)
+        if param is None:
+            raise ValueError(f"Malformed parameter: {line[:80]!r}")
+        params[param.group(1).upper()] = param.group(2).strip('"')
+        position = param.end()
+    if not line.startswith(":", position):
+        raise ValueError(f"Malformed content line: {line[:80]!r}")
+    return name.group(0).upper(), params, line[position + 1 :]
+
+
+def unescape_text(value: str) -> str:
+    return ESCAPED.sub(
+        lambda match: "\n" if match.group(1) in "nN" else match.group(1), value
+    )
+
+
+def parse_time(value: str, params: dict[str, str], tz: ZoneInfo) -> datetime:
+    """
+    DATE или DATE-TIME как местное время tz без пояса. Время в UTC и с TZID
+    переводится в tz; плавающее время и неизвестные TZID (имена Windows,
+    собственные VTIMEZONE) считаются временем tz. Дата - это полночь.
+    """
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d")
+    moment = datetime.strptime(value.rstrip("Zz"), "%Y%m%dT%H%M%S")
+    if value[-1] in "Zz":
+        source = timezone.utc
+    else:
+        try:
+            source = ZoneInfo(params["TZID"]) if "TZID" in params else None
+        except (ZoneInfoNotFoundError, ValueError):
+            source = None
+    if source is None:
+        return moment
+    return moment.replace(tzinfo=source).astimezone(tz).replace(tzinfo=None)
+
+
+def parse_duration(value: str) -> timedelta:
+    match = DURATION.match(value.strip())
+    if match is None:
+        raise ValueError(f"Malformed duration: {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(
+        weeks=int(weeks or 0),
+        days=int(days or 0),
+        hours=int(hours or 0),
+        minutes=int(minutes or 0),
+        seconds=int(seconds or 0),
+    )
+    return -duration if sign == "-" else duration
+
+
+def parse_event(lines: Iterable[str], tz: ZoneInfo) -> Optional[dict]:
+    """
+    Поля события из строк VEVENT (см. EventReader). None - отмененное
+    событие (STATUS:CANCELLED), его в календаре как бы нет. ValueError -
+    если нет UID или DTSTART либо значения некорректны.
+    """
+    fields = {"exdates": []}
+    duration = None
+    all_day = False
+    for line in lines:
+        name, params, value = parse_property(line)
+        if name == "UID":
+            fields["uid"] = value.strip()
+        elif name == "SUMMARY":
+            fields["title"] = unescape_text(value)
+        elif name == "DESCRIPTION":
+            fields["description"] = unescape_text(value)
+        elif name == "DTSTART":
+            fields["start_time"] = parse_time(value, params, tz)
+            all_day = params.get("VALUE") == "DATE" or len(value.strip()) == 8
+        elif name == "DTEND":
+            fields["end_time"] = parse_time(value, params, tz)
+        elif name == "DURATION":
+            duration = parse_duration(value)
+        elif name == "RECURRENCE-ID":
+            fields["recurrence_id"] = parse_time(value, params, tz)
+        elif name == "RRULE":
+            fields.setdefault("rrule", value.strip())
+        elif name == "EXDATE":
+            fields["exdates"] += [
+                parse_time(moment, params, tz).isoformat()
+                for moment in value.split(",")
+            ]
+        elif name == "STATUS" and value.strip().upper() == "CANCELLED":
+            return None
+    if not fields.get("uid") or "start_time" not in fields:
+        raise ValueError("VEVENT without UID or DTSTART")
+    if "end_time" not in fields:
+        # RFC 5545, 3.6.1: без DTEND и DURATION событие на дату длится день,
+        # а событие со временем - мгновение
+        if duration is None:
+            duration = timedelta(days=1) if all_day else timedelta(0)
+        fields["end_time"] = fields["start_time"] + duration
+    if fields["end_time"] < fields["start_time"]:
+        raise ValueError("VEVENT ends before it starts")
+    fields.setdefault("title", "")
+    return fields
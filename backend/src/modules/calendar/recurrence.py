@@ -0,0 +1,360 @@
+"""
+Повторяющиеся события: разбор RRULE и развертывание серии в окне календаря.
+
+Серия хранится одной строкой, а ее повторы вычисляются лениво - только для
+запрошенного окна - и кэшируются по серии и окну. Время в БД хранится без
+пояса, это время в settings.TIMEZONE, и правило разворачивается по часам
+этого пояса: встреча в 10:00 остается в 10:00 и после перевода часов.
+Длительность повтора точная (RFC 5545, 3.8.5.3), конец считается через UTC.
+
+Стоимость развертывания ограничена: частота не чаще DAILY и не больше одного
+повтора в день (BYHOUR/BYMINUTE/BYSECOND с одним значением), INTERVAL не
+меньше 1, COUNT не больше CALENDAR_MAX_RULE_COUNT, а серии без COUNT перед
+развертыванием переносят начало к окну целым числом периодов, поэтому
+бесконечная серия не перебирается с самого начала. Окно, в котором у серии
+больше CALENDAR_MAX_OCCURRENCES повторов или которое длиннее
+CALENDAR_RULE_HORIZON_YEARS, отклоняется.
+
+dateutil останавливает перебор только на повторе (проверка UNTIL и COUNT)
+или на последнем годе календаря, поэтому правило, которое не дает ни одного
+повтора (FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30), перебирается до 9999 года
+при любом UNTIL. Такие правила отклоняются: первый повтор должен быть не
+дальше CALENDAR_RULE_HORIZON_YEARS от начала серии. Календарь повторяется,
+поэтому у правила с повтором и следующие повторы идут с ограниченным
+разрывом, а перебор останавливается на первом повторе после окна.
+"""
+
+import calendar
+import re
+import threading
+from collections import OrderedDict
+from datetime import MAXYEAR, date, datetime, timedelta, timezone
+from functools import lru_cache
+from math import gcd
+from typing import Hashable, Iterator, Optional
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import DAILY, WEEKLY, YEARLY, rrule, rrulestr
+
+from src.core.config import settings
+from src.models import CalendarEvent
+
+# Начало и конец одного повтора, местное время без пояса
+Occurrence = tuple[datetime, datetime]
+
+# UNTIL в UTC, как его пишут клиенты, при начале серии без пояса
+UTC_UNTIL = re.compile(r"UNTIL=(\d{8}T\d{6})Z", re.I)
+ICS_DATETIME = "%Y%m%dT%H%M%S"
+
+
+class TooManyOccurrences(ValueError):
+    """Серия разворачивается в слишком много повторов или в слишком длинном окне."""
+
+
+class OccurrenceCache:
+    """
+    LRU-кэш развернутых повторов. Ключ включает правило, время и исключения
+    серии, поэтому изменение серии просто дает новый ключ, а старая запись
+    вытесняется со временем.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, tuple[Occurrence, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[tuple[Occurrence, ...]]:
+        with self._lock:
+            occurrences = self._entries.get(key)
+            if occurrences is not None:
+                self._entries.move_to_end(key)
+            return occurrences
+
+    def put(self, key: Hashable, occurrences: tuple[Occurrence, ...]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = occurrences
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+occurrence_cache = OccurrenceCache(settings.CALENDAR_OCCURRENCE_CACHE_SIZE)
+
+
+def local_zone() -> ZoneInfo:
+    return ZoneInfo(settings.TIMEZONE)
+
+
+def normalize_rule(value: str) -> str:
+    """RRULE без префикса "RRULE:" и пробелов по краям."""
+    value = value.strip()
+    if value[:6].upper() == "RRULE:":
+        value = value[6:]
+    return value
+
+
+def _year_kind(year: int) -> tuple[int, bool]:
+    return date(year, 1, 1).weekday(), calendar.isleap(year)
+
+
+@lru_cache(maxsize=1024)
+def _probe_shift(year: int, years: int) -> int:
+    """
+    Сдвиг в годах, после которого годы year..year+years приходятся на конец
+    календаря и устроены так же: те же дни недели и високосные годы.
+    Сдвиг на 400 лет - полный цикл григорианского календаря - подходит
+    всегда, обычно подходящий год находится в пределах 28 лет от конца.
+    """
+    kinds = [_year_kind(year + offset) for offset in range(years + 1)]
+    last = MAXYEAR - years
+    for target in range(last, last - 400, -1):
+        if all(
+            _year_kind(target + offset) == kind for offset, kind in enumerate(kinds)
+        ):
+            return target - year
+    raise AssertionError("400-year cycle must match")
+
+
+def _occurs_within(rule: rrule, years: int) -> bool:
+    """
+    Есть ли у правила повтор в пределах years лет от начала серии. Правило
+    переносится на такие же годы в конце календаря, где перебор dateutil
+    кончается сам, поэтому и правило без повторов проверяется быстро.
+    """
+    dtstart = rule._dtstart
+    years = min(years, MAXYEAR - dtstart.year)
+    shifted = dtstart.replace(year=dtstart.year + _probe_shift(dtstart.year, years))
+    first = next(iter(rule.replace(dtstart=shifted, count=None, until=None)), None)
+    return first is not None and first.year <= shifted.year + years
+
+
+def parse_rule(value: str, dtstart: datetime, tz: Optional[ZoneInfo] = None) -> rrule:
+    """
+    Разбирает RRULE серии, начинающейся в dtstart. ValueError - если правило
+    некорректно или его развертывание не ограничено по стоимости.
+    """
+    tz = tz or local_zone()
+
+    def until_to_local(match: re.Match) -> str:
+        moment = datetime.strptime(match.group(1), ICS_DATETIME)
+        local = moment.replace(tzinfo=timezone.utc).astimezone(tz)
+        return "UNTIL=" + local.strftime(ICS_DATETIME)
+
+    value = UTC_UNTIL.sub(until_to_local, normalize_rule(value))
+    try:
+        rule = rrulestr(value, dtstart=dtstart.replace(tzinfo=None))
+    except (TypeError, ValueError) as error:
+        # Без FREQ dateutil бросает TypeError
+        raise ValueError(f"Invalid RRULE: {error}") from None
+    if not isinstance(rule, rrule):
+        raise ValueError("Only a single RRULE is supported")
+    if rule._freq > DAILY:
+        raise ValueError("Events cannot repeat more often than daily")
+    # Без BYHOUR/BYMINUTE/BYSECOND dateutil берет их из dtstart - по одному
+    # значению; несколько значений - несколько повторов в день
+    times = (rule._byhour, rule._byminute, rule._bysecond)
+    if any(values and len(values) > 1 for values in times):
+        raise ValueError("Events cannot repeat more than once a day")
+    if rule._interval < 1:
+        raise ValueError("INTERVAL must be at least 1")
+    if rule._count and rule._count > settings.CALENDAR_MAX_RULE_COUNT:
+        raise ValueError(f"COUNT must not exceed {settings.CALENDAR_MAX_RULE_COUNT}")
+    # Дата Пасхи не повторяется с календарем, на котором держится проверка
+    # первого повтора; в RFC 5545 BYEASTER нет
+    if rule._byeaster:
+        raise ValueError("BYEASTER is not supported")
+    horizon = settings.CALENDAR_RULE_HORIZON_YEARS
+    if not _occurs_within(rule, horizon):
+        raise ValueError(f"RRULE has no occurrences within {horizon} years")
+    return rule
+
+
+def _to_utc(value: datetime, tz: ZoneInfo) -> datetime:
+    return value.replace(tzinfo=tz).astimezone(timezone.utc)
+
+
+def _resolve(wall: datetime, tz: ZoneInfo) -> datetime:
+    """
+    Местное время повтора с учетом перевода часов (RFC 5545, 3.3.5): время в
+    разрыве весной сдвигается вперед на величину разрыва, неоднозначное
+    осенью берется первым.
+    """
+    return _to_utc(wall, tz).astimezone(tz).replace(tzinfo=None)
+
+
+def _duration(event: CalendarEvent, tz: ZoneInfo) -> timedelta:
+    return _to_utc(event.end_time, tz) - _to_utc(event.start_time, tz)
+
+
+def _end(start: datetime, duration: timedelta, tz: ZoneInfo) -> datetime:
+    return (_to_utc(start, tz) + duration).astimezone(tz).replace(tzinfo=None)
+
+
+def _skip_to(rule: rrule, moment: datetime) -> rrule:
+    """
+    Переносит начало серии без COUNT к moment на целое число периодов:
+    повторы после moment не меняются, а dateutil не перебирает всю историю
+    серии. MONTHLY/YEARLY переносятся на целые годы, чтобы месяц и число
+    начала, от которых dateutil берет недостающие BYMONTH/BYMONTHDAY,
+    остались прежними.
+    """
+    if rule._count:
+        return rule
+    dtstart = rule._dtstart
+    if rule._freq in (DAILY, WEEKLY):
+        period = timedelta(days=rule._interval * (7 if rule._freq == WEEKLY else 1))
+        periods = (moment - dtstart) // period - 1
+        if periods <= 0:
+            return rule
+        return rule.replace(dtstart=dtstart + periods * period)
+    if rule._freq == YEARLY:
+        step = rule._interval
+    else:
+        step = rule._interval // gcd(rule._interval, 12)
+    periods = (moment.year - dtstart.year) // step - 1
+    while periods > 0:
+        try:
+            return rule.replace(
+                dtstart=dtstart.replace(year=dtstart.year + periods * step)
+            )
+        except ValueError:
+            # 29 февраля в невисокосном году
+            periods -= 1
+    return rule
+
+
+def _walk(
+    event: CalendarEvent, rule: rrule, since: datetime, stop: datetime, tz: ZoneInfo
+) -> Iterator[Occurrence]:
+    """
+    Повторы серии, начинающиеся в [since, stop), без исключенных EXDATE.
+    Перебор кончается на первом повторе не раньше stop, а не на конце
+    правила.
+    """
+    duration = _duration(event, tz)
+    excluded = {datetime.fromisoformat(value) for value in event.exdates}
+    for wall in rule.xafter(since, inc=True):
+        start = _resolve(wall, tz)
+        if start >= stop:
+            return
+        if start in excluded:
+            continue
+        yield start, _end(start, duration, tz)
+
+
+def expand(
+    event: CalendarEvent,
+    window_start: datetime,
+    window_end: datetime,
+    tz: Optional[ZoneInfo] = None,
+) -> tuple[Occurrence, ...]:
+    """
+    Повторы серии, пересекающие окно [window_start, window_end), по
+    возрастанию начала. TooManyOccurrences - если их больше
+    CALENDAR_MAX_OCCURRENCES или окно длиннее CALENDAR_RULE_HORIZON_YEARS.
+    """
+    tz = tz or local_zone()
+    horizon = settings.CALENDAR_RULE_HORIZON_YEARS
+    if window_end - window_start > timedelta(days=366 * horizon):
+        raise TooManyOccurrences(
+            f"Recurring events cannot be expanded in a window over {horizon} years"
+        )
+    key = (
+        event.id,
+        event.rrule,
+        event.start_time,
+        event.end_time,
+        tuple(event.exdates),
+        window_start,
+        window_end,
+        tz.key,
+    )
+    cached = occurrence_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Повтор, начавшийся до окна, может заходить в него; сутки запаса - на
+    # сдвиг времени в разрыве при переводе часов
+    since = window_start - _duration(event, tz) - timedelta(days=1)
+    rule = _skip_to(parse_rule(event.rrule, event.start_time, tz), since)
+    occurrences = []
+    for start, end in _walk(event, rule, since, window_end, tz):
+        if end <= window_start:
+            continue
+        occurrences.append((start, end))
+        if len(occurrences) > settings.CALENDAR_MAX_OCCURRENCES:
+            raise TooManyOccurrences(
+                f"Recurring event {event.id} has more than "
+                f"{settings.CALENDAR_MAX_OCCURRENCES} occurrences in the window"
+            )
+    result = tuple(occurrences)
+    occurrence_cache.put(key, result)
+    return result
+
+
+def find_occurrence(
+    event: CalendarEvent, moment: datetime, tz: Optional[ZoneInfo] = None
+) -> Optional[Occurrence]:
+    """Повтор серии, начинающийся ровно в moment (исключенные не считаются)."""
+    tz = tz or local_zone()
+    try:
+        rule = parse_rule(event.rrule, event.start_time, tz)
+    except ValueError:
+        # Правило, сохраненное до нынешних проверок: как и в календаре,
+        # у серии один повтор - первый
+        first = (event.start_time, event.end_time)
+        return first if moment == event.start_time else None
+    since = moment - timedelta(days=1)
+    rule = _skip_to(rule, since)
+    for start, end in _walk(event, rule, since, moment + timedelta(days=1), tz):
+        if start >= moment:
+            return (start, end) if start == moment else None
+    return None
+
+
+def _last_counted(rule: rrule, years: int) -> Optional[datetime]:
+    """
+    Последний повтор правила с COUNT не дальше years лет от начала. Не
+    rule.before(datetime.max): после последнего повтора dateutil ищет еще
+    один, чтобы проверить COUNT, а у редкого правила поиск идет веками.
+    """
+    try:
+        limit = rule._dtstart + timedelta(days=366 * years)
+    except OverflowError:
+        limit = datetime.max
+    last = None
+    for index, wall in enumerate(rule, 1):
+        if wall > limit:
+            raise ValueError(f"Recurring event must end within {years} years")
+        last = wall
+        if index == rule._count:
+            break
+    return last
+
+
+def series_end(
+    event: CalendarEvent, tz: Optional[ZoneInfo] = None
+) -> Optional[datetime]:
+    """
+    Конец последнего повтора серии; None - если серия бесконечна. ValueError -
+    если правило некорректно или серия с COUNT кончается позже
+    CALENDAR_MAX_SERIES_YEARS от начала.
+    """
+    tz = tz or local_zone()
+    rule = parse_rule(event.rrule, event.start_time, tz)
+    if rule._count:
+        last = _last_counted(rule, settings.CALENDAR_MAX_SERIES_YEARS)
+    elif rule._until:
+        last = _skip_to(rule, rule._until).before(rule._until, inc=True)
+    else:
+        return None
+    if last is None:
+        # Правило не дает ни одного повтора: серия заканчивается с первым
+        return event.end_time
+    return _end(_resolve(last, tz), _duration(event, tz), tz)
@@ -1,113 +1,805 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from src.core.security import get_current_user
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from src.core.security import get_current_user_id, get_read_db
 from src.core.database import get_db
-from src.models import User, Task, CalendarEvent
-from sqlmodel import Session, select, and_
-from datetime import date
+from src.core.etag import check_not_modified
+from src.core.responses import json_response, row_columns
+from src.core.pagination import (
+    PageParams,
+    SortKey,
+    count_total,
+    cursor_after,
+    decode_cursor,
+    encode_cursor,
+    fetch_after,
+)
+from src.models import (
+    Task,
+    CalendarEvent,
+    CalendarFeedToken,
+    CalendarSource,
+    CalendarSubscription,
+    RemoteEvent,
+)
+from src.models.calendar import LONG_EVENT
+from src.models.version import CALENDAR_COLLECTION
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import Uuid, literal, null
+from sqlmodel import delete, select, and_, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import date, datetime, time, timedelta
+from collections import defaultdict
+from dataclasses import fields
+import heapq
+import httpx
+import secrets
+from typing import List, Optional
+from .availability import busy_blocks, free_slots
+from .feed import hash_feed_token
+from .subscriptions import BlockedAddress, check_feed_host, remove_orphan_source
+from .recurrence import TooManyOccurrences, expand, find_occurrence, series_end
+from src.modules.tasks.schemas import TaskRow
 from .schemas import (
     CalendarViewResponse,
+    CalendarEventRow,
     CalendarEventCreate,
     CalendarEventPublic,
     CalendarEventUpdate,
+    CalendarEventWithConflicts,
+    CalendarFeedLink,
+    CalendarOccurrenceUpdate,
+    CalendarSubscriptionCreate,
+    CalendarSubscriptionPublic,
+    FreeBusyResponse,
 )
-from uuid import UUID
+from uuid import UUID, uuid4
 
 calendar_router = APIRouter(
     prefix="/calendar",
     tags=["calendar", "events"],
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_user_id)],
+)
+
+EVENT_SORT = (
+    SortKey(CalendarEvent.start_time, "start_time"),
+    SortKey(CalendarEvent.id, "id"),
 )
+DUE_TASK_SORT = (SortKey(Task.due_date, "due_date"), SortKey(Task.id, "id"))
+REMOTE_EVENT_SORT = (
+    SortKey(RemoteEvent.start_time, "start_time"),
+    SortKey(RemoteEvent.id, "id"),
+)
+# Колонки строк вида календаря (см. core/responses.py)
+EVENT_ROW_COLUMNS = row_columns(CalendarEventRow, CalendarEvent, subscription_id=null())
+EVENT_ROW_FIELDS = [field.name for field in fields(CalendarEventRow)]
+DUE_TASK_COLUMNS = row_columns(TaskRow, Task)
+# Поля события, которые явный null в PUT сбрасывает
+NULLABLE_EVENT_FIELDS = {"description", "task_id", "rrule"}
+
+
+def _short_filter(model, window_start: datetime, window_end: datetime):
+    """
+    Условия для одиночных событий не длиннее LONG_EVENT (и измененных
+    повторов), пересекающих окно. Их начало не раньше window_start -
+    LONG_EVENT, поэтому диапазон индекса (владелец, start_time) ограничен
+    с обеих сторон. model - CalendarEvent или RemoteEvent.
+    """
+    return (
+        model.rrule.is_(None),
+        model.is_long == False,  # noqa: E712
+        model.start_time >= window_start - LONG_EVENT,
+        model.start_time < window_end,
+        model.end_time > window_start,
+    )
+
+
+def _short_event_filter(owner_id: UUID, window_start: datetime, window_end: datetime):
+    return (
+        CalendarEvent.owner_id == owner_id,
+        *_short_filter(CalendarEvent, window_start, window_end),
+    )
+
+
+def _expand_series(series, window_start: datetime, window_end: datetime) -> dict:
+    """Повторы каждой серии в окне по id серии."""
+    expanded = {}
+    for event in series:
+        try:
+            expanded[event.id] = expand(event, window_start, window_end)
+        except TooManyOccurrences as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+        except ValueError:
+            # Правило, сохраненное до нынешних проверок: серия видна своим
+            # первым повтором, чтобы ее можно было исправить
+            first = (event.start_time, event.end_time)
+            overlaps = first[0] < window_end and first[1] > window_start
+            expanded[event.id] = (first,) if overlaps else ()
+    return expanded
+
+
+def _series_end(event: CalendarEvent) -> Optional[datetime]:
+    """Конец серии для recurrence_end; 422 - если серию нельзя развернуть."""
+    try:
+        return series_end(event)
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(error)
+        )
+
+
+def _occurrence_copies(template: CalendarEventPublic, event, occurrences, replaced):
+    """Повторы серии как события, кроме замененных измененными."""
+    return [
+        template.model_copy(
+            update={
+                "start_time": start,
+                "end_time": end,
+                "series_id": event.id,
+                "recurrence_id": start,
+            }
+        )
+        for start, end in occurrences
+        if start not in replaced
+    ]
+
+
+async def _series_occurrences(
+    db: AsyncSession, owner_id: UUID, window_start: datetime, window_end: datetime
+) -> List[CalendarEventPublic]:
+    """Повторы серий пользователя в окне, кроме замененных измененными."""
+    series = (
+        await db.exec(
+            select(CalendarEvent).where(
+                CalendarEvent.owner_id == owner_id,
+                CalendarEvent.rrule.is_not(None),
+                CalendarEvent.start_time < window_end,
+                or_(
+                    CalendarEvent.recurrence_end.is_(None),
+                    CalendarEvent.recurrence_end > window_start,
+                ),
+            )
+        )
+    ).all()
+    expanded = _expand_series(series, window_start, window_end)
+    starts = [start for pairs in expanded.values() for start, _ in pairs]
+    if not starts:
+        return []
+    # Измененные повторы - обычные события, их отдают запросы одиночных
+    replaced = defaultdict(set)
+    for series_id, recurrence_id in await db.exec(
+        select(CalendarEvent.series_id, CalendarEvent.recurrence_id).where(
+            CalendarEvent.series_id.in_(list(expanded)),
+            CalendarEvent.recurrence_id >= min(starts),
+            CalendarEvent.recurrence_id <= max(starts),
+        )
+    ):
+        replaced[series_id].add(recurrence_id)
+    occurrences = []
+    for event in series:
+        template = CalendarEventPublic.model_validate(event.model_dump())
+        occurrences += _occurrence_copies(
+            template, event, expanded[event.id], replaced[event.id]
+        )
+    return occurrences
+
+
+async def _window_extras(
+    db: AsyncSession, owner_id: UUID, window_start: datetime, window_end: datetime
+) -> list:
+    """
+    Длинные события и повторы серий, пересекающие окно, по (start_time, id).
+    Их немного, и они вливаются в выборку коротких событий в памяти.
+    """
+    long_events = (
+        await db.exec(
+            select(CalendarEvent).where(
+                CalendarEvent.owner_id == owner_id,
+                CalendarEvent.is_long == True,  # noqa: E712
+                CalendarEvent.rrule.is_(None),
+                CalendarEvent.end_time > window_start,
+                CalendarEvent.start_time < window_end,
+            )
+        )
+    ).all()
+    occurrences = await _series_occurrences(db, owner_id, window_start, window_end)
+    return sorted(
+        [*long_events, *occurrences], key=lambda event: (event.start_time, event.id)
+    )
+
+
+async def _subscribed_sources(db: AsyncSession, owner_id: UUID) -> dict:
+    """Внешние календари пользователя: id календаря -> id подписки."""
+    rows = await db.exec(
+        select(CalendarSubscription.source_id, CalendarSubscription.id).where(
+            CalendarSubscription.owner_id == owner_id
+        )
+    )
+    return dict(rows.all())
+
+
+def _remote_public(event: RemoteEvent, subscription_id: UUID) -> CalendarEventPublic:
+    return CalendarEventPublic.model_validate(
+        {**event.model_dump(), "subscription_id": subscription_id}
+    )
+
+
+def _remote_short_statement(
+    source_id: UUID, subscription_id: UUID, window_start: datetime, window_end: datetime
+):
+    columns = row_columns(
+        CalendarEventRow,
+        RemoteEvent,
+        task_id=null(),
+        series_id=null(),
+        subscription_id=literal(subscription_id, Uuid),
+    )
+    return select(*columns).where(
+        RemoteEvent.source_id == source_id,
+        *_short_filter(RemoteEvent, window_start, window_end),
+    )
+
+
+def _event_row(event) -> CalendarEventRow:
+    """Строка вида календаря из события ORM или CalendarEventPublic."""
+    return CalendarEventRow(*(getattr(event, name, None) for name in EVENT_ROW_FIELDS))
+
+
+async def _remote_extras(
+    db: AsyncSession, sources: dict, window_start: datetime, window_end: datetime
+) -> list:
+    """Длинные события и повторы серий внешних календарей, пересекающие окно."""
+    extras = []
+    for source_id, subscription_id in sources.items():
+        long_events = (
+            await db.exec(
+                select(RemoteEvent).where(
+                    RemoteEvent.source_id == source_id,
+                    RemoteEvent.is_long == True,  # noqa: E712
+                    RemoteEvent.rrule.is_(None),
+                    RemoteEvent.end_time > window_start,
+                    RemoteEvent.start_time < window_end,
+                )
+            )
+        ).all()
+        extras += [_remote_public(event, subscription_id) for event in long_events]
+        series = (
+            await db.exec(
+                select(RemoteEvent).where(
+                    RemoteEvent.source_id == source_id,
+                    RemoteEvent.rrule.is_not(None),
+                    RemoteEvent.start_time < window_end,
+                    or_(
+                        RemoteEvent.recurrence_end.is_(None),
+                        RemoteEvent.recurrence_end > window_start,
+                    ),
+                )
+            )
+        ).all()
+        expanded = _expand_series(series, window_start, window_end)
+        starts = [start for pairs in expanded.values() for start, _ in pairs]
+        if not starts:
+            continue
+        # Измененный повтор внешней серии - событие с тем же UID
+        replaced = defaultdict(set)
+        for uid, recurrence_id in await db.exec(
+            select(RemoteEvent.uid, RemoteEvent.recurrence_id).where(
+                RemoteEvent.source_id == source_id,
+                RemoteEvent.uid.in_([event.uid for event in series]),
+                RemoteEvent.recurrence_id >= min(starts),
+                RemoteEvent.recurrence_id <= max(starts),
+            )
+        ):
+            replaced[uid].add(recurrence_id)
+        for event in series:
+            extras += _occurrence_copies(
+                _remote_public(event, subscription_id),
+                event,
+                expanded[event.id],
+                replaced[event.uid],
+            )
+    return extras
+
+
+async def _conflicts(db: AsyncSession, event: CalendarEvent) -> list:
+    """События, пересекающиеся с event (у серии - с ее первым повтором)."""
+    window_start = event.start_time.replace(tzinfo=None)
+    window_end = event.end_time.replace(tzinfo=None)
+    short = (
+        await db.exec(
+            select(CalendarEvent).where(
+                *_short_event_filter(event.owner_id, window_start, window_end)
+            )
+        )
+    ).all()
+    extras = await _window_extras(db, event.owner_id, window_start, window_end)
+    return sorted(
+        (other for other in [*short, *extras] if other.id != event.id),
+        key=lambda other: (other.start_time, other.id),
+    )
+
+
+async def _get_series(
+    db: AsyncSession, event_id: UUID, owner_id: UUID
+) -> CalendarEvent:
+    event = await db.get(CalendarEvent, event_id)
+    if not event or event.owner_id != owner_id or not event.rrule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Recurring event not found"
+        )
+    return event
 
 
 @calendar_router.get("/", response_model=CalendarViewResponse)
-def get_calendar_view(
+async def get_calendar_view(
     start_date: date,
     end_date: date,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    tasks = db.exec(
-        select(Task).where(
-            and_(
-                Task.owner_id == current_user.id,
-                Task.due_date >= start_date,
-                Task.due_date <= end_date,
+    cached = await check_not_modified(
+        db, request, response, current_user_id, CALENDAR_COLLECTION
+    )
+    if cached is not None:
+        return cached
+    tasks_statement = select(*DUE_TASK_COLUMNS).where(
+        and_(
+            Task.owner_id == current_user_id,
+            Task.due_date >= start_date,
+            Task.due_date <= end_date,
+        )
+    )
+    window_start = datetime.combine(start_date, time.min)
+    window_end = datetime.combine(end_date, time.min)
+    events_statement = select(*EVENT_ROW_COLUMNS).where(
+        *_short_event_filter(current_user_id, window_start, window_end)
+    )
+
+    # Курсор календаря хранит позиции обоих списков; limit действует на каждый
+    position = {"events": [], "tasks": []}
+    if page.cursor:
+        position = decode_cursor(page.cursor)
+        if not isinstance(position, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
             )
+    events, events_next = await fetch_after(
+        db, events_statement, EVENT_SORT, position.get("events"), page.limit
+    )
+    events = [CalendarEventRow(*row) for row in events]
+    # Короткие события внешних календарей - своей выборкой с тем же курсором
+    sources = await _subscribed_sources(db, current_user_id)
+    remote_statements = {
+        source_id: _remote_short_statement(
+            source_id, subscription_id, window_start, window_end
         )
-    ).all()
-    events = db.exec(
-        select(CalendarEvent).where(
-            and_(
-                CalendarEvent.owner_id == current_user.id,
-                CalendarEvent.start_time >= start_date,
-                CalendarEvent.end_time <= end_date,
+        for source_id, subscription_id in sources.items()
+    }
+    remote, remote_more = [], False
+    if position.get("events") is not None:
+        for source_id, statement in remote_statements.items():
+            items, items_next = await fetch_after(
+                db, statement, REMOTE_EVENT_SORT, position["events"], page.limit
             )
+            remote += [CalendarEventRow(*row) for row in items]
+            remote_more = remote_more or items_next is not None
+    # Длинные события и повторы серий - объекты ORM и схемы; их немного
+    extras = [
+        _event_row(event)
+        for event in [
+            *await _window_extras(db, current_user_id, window_start, window_end),
+            *await _remote_extras(db, sources, window_start, window_end),
+        ]
+    ]
+    if (extras or remote) and position.get("events") is not None:
+        # Длинные события, повторы и внешние события вливаются в страницу по
+        # тому же ключу
+        after = tuple(position["events"])
+        pending = [
+            event
+            for event in extras
+            if not after or (event.start_time, event.id) > after
+        ]
+        merged = sorted(
+            [*events, *pending, *remote],
+            key=lambda event: (event.start_time, event.id),
         )
-    ).all()
-    return {"events": events, "tasks": tasks}
+        events = merged[: page.limit]
+        if events_next is not None or remote_more or len(merged) > page.limit:
+            events_next = cursor_after(events[-1], EVENT_SORT)
+    tasks, tasks_next = await fetch_after(
+        db, tasks_statement, DUE_TASK_SORT, position.get("tasks"), page.limit
+    )
+    tasks = [TaskRow(*row) for row in tasks]
+
+    has_more = events_next is not None or tasks_next is not None
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            {"events": events_next, "tasks": tasks_next}
+        )
+    if page.with_total:
+        total = (
+            await count_total(db, events_statement)
+            + len(extras)
+            + await count_total(db, tasks_statement)
+        )
+        for statement in remote_statements.values():
+            total += await count_total(db, statement)
+        response.headers["X-Total-Count"] = str(total)
+    return json_response({"events": events, "tasks": tasks}, response)
+
+
+@calendar_router.get("/free-busy", response_model=FreeBusyResponse)
+async def get_free_busy(
+    start: datetime,
+    end: datetime,
+    min_free_minutes: int = Query(
+        30, ge=1, description="Свободные окна не короче этого, в минутах"
+    ),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Занятые блоки и свободные окна в интервале [start, end)."""
+    window_start, window_end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+    if window_end <= window_start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="end must be after start",
+        )
+    # Короткие события идут из индекса уже по началу, длинные и повторы
+    # отсортированы в памяти: слияние и склейка - за один проход
+    short = await db.exec(
+        select(CalendarEvent.start_time, CalendarEvent.end_time)
+        .where(*_short_event_filter(current_user_id, window_start, window_end))
+        .order_by(CalendarEvent.start_time, CalendarEvent.id)
+    )
+    extras = await _window_extras(db, current_user_id, window_start, window_end)
+    intervals = heapq.merge(
+        map(tuple, short), ((event.start_time, event.end_time) for event in extras)
+    )
+    busy = busy_blocks(intervals, window_start, window_end)
+    free = free_slots(
+        busy, window_start, window_end, timedelta(minutes=min_free_minutes)
+    )
+    return {
+        "busy": [{"start": start, "end": end} for start, end in busy],
+        "free": [{"start": start, "end": end} for start, end in free],
+    }
 
 
-@calendar_router.post("/events", response_model=CalendarEventPublic, status_code=201)
-def create_event(
+async def _with_conflicts(
+    db: AsyncSession, event: CalendarEvent, check_conflicts: bool
+) -> CalendarEventWithConflicts:
+    conflicts = await _conflicts(db, event) if check_conflicts else []
+    return CalendarEventWithConflicts.model_validate(
+        {
+            **event.model_dump(),
+            "conflicts": [conflict.model_dump() for conflict in conflicts],
+        }
+    )
+
+
+@calendar_router.post(
+    "/events", response_model=CalendarEventWithConflicts, status_code=201
+)
+async def create_event(
     event_data: CalendarEventCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    check_conflicts: bool = Query(
+        False, description="Вернуть события, пересекающиеся с этим по времени"
+    ),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
     event = CalendarEvent.model_validate(
-        event_data, update={"owner_id": current_user.id}
+        event_data,
+        update={
+            "owner_id": current_user_id,
+            "exdates": [moment.isoformat() for moment in event_data.exdates],
+        },
     )
+    if event.rrule:
+        event.recurrence_end = _series_end(event)
     db.add(event)
-    db.commit()
-    db.refresh(event)
-    return event
+    await db.commit()
+    await db.refresh(event)
+    return await _with_conflicts(db, event, check_conflicts)
 
 
 @calendar_router.get("/events/{event_id}", response_model=CalendarEventPublic)
-def get_event(
+async def get_event(
     event_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    event = db.get(CalendarEvent, event_id)
-    if not event or event.owner_id != current_user.id:
+    event = await db.get(CalendarEvent, event_id)
+    if not event or event.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
     return event
 
 
-@calendar_router.put("/events/{event_id}", response_model=CalendarEventPublic)
-def update_event(
+@calendar_router.put("/events/{event_id}", response_model=CalendarEventWithConflicts)
+async def update_event(
     event_id: UUID,
     event_in: CalendarEventUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    check_conflicts: bool = Query(
+        False, description="Вернуть события, пересекающиеся с этим по времени"
+    ),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    event = db.get(CalendarEvent, event_id)
-    if not event or event.owner_id != current_user.id:
+    event = await db.get(CalendarEvent, event_id)
+    if not event or event.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
-    event_data = event_in.model_dump()
+    event_data = event_in.model_dump(exclude_unset=True)
+    if "exdates" in event_data:
+        event_data["exdates"] = [
+            moment.isoformat() for moment in event_in.exdates or []
+        ]
+    was_series = bool(event.rrule)
     for key, value in event_data.items():
-        if value:
+        # Явный null сбрасывает необязательные поля (rrule=null превращает
+        # серию в одиночное событие), но не название и время
+        if value is not None or key in NULLABLE_EVENT_FIELDS:
             setattr(event, key, value)
+    if event.rrule:
+        event.recurrence_end = _series_end(event)
+    else:
+        event.recurrence_end = None
+        if was_series:
+            # Замены повторов без серии теряют смысл
+            await db.exec(
+                delete(CalendarEvent)
+                .where(CalendarEvent.series_id == event.id)
+                .execution_options(synchronize_session=False)
+            )
     db.add(event)
-    db.commit()
-    db.refresh(event)
-    return event
+    await db.commit()
+    await db.refresh(event)
+    return await _with_conflicts(db, event, check_conflicts)
 
 
 @calendar_router.delete("/events/{event_id}", status_code=204)
-def delete_event(
+async def delete_event(
     event_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    event = db.get(CalendarEvent, event_id)
-    if not event or event.owner_id != current_user.id:
+    event = await db.get(CalendarEvent, event_id)
+    if not event or event.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
-    db.delete(event)
-    db.commit()
+    # Вместе с серией удаляются и ее измененные повторы
+    await db.exec(
+        delete(CalendarEvent)
+        .where(CalendarEvent.series_id == event.id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.delete(event)
+    await db.commit()
+
+
+@calendar_router.put(
+    "/events/{event_id}/occurrences/{recurrence_id}",
+    response_model=CalendarEventPublic,
+)
+async def update_occurrence(
+    event_id: UUID,
+    recurrence_id: datetime,
+    occurrence_in: CalendarOccurrenceUpdate,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """Изменяет один повтор серии: создает или обновляет его замену."""
+    series = await _get_series(db, event_id, current_user_id)
+    recurrence_id = recurrence_id.replace(tzinfo=None)
+    override = (
+        await db.exec(
+            select(CalendarEvent).where(
+                CalendarEvent.series_id == series.id,
+                CalendarEvent.recurrence_id == recurrence_id,
+            )
+        )
+    ).first()
+    if override is None:
+        occurrence = find_occurrence(series, recurrence_id)
+        if occurrence is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Occurrence not found"
+            )
+        override = CalendarEvent(
+            title=series.title,
+            description=series.description,
+            start_time=occurrence[0],
+            end_time=occurrence[1],
+            task_id=series.task_id,
+            owner_id=current_user_id,
+            series_id=series.id,
+            recurrence_id=recurrence_id,
+        )
+    for key, value in occurrence_in.model_dump(exclude_unset=True).items():
+        setattr(override, key, value)
+    db.add(override)
+    await db.commit()
+    await db.refresh(override)
+    return override
+
+
+@calendar_router.delete(
+    "/events/{event_id}/occurrences/{recurrence_id}", status_code=204
+)
+async def delete_occurrence(
+    event_id: UUID,
+    recurrence_id: datetime,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """Удаляет один повтор серии: добавляет его в EXDATE."""
+    series = await _get_series(db, event_id, current_user_id)
+    recurrence_id = recurrence_id.replace(tzinfo=None)
+    if find_occurrence(series, recurrence_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Occurrence not found"
+        )
+    series.exdates = [*series.exdates, recurrence_id.isoformat()]
+    await db.exec(
+        delete(CalendarEvent)
+        .where(
+            CalendarEvent.series_id == series.id,
+            CalendarEvent.recurrence_id == recurrence_id,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.add(series)
+    await db.commit()
+
+
+@calendar_router.post("/feed-token", response_model=CalendarFeedLink)
+async def issue_feed_token(
+    request: Request,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """Выпускает ссылку на ICS-ленту; прежняя ссылка перестает работать."""
+    token = secrets.token_urlsafe(32)
+    feed_token = await db.get(CalendarFeedToken, current_user_id)
+    if feed_token is None:
+        feed_token = CalendarFeedToken(owner_id=current_user_id, token_hash="")
+    feed_token.token_hash = hash_feed_token(token)
+    db.add(feed_token)
+    await db.commit()
+    url = request.url_for("get_calendar_feed").include_query_params(token=token)
+    return {"url": str(url), "token": token}
+
+
+@calendar_router.delete("/feed-token", status_code=204)
+async def revoke_feed_token(
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    await db.exec(
+        delete(CalendarFeedToken)
+        .where(CalendarFeedToken.owner_id == current_user_id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+def _subscription_public(
+    subscription: CalendarSubscription, source: CalendarSource
+) -> CalendarSubscriptionPublic:
+    return CalendarSubscriptionPublic(
+        id=subscription.id,
+        name=subscription.name,
+        url=source.url,
+        fetched_at=source.fetched_at,
+        last_error=source.last_error,
+    )
+
+
+@calendar_router.get("/subscriptions", response_model=List[CalendarSubscriptionPublic])
+async def list_subscriptions(
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    rows = await db.exec(
+        select(CalendarSubscription, CalendarSource)
+        .join(CalendarSource, CalendarSource.id == CalendarSubscription.source_id)
+        .where(CalendarSubscription.owner_id == current_user_id)
+        .order_by(CalendarSubscription.created_at)
+    )
+    return [_subscription_public(*row) for row in rows]
+
+
+@calendar_router.post(
+    "/subscriptions", response_model=CalendarSubscriptionPublic, status_code=201
+)
+async def create_subscription(
+    subscription_in: CalendarSubscriptionCreate,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Подписывает на внешний календарь. Его события появятся после первой
+    загрузки (в пределах CALENDAR_SUBSCRIPTION_POLL_SECONDS), а если на этот
+    URL уже подписан кто-то еще - сразу.
+    """
+    try:
+        await check_feed_host(subscription_in.url)
+    except BlockedAddress:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Calendar URL must point to a public host",
+        )
+    except httpx.HTTPError:
+        # Хост пока не разрешается: загрузка попробует позже и запишет ошибку
+        pass
+    if db.get_bind().dialect.name == "postgresql":
+        insert = postgresql_insert
+    else:
+        insert = sqlite_insert
+    # Календарь с этим URL один на всех подписчиков
+    await db.exec(
+        insert(CalendarSource.__table__).on_conflict_do_nothing(index_elements=["url"]),
+        params=[{"id": uuid4(), "url": subscription_in.url, "failure_count": 0}],
+    )
+    source = (
+        await db.exec(
+            select(CalendarSource).where(CalendarSource.url == subscription_in.url)
+        )
+    ).one()
+    duplicate = (
+        await db.exec(
+            select(CalendarSubscription.id).where(
+                CalendarSubscription.owner_id == current_user_id,
+                CalendarSubscription.source_id == source.id,
+            )
+        )
+    ).first()
+    if duplicate is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Already subscribed to this calendar",
+        )
+    subscription = CalendarSubscription(
+        name=subscription_in.name or source.url,
+        owner_id=current_user_id,
+        source_id=source.id,
+    )
+    db.add(subscription)
+    await db.commit()
+    return _subscription_public(subscription, source)
+
+
+@calendar_router.delete("/subscriptions/{subscription_id}", status_code=204)
+async def delete_subscription(
+    subscription_id: UUID,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    subscription = await db.get(CalendarSubscription, subscription_id)
+    if not subscription or subscription.owner_id != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found"
+        )
+    await db.delete(subscription)
+    await db.flush()
+    await remove_orphan_source(db, subscription.source_id)
+    await db.commit()
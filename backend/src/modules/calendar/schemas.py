@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
@@ -6,6 +7,9 @@ from datetime import datetime
 # Импортируем публичную схему задачи, чтобы вложить ее в ответ
 from src.modules.tasks.schemas import TaskPublic
 
+from .recurrence import normalize_rule, parse_rule
+from .subscriptions import normalize_feed_url
+
 
 class CalendarEventBase(BaseModel):
     title: str
@@ -13,25 +17,132 @@ class CalendarEventBase(BaseModel):
     start_time: datetime
     end_time: datetime
     task_id: Optional[UUID] = None
+    # Повторение по RFC 5545: RRULE ("FREQ=WEEKLY;BYDAY=MO") и начала
+    # исключенных повторов (EXDATE)
+    rrule: Optional[str] = None
+    exdates: List[datetime] = Field(default_factory=list)
+
+
+class RecurrenceInput(BaseModel):
+    """Проверка правила повторения во входных схемах."""
+
+    @field_validator("rrule", mode="before", check_fields=False)
+    @classmethod
+    def strip_rule(cls, value):
+        if isinstance(value, str):
+            return normalize_rule(value) or None
+        return value
+
+    @field_validator("exdates", check_fields=False)
+    @classmethod
+    def exdates_as_stored(cls, value):
+        # Время хранится без пояса, так же как start_time
+        if value is None:
+            return value
+        return [moment.replace(tzinfo=None) for moment in value]
 
+    @model_validator(mode="after")
+    def check_rule(self):
+        if self.rrule:
+            parse_rule(self.rrule, self.start_time or datetime(2000, 1, 1))
+        return self
 
-class CalendarEventCreate(CalendarEventBase):
+
+class CalendarEventCreate(RecurrenceInput, CalendarEventBase):
     pass
 
 
-class CalendarEventUpdate(BaseModel):
+class CalendarEventUpdate(RecurrenceInput):
     title: Optional[str] = None
     description: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     task_id: Optional[UUID] = None
+    rrule: Optional[str] = None
+    exdates: Optional[List[datetime]] = None
+
+
+class CalendarOccurrenceUpdate(BaseModel):
+    """Изменения одного повтора серии."""
+
+    title: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
 
 
 class CalendarEventPublic(CalendarEventBase):
     id: UUID
+    # У повтора серии id - это id серии, а recurrence_id - начало повтора;
+    # у измененного повтора id свой, а series_id указывает на серию
+    series_id: Optional[UUID] = None
+    recurrence_id: Optional[datetime] = None
+    # Событие внешнего календаря (только для чтения)
+    subscription_id: Optional[UUID] = None
+
+
+@dataclass(slots=True)
+class CalendarEventRow:
+    """Событие в виде календаря (быстрый путь, см. core/responses.py)."""
+
+    title: str
+    description: Optional[str]
+    start_time: datetime
+    end_time: datetime
+    task_id: Optional[UUID]
+    rrule: Optional[str]
+    # Как хранятся: ISO-строки; в JSON они те же, что у List[datetime]
+    exdates: list
+    id: UUID
+    series_id: Optional[UUID]
+    recurrence_id: Optional[datetime]
+    subscription_id: Optional[UUID]
 
 
 # Схема для главного ответа - "вида" календаря
 class CalendarViewResponse(BaseModel):
     events: List[CalendarEventPublic]
     tasks: List[TaskPublic]  # Задачи с дедлайнами в этом диапазоне
+
+
+class CalendarEventWithConflicts(CalendarEventPublic):
+    # События, пересекающиеся с этим (только при check_conflicts=true)
+    conflicts: List[CalendarEventPublic] = Field(default_factory=list)
+
+
+class TimeInterval(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class FreeBusyResponse(BaseModel):
+    busy: List[TimeInterval]
+    free: List[TimeInterval]
+
+
+class CalendarFeedLink(BaseModel):
+    # Ссылка для подписки; секрет показывается только при выпуске
+    url: str
+    token: str
+
+
+class CalendarSubscriptionCreate(BaseModel):
+    # http(s):// или webcal://
+    url: str
+    name: Optional[str] = None
+
+    @field_validator("url")
+    @classmethod
+    def normalize_url(cls, value: str) -> str:
+        return normalize_feed_url(value)
+
+
+class CalendarSubscriptionPublic(BaseModel):
+    id: UUID
+    name: str
+    url: str
+    # Последняя успешная загрузка и категория ошибки последней неудачной:
+    # blocked_address, timeout, connection_error, http_error, too_large,
+    # invalid_calendar
+    fetched_at: Optional[datetime] = None
+    last_error: Optional[str] = None
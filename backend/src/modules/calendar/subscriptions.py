@@ -0,0 +1,490 @@
+"""
+Подписки на внешние ICS-календари.
+
+Календарь с одним URL загружается один раз на всех подписчиков
+(CalendarSource), а его события хранятся в RemoteEvent. Загрузка условная
+(If-None-Match/If-Modified-Since): неизменившийся календарь отвечает 304 без
+тела. Измененный разбирается потоком, событие за событием, и сверяется с
+сохраненным по UID (и RECURRENCE-ID) и хэшу текста: записываются только новые,
+измененные и исчезнувшие события, транзакциями по
+CALENDAR_SUBSCRIPTION_BATCH_SIZE.
+
+Валидаторы сохраняются только после полностью примененной загрузки. Если
+загрузка оборвалась, часть изменений уже записана, но удаления не применяются,
+а следующая загрузка будет полной и досверит остальное.
+
+Календарь загружается только с публичных адресов: хост разрешается перед
+запросом и перед каждым переходом по редиректу, и адреса внутренней сети
+(частные, loopback, link-local) отклоняются, кроме хостов из
+CALENDAR_SUBSCRIPTION_ALLOWED_HOSTS. Подписчику видна только категория
+ошибки загрузки, подробности - в логе.
+
+Календари, которые пора перепроверить, раз в CALENDAR_SUBSCRIPTION_POLL_SECONDS
+берет run_subscription_sync; воркеры разных процессов не загружают один
+календарь дважды - он берется в аренду условным UPDATE.
+"""
+
+import asyncio
+import hashlib
+import ipaddress
+import logging
+import socket
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Optional
+from urllib.parse import urlsplit
+from uuid import UUID, uuid4
+
+import httpx
+from sqlalchemy import exists, insert, literal
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import delete, or_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.database import async_session_maker
+from src.core.http_client import get_http_client, host_slot
+from src.core.utils import get_current_time
+from src.models import (
+    CalendarSource,
+    CalendarSubscription,
+    CollectionVersion,
+    RemoteEvent,
+)
+from src.models.calendar import is_long_event
+from src.models.version import CALENDAR_COLLECTION
+
+from . import ics
+from .recurrence import local_zone, normalize_rule, parse_rule, series_end
+
+logger = logging.getLogger(__name__)
+
+FEED_SCHEMES = {"http": "http", "https": "https", "webcal": "https"}
+FEED_MAX_REDIRECTS = 5
+
+
+class FeedTooLarge(ValueError):
+    """Календарь больше CALENDAR_SUBSCRIPTION_MAX_BYTES."""
+
+
+class BlockedAddress(ValueError):
+    """Хост календаря разрешается в адрес внутренней сети."""
+
+
+def normalize_feed_url(url: str) -> str:
+    """URL календаря для хранения: webcal:// - это https://."""
+    url = url.strip()
+    parts = urlsplit(url)
+    scheme = FEED_SCHEMES.get(parts.scheme.lower())
+    if scheme is None or not parts.netloc:
+        raise ValueError("Calendar URL must be an http(s) or webcal URL")
+    return parts._replace(scheme=scheme).geturl()
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_feed_host(url: str) -> None:
+    """
+    BlockedAddress, если хост url разрешается хоть в один непубличный
+    адрес. Хост, который не разрешается, - ошибка соединения (httpx).
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    if not host:
+        raise BlockedAddress("Calendar URL has no host")
+    if host in settings.CALENDAR_SUBSCRIPTION_ALLOWED_HOSTS:
+        return
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, None, type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as error:
+        raise httpx.ConnectError(f"Cannot resolve {host}: {error}") from None
+    if not infos or not all(_is_public(info[4][0]) for info in infos):
+        raise BlockedAddress(f"{host} resolves to a non-public address")
+
+
+async def _open_feed(url: str, headers: dict) -> httpx.Response:
+    """
+    Начинает потоковую загрузку url, сам проходя редиректы, чтобы проверить
+    хост каждого перехода. Ответ закрывает вызывающий.
+    """
+    client = get_http_client()
+    for _ in range(FEED_MAX_REDIRECTS + 1):
+        await check_feed_host(url)
+        response = await client.send(
+            client.build_request("GET", url, headers=headers),
+            stream=True,
+            follow_redirects=False,
+        )
+        # 304 тоже считается в httpx редиректом, но без Location
+        if not (response.is_redirect and "location" in response.headers):
+            return response
+        await response.aclose()
+        url = str(response.url.join(response.headers["location"]))
+    raise httpx.TooManyRedirects(f"More than {FEED_MAX_REDIRECTS} redirects")
+
+
+def error_category(error: Exception) -> str:
+    """
+    Категория ошибки загрузки для подписчика: текст исключения раскрыл бы
+    ответы и доступность внутренних хостов.
+    """
+    if isinstance(error, BlockedAddress):
+        return "blocked_address"
+    if isinstance(error, FeedTooLarge):
+        return "too_large"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return "http_error"
+    if isinstance(error, httpx.HTTPError):
+        return "connection_error"
+    return "invalid_calendar"
+
+
+@dataclass
+class SyncResult:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    # Некорректные события, которые пропущены
+    skipped: int = 0
+    not_modified: bool = False
+
+
+def _due(now):
+    return or_(
+        CalendarSource.next_fetch_at.is_(None), CalendarSource.next_fetch_at <= now
+    )
+
+
+async def claim_source(session: AsyncSession, source_id: UUID) -> bool:
+    """Берет календарь в аренду на время загрузки; False - его уже взяли."""
+    now = get_current_time()
+    claimed = await session.exec(
+        update(CalendarSource)
+        .where(CalendarSource.id == source_id, _due(now))
+        .values(
+            next_fetch_at=now
+            + timedelta(seconds=settings.CALENDAR_SUBSCRIPTION_LEASE_SECONDS)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return claimed.rowcount == 1
+
+
+async def _bump_subscribers(session: AsyncSession, source_id: UUID) -> None:
+    """
+    Меняет версию календаря у всех подписчиков (GET /calendar/ по ETag).
+    Триггер на remoteevent делал бы это на каждую строку, а здесь - одним
+    запросом на пачку.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        upsert = postgresql_insert
+    else:
+        upsert = sqlite_insert
+    statement = upsert(CollectionVersion).from_select(
+        ["owner_id", "collection", "version", "updated_at"],
+        select(
+            CalendarSubscription.owner_id,
+            literal(CALENDAR_COLLECTION),
+            literal(1),
+            literal(get_current_time()),
+        ).where(CalendarSubscription.source_id == source_id),
+    )
+    await session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["owner_id", "collection"],
+            set_={
+                "version": CollectionVersion.version + 1,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+    )
+
+
+def _event_row(fields: dict, digest: str) -> dict:
+    """Значения колонок RemoteEvent из разобранного VEVENT."""
+    row = {
+        "uid": fields["uid"],
+        "recurrence_id": fields.get("recurrence_id"),
+        "digest": digest,
+        "title": fields["title"],
+        "description": fields.get("description"),
+        "start_time": fields["start_time"],
+        "end_time": fields["end_time"],
+        "is_long": is_long_event(fields["start_time"], fields["end_time"]),
+        "rrule": None,
+        "exdates": fields["exdates"],
+        "recurrence_end": None,
+    }
+    if fields.get("rrule"):
+        row["rrule"] = normalize_rule(fields["rrule"])
+        # ValueError для правил, которые календарь не разворачивает
+        parse_rule(row["rrule"], row["start_time"])
+        row["recurrence_end"] = series_end(RemoteEvent(**row))
+    return row
+
+
+class _DiffWriter:
+    """Копит изменения и записывает их транзакциями по batch_size."""
+
+    def __init__(self, session: AsyncSession, source_id: UUID, batch_size: int):
+        self.session = session
+        self.source_id = source_id
+        self.batch_size = batch_size
+        self.inserts: list[dict] = []
+        self.updates: list[dict] = []
+
+    async def insert(self, row: dict) -> None:
+        self.inserts.append({"id": uuid4(), "source_id": self.source_id, **row})
+        await self._maybe_flush()
+
+    async def update(self, event_id: UUID, row: dict) -> None:
+        self.updates.append({"id": event_id, **row})
+        await self._maybe_flush()
+
+    async def delete(self, event_ids: list[UUID]) -> None:
+        for start in range(0, len(event_ids), self.batch_size):
+            await self.session.exec(
+                delete(RemoteEvent)
+                .where(RemoteEvent.id.in_(event_ids[start : start + self.batch_size]))
+                .execution_options(synchronize_session=False)
+            )
+            await _bump_subscribers(self.session, self.source_id)
+            await self.session.commit()
+
+    async def _maybe_flush(self) -> None:
+        if len(self.inserts) + len(self.updates) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self.inserts:
+            await self.session.exec(insert(RemoteEvent), params=self.inserts)
+        if self.updates:
+            # Массовый UPDATE по первичному ключу
+            await self.session.exec(update(RemoteEvent), params=self.updates)
+        if self.inserts or self.updates:
+            await _bump_subscribers(self.session, self.source_id)
+            await self.session.commit()
+        self.inserts, self.updates = [], []
+
+
+async def _apply_feed(
+    session: AsyncSession, source: CalendarSource, response: httpx.Response
+) -> SyncResult:
+    result = SyncResult()
+    known = {
+        (uid, recurrence_id): (event_id, digest)
+        for event_id, uid, recurrence_id, digest in (
+            await session.exec(
+                select(
+                    RemoteEvent.id,
+                    RemoteEvent.uid,
+                    RemoteEvent.recurrence_id,
+                    RemoteEvent.digest,
+                ).where(RemoteEvent.source_id == source.id)
+            )
+        ).all()
+    }
+    seen = set()
+    writer = _DiffWriter(session, source.id, settings.CALENDAR_SUBSCRIPTION_BATCH_SIZE)
+    reader = ics.EventReader()
+    tz = local_zone()
+    received = 0
+
+    async def apply(lines: list[str]) -> None:
+        digest = hashlib.sha256("\n".join(lines).encode()).hexdigest()
+        try:
+            fields = ics.parse_event(lines, tz)
+            if fields is None:
+                return
+            key = (fields["uid"], fields.get("recurrence_id"))
+            if key in seen:
+                raise ValueError(f"Duplicate VEVENT {key[0]}")
+            seen.add(key)
+            stored = known.get(key)
+            if stored is not None and stored[1] == digest:
+                result.unchanged += 1
+                return
+            row = _event_row(fields, digest)
+        except ValueError as error:
+            logger.debug(
+                "Skipping calendar event: %s", error, extra={"url": source.url}
+            )
+            result.skipped += 1
+            return
+        if stored is None:
+            await writer.insert(row)
+            result.inserted += 1
+        else:
+            await writer.update(stored[0], row)
+            result.updated += 1
+
+    async for line in response.aiter_lines():
+        received += len(line) + 1
+        if received > settings.CALENDAR_SUBSCRIPTION_MAX_BYTES:
+            raise FeedTooLarge(
+                "Calendar is larger than "
+                f"{settings.CALENDAR_SUBSCRIPTION_MAX_BYTES} bytes"
+            )
+        if (lines := reader.feed(line)) is not None:
+            await apply(lines)
+    if (lines := reader.close()) is not None:
+        await apply(lines)
+    await writer.flush()
+    if not reader.complete:
+        raise ValueError("Calendar ended before END:VCALENDAR")
+
+    removed = [event_id for key, (event_id, _) in known.items() if key not in seen]
+    await writer.delete(removed)
+    result.deleted = len(removed)
+    return result
+
+
+async def _record_failure(
+    session: AsyncSession, source_id: UUID, failure_count: int, error: Exception
+) -> None:
+    """
+    Откладывает следующую загрузку, удваивая паузу после каждой неудачи
+    подряд. Изменения, уже примененные до ошибки, остаются.
+    """
+    backoff = min(
+        settings.CALENDAR_SUBSCRIPTION_REFRESH_SECONDS * 2**failure_count,
+        settings.CALENDAR_SUBSCRIPTION_MAX_BACKOFF_SECONDS,
+    )
+    await session.exec(
+        update(CalendarSource)
+        .where(CalendarSource.id == source_id)
+        .values(
+            failure_count=failure_count + 1,
+            last_error=error_category(error),
+            next_fetch_at=get_current_time() + timedelta(seconds=backoff),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+
+async def sync_source(source_id: UUID) -> Optional[SyncResult]:
+    """
+    Загружает календарь и применяет изменения. None - календарь не взят:
+    его загружает другой воркер или проверять еще рано.
+    """
+    async with async_session_maker() as session:
+        if not await claim_source(session, source_id):
+            return None
+        source = await session.get(CalendarSource, source_id)
+        url, failure_count = source.url, source.failure_count
+        headers = {}
+        if source.etag:
+            headers["If-None-Match"] = source.etag
+        if source.last_modified:
+            headers["If-Modified-Since"] = source.last_modified
+        try:
+            async with host_slot(url):
+                response = await _open_feed(url, headers)
+                try:
+                    if response.status_code == 304:
+                        result = SyncResult(not_modified=True)
+                    else:
+                        response.raise_for_status()
+                        result = await _apply_feed(session, source, response)
+                        source.etag = response.headers.get("etag")
+                        source.last_modified = response.headers.get("last-modified")
+                finally:
+                    await response.aclose()
+        except (httpx.HTTPError, ValueError) as error:
+            logger.warning(
+                "Calendar subscription sync failed: %s", error, extra={"url": url}
+            )
+            await session.rollback()
+            await _record_failure(session, source_id, failure_count, error)
+            return None
+        now = get_current_time()
+        source.fetched_at = now
+        source.next_fetch_at = now + timedelta(
+            seconds=settings.CALENDAR_SUBSCRIPTION_REFRESH_SECONDS
+        )
+        source.failure_count = 0
+        source.last_error = None
+        session.add(source)
+        await session.commit()
+    logger.info(
+        "Calendar subscription synced",
+        extra={"url": url, **asdict(result)},
+    )
+    return result
+
+
+async def sync_due_sources(limit: int) -> int:
+    """Загружает до limit календарей, которые пора проверить; их число."""
+    async with async_session_maker() as session:
+        now = get_current_time()
+        due = (
+            await session.exec(
+                select(CalendarSource.id)
+                .where(
+                    _due(now),
+                    # Календари без подписчиков не загружаются
+                    exists().where(CalendarSubscription.source_id == CalendarSource.id),
+                )
+                .order_by(CalendarSource.next_fetch_at.asc().nulls_first())
+                .limit(limit)
+            )
+        ).all()
+    results = await asyncio.gather(
+        *(sync_source(source_id) for source_id in due), return_exceptions=True
+    )
+    for source_id, result in zip(due, results):
+        if isinstance(result, Exception):
+            logger.error(
+                "Unexpected error while syncing calendar subscription",
+                exc_info=result,
+                extra={"source_id": source_id},
+            )
+    return len(due)
+
+
+async def remove_orphan_source(session: AsyncSession, source_id: UUID) -> None:
+    """Удаляет календарь и его события, если на него больше никто не подписан."""
+    subscribed = (
+        await session.exec(
+            select(CalendarSubscription.id)
+            .where(CalendarSubscription.source_id == source_id)
+            .limit(1)
+        )
+    ).first()
+    if subscribed is not None:
+        return
+    await session.exec(
+        delete(RemoteEvent)
+        .where(RemoteEvent.source_id == source_id)
+        .execution_options(synchronize_session=False)
+    )
+    await session.exec(
+        delete(CalendarSource)
+        .where(CalendarSource.id == source_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def run_subscription_sync() -> None:
+    """Бесконечный цикл проверки подписок; запускается и отменяется в lifespan."""
+    limit = settings.CALENDAR_SUBSCRIPTION_SOURCES_PER_POLL
+    while True:
+        try:
+            # Полная пачка - значит, ждут еще: следующую берем сразу
+            while await sync_due_sources(limit) == limit:
+                pass
+        except Exception:
+            logger.exception("Calendar subscription sync failed")
+        await asyncio.sleep(settings.CALENDAR_SUBSCRIPTION_POLL_SECONDS)
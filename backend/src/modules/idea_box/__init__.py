@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from .folders.router import folders_router
 from .ideas.router import ideas_router
+from .imports.router import imports_router
 from .tags.router import tags_router
 
 # Главный роутер для всего функционала "Idea Box"
@@ -15,3 +16,4 @@ idea_box_router = APIRouter(
 idea_box_router.include_router(folders_router)
 idea_box_router.include_router(ideas_router)
 idea_box_router.include_router(tags_router)
+idea_box_router.include_router(imports_router)
@@ -1,50 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from typing import List
-from src.core.security import get_current_user
+from src.core.security import get_current_user_id, get_read_db
 from src.core.database import get_db
-from src.models import User, IdeaFolder, Tag, IdeaTagLink, Idea
-from sqlmodel import Session, select, desc, func
+from src.core.pagination import PageParams, SortKey, fetch_page
+from src.models import FolderTagCount, IdeaFolder, Tag
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
 from .schemas import FolderCreate, FolderPublic, FolderUpdate
 from ..tags.schemas import TagWithCount
 
 folders_router = APIRouter(
-    prefix="/folders", tags=["Idea Box"], dependencies=[Depends(get_current_user)]
+    prefix="/folders", tags=["Idea Box"], dependencies=[Depends(get_current_user_id)]
+)
+
+FOLDER_SORT = (SortKey(IdeaFolder.name, "name"), SortKey(IdeaFolder.id, "id"))
+
+# Теги папки в том же порядке, что и словарь тегов; строки - (тег, счетчик)
+FOLDER_TAG_SORT = (
+    SortKey(FolderTagCount.idea_count, lambda row: row[1], descending=True),
+    SortKey(Tag.name, lambda row: row[0].name),
+    SortKey(Tag.id, lambda row: row[0].id),
 )
 
 
 @folders_router.post("/", response_model=FolderPublic, status_code=201)
 async def create_folder(
     folder_data: FolderCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
     folder = IdeaFolder.model_validate(
-        folder_data, update={"owner_id": current_user.id}
+        folder_data, update={"owner_id": current_user_id}
     )
     db.add(folder)
-    db.commit()
-    db.refresh(folder)
+    await db.commit()
+    await db.refresh(folder)
     return folder
 
 
 @folders_router.get("/", response_model=List[FolderPublic])
 async def get_user_folders(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    response: Response,
+    page: PageParams = Depends(),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    folders = current_user.idea_folders
-    return folders
+    statement = select(IdeaFolder).where(IdeaFolder.owner_id == current_user_id)
+    return await fetch_page(db, statement, FOLDER_SORT, page, response)
 
 
 @folders_router.put("/{folder_id}", response_model=FolderPublic)
 async def update_folder(
     folder_id: UUID,
     folder_in: FolderUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    folder = db.get(IdeaFolder, folder_id)
-    if not folder or folder.owner_id != current_user.id:
+    folder = await db.get(IdeaFolder, folder_id)
+    if not folder or folder.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="IdeaFolder not found"
         )
@@ -53,56 +68,50 @@ async def update_folder(
         if value:
             setattr(folder, key, value)
     db.add(folder)
-    db.commit()
-    db.refresh(folder)
+    await db.commit()
+    await db.refresh(folder)
     return folder
 
 
 @folders_router.delete("/{folder_id}", status_code=204)
-def delete_event(
+async def delete_event(
     folder_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    folder = db.get(IdeaFolder, folder_id)
-    if not folder or folder.owner_id != current_user.id:
+    # Идеи папки нужны ORM, чтобы обработать ссылки на удаляемую папку
+    folder = await db.get(
+        IdeaFolder, folder_id, options=[selectinload(IdeaFolder.ideas)]
+    )
+    if not folder or folder.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="IdeaFolder not found"
         )
-    db.delete(folder)
-    db.commit()
+    await db.delete(folder)
+    await db.commit()
 
 
 @folders_router.get("/{folder_id}/tags", response_model=List[TagWithCount])
-def get_tags_in_folder(
+async def get_tags_in_folder(
     folder_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    page: PageParams = Depends(),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
 
-    folder = db.get(IdeaFolder, folder_id)
-    if not folder or folder.owner_id != current_user.id:
+    folder = await db.get(IdeaFolder, folder_id)
+    if not folder or folder.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found"
         )
 
     statement = (
-        select(Tag, func.count(Idea.id).label("idea_count"))
-        .join(IdeaTagLink, Tag.id == IdeaTagLink.tag_id)
-        .join(Idea, IdeaTagLink.idea_id == Idea.id)
-        .where(Idea.folder_id == folder_id)
-        .where(Idea.owner_id == current_user.id)
-        .group_by(Tag.id)
-        .order_by(desc("idea_count"), Tag.name)
+        select(Tag, FolderTagCount.idea_count)
+        .join(FolderTagCount, FolderTagCount.tag_id == Tag.id)
+        .where(FolderTagCount.folder_id == folder_id)
     )
-
-    results = db.exec(statement).all()
-
-    tags_with_counts = []
-    for tag, count in results:
-        update_data = tag.model_dump()
-        update_data["idea_count"] = count
-        tag_data = TagWithCount.model_validate(update_data)
-        tags_with_counts.append(tag_data)
-
-    return tags_with_counts
+    rows = await fetch_page(db, statement, FOLDER_TAG_SORT, page, response)
+    return [
+        TagWithCount(id=tag.id, name=tag.name, idea_count=count) for tag, count in rows
+    ]
@@ -26,5 +26,7 @@ class FolderPublic(FolderBase):
     """Схема для публичного представления папки, включая ее ID."""
 
     id: UUID
+    # Хранится в строке папки, отдается без подсчета
+    idea_count: int = 0
 
     model_config = ConfigDict(from_attributes=True)
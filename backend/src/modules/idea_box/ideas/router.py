@@ -1,164 +1,272 @@
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
-from sqlmodel import Session, select
-from sqlalchemy import or_, desc
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from src.core.database import get_db
-from src.core.security import get_current_user
-from src.models import User, Idea, Tag, IdeaFolder, Task
+from src.core.etag import check_not_modified
+from src.core.pagination import PageParams, SortKey, fetch_page
+from src.core.responses import json_response, row_columns
+from src.core.security import get_current_user_id, get_read_db
+from src.models import Idea, IdeaTagLink, Tag, IdeaFolder, LinkMetadata, Task
 from src.models.idea import IdeaType  # Импортируем Enum
+from src.models.version import IDEAS_COLLECTION
 from src.modules.tasks.schemas import TaskPublic  # Для ответа при продвижении
-from ..services.link_preview import fetch_and_save_metadata
+from ..services.link_jobs import enqueue_link_preview, notify_link_workers
+from ..services.link_preview import is_stale
+from ..services.search import search_ideas
+from ..services.tags import link_tags, resolve_tags, unlink_tags
 
-from .schemas import IdeaCreate, IdeaPublic, IdeaUpdate, IdeaPromoteToTask
+from ..tags.schemas import TagRow
+from .schemas import (
+    IdeaCreate,
+    IdeaPromoteToTask,
+    IdeaPublic,
+    IdeaRow,
+    IdeaUpdate,
+    LinkMetadataRow,
+)
 
 ideas_router = APIRouter(
-    prefix="/ideas", tags=["Idea Box"], dependencies=[Depends(get_current_user)]
+    prefix="/ideas", tags=["Idea Box"], dependencies=[Depends(get_current_user_id)]
+)
+
+# Связи, которые IdeaPublic отдает во вложенном виде. Ленивая подгрузка в
+# сессии запроса запрещена, поэтому загружаем их явно и за постоянное число
+# запросов на страницу: метаданные ссылки - JOIN, теги - одним IN-запросом.
+IDEA_RELATIONS = (joinedload(Idea.link_metadata), selectinload(Idea.tags))
+
+# Сначала закрепленные, затем по дате обновления; id делает порядок строгим
+IDEA_SORT = (
+    SortKey(Idea.is_pinned, "is_pinned", descending=True),
+    SortKey(Idea.updated_at, "updated_at", descending=True),
+    SortKey(Idea.id, "id", descending=True),
 )
 
 
+# Список идей выбирает колонки идеи и, через LEFT JOIN, превью ссылки; теги
+# догружаются одним IN-запросом (см. _idea_rows)
+IDEA_ROW_COLUMNS = row_columns(IdeaRow, Idea)
+LINK_ROW_COLUMNS = row_columns(
+    LinkMetadataRow,
+    LinkMetadata,
+    **{
+        name: getattr(LinkMetadata, name).label(f"link_{name}")
+        for name in ("url", "title", "description", "image_url", "content_type")
+    },
+)
+
+
+def _search_sort(rank) -> tuple:
+    # Ранг - колонка search_rank строки; меньший ранг релевантнее
+    return (SortKey(rank, "search_rank"), SortKey(Idea.id, "id"))
+
+
+async def _idea_rows(db: AsyncSession, rows) -> List[IdeaRow]:
+    """Строки списка идей из строк выборки и тегов этих идей."""
+    ideas = {}
+    link_start = len(IDEA_ROW_COLUMNS)
+    link_end = link_start + len(LINK_ROW_COLUMNS)
+    for row in rows:
+        idea = IdeaRow(*row[:link_start])
+        if row.link_url is not None:
+            idea.link_metadata = LinkMetadataRow(*row[link_start:link_end])
+        ideas[idea.id] = idea
+    if ideas:
+        tags = await db.exec(
+            select(IdeaTagLink.idea_id, Tag.name, Tag.id)
+            .join(IdeaTagLink, IdeaTagLink.tag_id == Tag.id)
+            .where(IdeaTagLink.idea_id.in_(list(ideas)))
+        )
+        for idea_id, name, tag_id in tags:
+            ideas[idea_id].tags.append(TagRow(name, tag_id))
+    return list(ideas.values())
+
+
+async def _get_owned_idea(db: AsyncSession, idea_id: UUID, owner_id: UUID) -> Idea:
+    statement = (
+        select(Idea)
+        .where(Idea.id == idea_id, Idea.owner_id == owner_id)
+        .options(*IDEA_RELATIONS)
+        .execution_options(populate_existing=True)
+    )
+    idea = (await db.exec(statement)).first()
+    if not idea:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Idea not found"
+        )
+    return idea
+
+
 @ideas_router.post("/", response_model=IdeaPublic, status_code=201)
 async def create_idea(
     idea_in: IdeaCreate,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    folder = db.get(IdeaFolder, idea_in.folder_id)
-    if not folder or folder.owner_id != current_user.id:
+    folder = await db.get(IdeaFolder, idea_in.folder_id)
+    if not folder or folder.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cannot create Idea in this folder",
         )
-    tags_to_assign = []
-    for tag_name in idea_in.tags:
-        tag_statement = select(Tag).where(
-            Tag.name == tag_name, Tag.owner_id == current_user.id
-        )
-        tag = db.exec(tag_statement).first()
-        if not tag:
-            tag = Tag(name=tag_name, owner_id=current_user.id)
-            db.add(tag)
-        tags_to_assign.append(tag)
+    # Все теги - одним IN-запросом и одной вставкой недостающих
+    tag_ids = await resolve_tags(db, current_user_id, idea_in.tags)
     idea = Idea.model_validate(
-        idea_in, update={"owner_id": current_user.id, "tags": tags_to_assign}
+        idea_in.model_dump(exclude={"tags"}), update={"owner_id": current_user_id}
     )
-    if idea.idea_type == IdeaType.LINK:
-        background_tasks.add_task(
-            fetch_and_save_metadata, idea_id=idea.id, url=idea.url
-        )
+    enqueued = False
+    if idea.idea_type == IdeaType.LINK and idea.url:
+        # Превью из кэша (в том числе запись о недавней неудаче) сразу;
+        # устаревшее или отсутствующее загрузит очередь
+        metadata_id, stale = (
+            await db.exec(
+                select(LinkMetadata.id, is_stale()).where(LinkMetadata.url == idea.url)
+            )
+        ).first() or (None, True)
+        idea.link_metadata_id = metadata_id
+        if stale:
+            await enqueue_link_preview(db, idea.url)
+            enqueued = True
     db.add(idea)
-    db.commit()
-    db.refresh(idea)
-    return idea
+    # Связи с тегами вставляются в обход ORM, идея должна быть уже в БД
+    await db.flush()
+    await link_tags(db, idea.id, tag_ids.values())
+    await db.commit()
+    if enqueued:
+        notify_link_workers()
+    return await _get_owned_idea(db, idea.id, current_user_id)
 
 
 @ideas_router.get("/", response_model=List[IdeaPublic])
-def get_ideas(
+async def get_ideas(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
     folder_id: Optional[UUID] = None,
     tags: Optional[List[str]] = Query(None),
     q: Optional[str] = None,
     pinned: Optional[bool] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получает список идей с мощной фильтрацией."""
-    statement = select(Idea).where(Idea.owner_id == current_user.id)
+    cached = await check_not_modified(
+        db, request, response, current_user_id, IDEAS_COLLECTION
+    )
+    if cached is not None:
+        return cached
+    rank = None
+    columns = [*IDEA_ROW_COLUMNS, *LINK_ROW_COLUMNS]
+    if q:
+        # Полнотекстовый индекс вместо ILIKE '%q%', который читал всю таблицу
+        statement, rank = search_ideas(q, db.get_bind().dialect.name)
+    if rank is None:
+        statement = select(*columns)
+    else:
+        # Колонки строки списка вместо пары (идея, ранг)
+        statement = statement.with_only_columns(
+            *columns, rank.label("search_rank"), maintain_column_froms=True
+        )
+    statement = statement.outerjoin_from(
+        Idea, LinkMetadata, LinkMetadata.id == Idea.link_metadata_id
+    )
+    statement = statement.where(Idea.owner_id == current_user_id)
 
     if folder_id:
         statement = statement.where(Idea.folder_id == folder_id)
 
     if tags:
-        # Фильтр идей, которые содержат ЛЮБОЙ из перечисленных тегов
-        statement = statement.join(Idea.tags).where(Tag.name.in_(tags))
-        # ✅ ИСПРАВЛЕНИЕ: Применяем .distinct() после JOIN
-        statement = statement.distinct()
-
-    if q:
-        # Поиск без учета регистра по названию и содержанию
-        search_query = f"%{q}%"
-        statement = statement.where(
-            or_(Idea.title.ilike(search_query), Idea.content.ilike(search_query))
+        # Фильтр идей, которые содержат ЛЮБОЙ из перечисленных тегов.
+        # Подзапрос вместо JOIN не размножает строки, и DISTINCT не нужен.
+        tagged = (
+            select(IdeaTagLink.idea_id)
+            .join(Tag, Tag.id == IdeaTagLink.tag_id)
+            .where(Tag.owner_id == current_user_id, Tag.name.in_(tags))
         )
+        statement = statement.where(Idea.id.in_(tagged))
 
+    sort = IDEA_SORT
     if pinned is not None:
         statement = statement.where(Idea.is_pinned == pinned)
+        # is_pinned постоянен; в курсоре он мешал бы SQLite дочитать порядок
+        # из индекса (равенство и диапазон по одному столбцу)
+        sort = IDEA_SORT[1:]
 
-    # Сортировка: сначала закрепленные, затем по дате обновления
-    statement = statement.order_by(desc(Idea.is_pinned), desc(Idea.updated_at))
-
-    results = db.exec(statement).all()
-    return results
+    if rank is not None:
+        # Результаты поиска идут по релевантности, а не по дате
+        sort = _search_sort(rank)
+    rows = await fetch_page(db, statement, sort, page, response)
+    return json_response(await _idea_rows(db, rows), response)
 
 
 @ideas_router.get("/{idea_id}", response_model=IdeaPublic)
-def get_idea(
+async def get_idea(
     idea_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получает одну идею по ID."""
-    statement = select(Idea).where(Idea.id == idea_id, Idea.owner_id == current_user.id)
-    idea = db.exec(statement).first()
-    if not idea:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Idea not found"
-        )
-    return idea
+    return await _get_owned_idea(db, idea_id, current_user_id)
 
 
 @ideas_router.put("/{idea_id}", response_model=IdeaPublic)
-def update_idea(
+async def update_idea(
     idea_id: UUID,
     idea_in: IdeaUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
     """Обновляет идею, включая возможность перемещения и смены тегов."""
-    db_idea = db.get(Idea, idea_id)
-    if not db_idea or db_idea.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Idea not found"
-        )
+    db_idea = await _get_owned_idea(db, idea_id, current_user_id)
 
     update_data = idea_in.dict(exclude_unset=True)
 
-    # Обрабатываем теги отдельно
-    if "tags" in update_data:
-        tag_names = update_data.pop("tags")
-        tags_to_assign = []
-        for tag_name in tag_names:
-            tag = db.exec(
-                select(Tag).where(Tag.name == tag_name, Tag.owner_id == current_user.id)
-            ).first()
-            if not tag:
-                tag = Tag(name=tag_name, owner_id=current_user.id)
-            tags_to_assign.append(tag)
-        db_idea.tags = tags_to_assign
+    # Теги обрабатываем отдельно: меняются только разошедшиеся связи
+    current = {tag.name: tag.id for tag in db_idea.tags}
+    wanted = set(current)
+    if update_data.get("tags") is not None:
+        wanted = set(update_data["tags"])
+    wanted |= set(update_data.get("add_tags") or ())
+    wanted -= set(update_data.get("remove_tags") or ())
+    for key in ("tags", "add_tags", "remove_tags"):
+        update_data.pop(key, None)
+    await unlink_tags(db, idea_id, [current[name] for name in set(current) - wanted])
+    added = await resolve_tags(db, current_user_id, wanted - set(current))
+    await link_tags(db, idea_id, added.values())
 
     # Обновляем остальные поля
     for key, value in update_data.items():
         setattr(db_idea, key, value)
 
     db.add(db_idea)
-    db.commit()
-    db.refresh(db_idea)
-    return db_idea
+    await db.commit()
+    return await _get_owned_idea(db, db_idea.id, current_user_id)
 
 
 @ideas_router.delete("/{idea_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_idea(
+async def delete_idea(
     idea_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
     """Удаляет идею."""
-    idea = db.get(Idea, idea_id)
-    if idea and idea.owner_id == current_user.id:
-        db.delete(idea)
-        db.commit()
+    # Теги нужны ORM, чтобы удалить строки IdeaTagLink
+    idea = await db.get(Idea, idea_id, options=[selectinload(Idea.tags)])
+    if idea and idea.owner_id == current_user_id:
+        await db.delete(idea)
+        await db.commit()
     else:
         # Возвращаем 404, даже если идея существует, но принадлежит другому пользователю
         raise HTTPException(
@@ -171,15 +279,15 @@ def delete_idea(
     response_model=TaskPublic,
     status_code=status.HTTP_201_CREATED,
 )
-def promote_idea_to_task(
+async def promote_idea_to_task(
     idea_id: UUID,
     promote_in: IdeaPromoteToTask,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
     """Создает новую Задачу на основе существующей Идеи."""
-    idea = db.get(Idea, idea_id)
-    if not idea or idea.owner_id != current_user.id:
+    idea = await db.get(Idea, idea_id)
+    if not idea or idea.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Idea not found"
         )
@@ -193,14 +301,14 @@ def promote_idea_to_task(
     new_task = Task(
         title=promote_in.task_title,
         description=promote_in.task_description or idea.content,
-        owner_id=current_user.id,
+        owner_id=current_user_id,
     )
 
     # Связываем идею и задачу
-    idea.generated_task = new_task
+    idea.generated_task_id = new_task.id
 
     db.add(new_task)
     db.add(idea)
-    db.commit()
-    db.refresh(new_task)
+    await db.commit()
+    await db.refresh(new_task)
     return new_task
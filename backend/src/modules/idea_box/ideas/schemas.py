@@ -1,3 +1,4 @@
+from dataclasses import dataclass, field
 from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
@@ -7,7 +8,7 @@ from pydantic import BaseModel, Field, ConfigDict
 from src.models.idea import IdeaType
 
 # Импортируем публичные схемы из соседних под-модулей для вложения
-from ..tags.schemas import TagPublic
+from ..tags.schemas import TagPublic, TagRow
 
 # --- Вспомогательные схемы ---
 
@@ -19,6 +20,7 @@ class LinkMetadataPublic(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     image_url: Optional[str] = None
+    content_type: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -57,6 +59,9 @@ class IdeaUpdate(BaseModel):
     folder_id: Optional[UUID] = None
     # Позволяет полностью заменить набор тегов
     tags: Optional[List[str]] = None
+    # Точечная правка набора тегов: применяется после tags
+    add_tags: Optional[List[str]] = None
+    remove_tags: Optional[List[str]] = None
 
 
 class IdeaPublic(IdeaBase):
@@ -80,6 +85,41 @@ class IdeaPublic(IdeaBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+# --- Строки быстрого пути списка идей (см. core/responses.py) ---
+
+
+@dataclass(slots=True)
+class LinkMetadataRow:
+    """Поля LinkMetadataPublic."""
+
+    url: str
+    title: Optional[str]
+    description: Optional[str]
+    image_url: Optional[str]
+    content_type: Optional[str]
+
+
+@dataclass(slots=True)
+class IdeaRow:
+    """
+    Поля IdeaPublic. Колонки идеи выбираются запросом, а теги и превью
+    ссылки заполняются после выборки.
+    """
+
+    title: Optional[str]
+    content: Optional[str]
+    url: Optional[str]
+    id: UUID
+    owner_id: UUID
+    folder_id: UUID
+    idea_type: IdeaType
+    is_pinned: bool
+    created_at: datetime
+    updated_at: datetime
+    tags: List[TagRow] = field(default_factory=list, init=False)
+    link_metadata: Optional[LinkMetadataRow] = field(default=None, init=False)
+
+
 # --- Схемы для специальных действий ---
 
 
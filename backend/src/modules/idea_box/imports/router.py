@@ -0,0 +1,77 @@
+import logging
+from pathlib import PurePath
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.database import get_db
+from src.core.security import get_current_user_id
+from src.models import IdeaFolder
+
+from ..services.bulk_import import PARSERS, import_records
+from .schemas import FORMAT_BY_SUFFIX, ImportFormat, ImportProgress
+
+imports_router = APIRouter(prefix="/import", tags=["Idea Box"])
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def _file_chunks(file: UploadFile):
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+@imports_router.post(
+    "/",
+    response_class=StreamingResponse,
+    responses={200: {"model": ImportProgress, "content": {"application/x-ndjson": {}}}},
+)
+async def import_ideas(
+    file: UploadFile = File(...),
+    format: Optional[ImportFormat] = Query(
+        None, description="По умолчанию - по расширению файла"
+    ),
+    folder_id: Optional[UUID] = None,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Массовый импорт идей и задач из NDJSON, CSV или HTML-закладок.
+
+    Ответ - поток NDJSON: после каждой записанной пачки строка с
+    ImportProgress, последняя - с done=true.
+    """
+    import_format = format or FORMAT_BY_SUFFIX.get(
+        PurePath(file.filename or "").suffix.lower()
+    )
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Cannot detect import format, pass ?format=",
+        )
+    if folder_id is not None:
+        folder = await db.get(IdeaFolder, folder_id)
+        if not folder or folder.owner_id != current_user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found"
+            )
+
+    records = PARSERS[import_format](_file_chunks(file))
+
+    async def progress_lines():
+        try:
+            async for progress in import_records(
+                db, current_user_id, records, folder_id
+            ):
+                yield progress.model_dump_json() + "\n"
+        except Exception:
+            # Заголовки уже отправлены: ошибка сообщается последней строкой
+            logger.exception("Import failed", extra={"user_id": current_user_id})
+            await db.rollback()
+            yield '{"error": "Import failed", "done": true}\n'
+
+    return StreamingResponse(progress_lines(), media_type="application/x-ndjson")
@@ -0,0 +1,95 @@
+import re
+from datetime import datetime
+from enum import Enum
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from src.models.idea import IdeaType
+from src.models.task import TaskPriority, TaskStatus
+
+# Теги в CSV и закладках приходят одной строкой: "work, urgent" или "a|b"
+TAG_SEPARATORS = re.compile(r"[,;|]")
+
+
+class ImportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    # Netscape Bookmark File: экспорт закладок Chrome, Firefox, Safari, Pocket
+    BOOKMARKS = "bookmarks"
+
+
+# Формат по расширению файла, если он не указан явно
+FORMAT_BY_SUFFIX = {
+    ".ndjson": ImportFormat.NDJSON,
+    ".jsonl": ImportFormat.NDJSON,
+    ".csv": ImportFormat.CSV,
+    ".html": ImportFormat.BOOKMARKS,
+    ".htm": ImportFormat.BOOKMARKS,
+}
+
+
+class ImportRecord(BaseModel):
+    """
+    Одна запись импорта: идея (по умолчанию) или задача. Поля, которые не
+    относятся к виду записи, игнорируются.
+    """
+
+    kind: Literal["idea", "task"] = "idea"
+    title: Optional[str] = None
+    content: Optional[str] = None
+    url: Optional[str] = None
+    # Без явного типа запись со ссылкой становится идеей-ссылкой
+    idea_type: Optional[IdeaType] = None
+    is_pinned: bool = False
+    # Папка по имени; без нее - папка, выбранная для всего импорта
+    folder: Optional[str] = None
+    tags: List[str] = Field(default_factory=list)
+    created_at: Optional[datetime] = None
+
+    description: Optional[str] = None
+    status: TaskStatus = TaskStatus.TODO
+    priority: TaskPriority = TaskPriority.MEDIUM
+    due_date: Optional[datetime] = None
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def split_tags(cls, value):
+        if isinstance(value, str):
+            value = TAG_SEPARATORS.split(value)
+        # Порядок сохраняется, пустые и повторы отбрасываются
+        return list(dict.fromkeys(tag.strip() for tag in value if tag.strip()))
+
+    @field_validator(
+        "title", "content", "url", "folder", "description", "idea_type", mode="before"
+    )
+    @classmethod
+    def empty_as_none(cls, value):
+        # Пустые ячейки CSV означают "не задано"
+        return None if value == "" else value
+
+    @model_validator(mode="after")
+    def check_required(self):
+        if self.kind == "task" and not self.title:
+            raise ValueError("task requires a title")
+        if self.kind == "idea" and not (self.title or self.content or self.url):
+            raise ValueError("idea requires a title, content or url")
+        return self
+
+
+class ImportIssue(BaseModel):
+    # Номер строки NDJSON/CSV или порядковый номер закладки
+    line: int
+    message: str
+
+
+class ImportProgress(BaseModel):
+    """Состояние импорта после очередной пачки; последнее - с done=True."""
+
+    processed: int = 0
+    ideas: int = 0
+    tasks: int = 0
+    skipped: int = 0
+    # Первые ошибки разбора и проверки, остальные только считаются в skipped
+    errors: List[ImportIssue] = Field(default_factory=list)
+    done: bool = False
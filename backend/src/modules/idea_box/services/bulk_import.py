@@ -0,0 +1,367 @@
+"""
+Массовый импорт идей и задач: NDJSON, CSV и HTML-закладки браузера.
+
+Файл читается кусками и разбирается по мере чтения, целиком в память он не
+загружается. Записи пишутся пачками по IMPORT_BATCH_SIZE, и у каждой пачки
+своя транзакция:
+- папки и теги всей пачки находятся одним запросом (недостающие создаются
+  одним INSERT, теги - через ON CONFLICT DO NOTHING);
+- идеи, связи с тегами и задачи вставляются массово, без ORM-объектов;
+- превью ссылок берется из кэша, а недостающие ставятся в очередь одним
+  INSERT.
+
+Пачки, записанные до ошибки, остаются в базе.
+"""
+
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional, Union
+from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo
+
+from lxml import etree
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.utils import get_current_time
+from src.models import Idea, IdeaFolder, IdeaTagLink, IdeaType, LinkMetadata
+from src.models.task import Task
+
+from ..imports.schemas import ImportFormat, ImportIssue, ImportProgress, ImportRecord
+from .link_jobs import enqueue_link_previews, notify_link_workers
+from .link_preview import is_stale
+from .tags import resolve_tags
+
+# Папка для записей без папки, если при импорте не выбрана другая
+DEFAULT_FOLDER_NAME = "Imported"
+
+# Запись разбора: номер строки и поля записи либо текст ошибки
+ParsedRecord = tuple[int, Union[dict, str]]
+
+
+async def _decoded_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # utf-8-sig снимает BOM, который добавляет Excel при экспорте CSV
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.removesuffix("\r")
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRecord]:
+    line_no = 0
+    async for line in _decoded_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield line_no, "Expected a JSON object"
+            continue
+        yield line_no, data
+
+
+async def parse_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRecord]:
+    """
+    CSV с заголовком; имена колонок - поля ImportRecord, лишние колонки
+    игнорируются. Поле в кавычках может занимать несколько строк.
+    """
+    header = None
+    pending: list[str] = []
+    quotes = 0
+    line_no = row_line = 0
+    async for line in _decoded_lines(chunks):
+        line_no += 1
+        if not pending:
+            row_line = line_no
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            # Кавычка не закрыта: поле продолжается на следующей строке
+            continue
+        text = "\n".join(pending)
+        pending, quotes = [], 0
+        if not text.strip():
+            continue
+        try:
+            row = next(csv.reader([text]))
+        except csv.Error as e:
+            yield row_line, f"Invalid CSV row: {e}"
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in row]
+            continue
+        yield row_line, dict(zip(header, row))
+    if pending:
+        yield row_line, "Invalid CSV row: unterminated quoted field"
+
+
+def _bookmark_time(value: Optional[str]) -> Optional[datetime]:
+    if not value or not value.isdigit():
+        return None
+    timestamp = int(value)
+    # Обычно секунды, но встречаются миллисекунды и микросекунды
+    while timestamp > 10**11:
+        timestamp //= 1000
+    return datetime.fromtimestamp(timestamp, ZoneInfo(settings.TIMEZONE))
+
+
+async def parse_bookmarks(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRecord]:
+    """
+    Netscape Bookmark File. Закладка попадает в папку по ближайшему <H3>
+    над ее <DL>; описание берется из <DD> после закладки, теги - из TAGS.
+    Разобранные элементы сразу удаляются, дерево не растет.
+    """
+    parser = etree.HTMLPullParser(
+        events=("start", "end"), encoding="utf-8", no_network=True
+    )
+    folders: list[Optional[str]] = []
+    heading: Optional[str] = None
+    last: Optional[dict] = None
+    number = 0
+
+    def take_ready() -> list[dict]:
+        nonlocal heading, last, number
+        ready = []
+        for event, element in parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ""
+            if event == "start":
+                if tag == "dl":
+                    folders.append(heading)
+                    heading = None
+                continue
+            if tag == "h3":
+                heading = (element.text or "").strip() or None
+            elif tag == "a" and element.get("href"):
+                if last is not None:
+                    ready.append(last)
+                number += 1
+                last = {
+                    "line": number,
+                    "title": (element.text or "").strip() or None,
+                    "url": element.get("href"),
+                    "tags": element.get("tags") or [],
+                    "created_at": _bookmark_time(element.get("add_date")),
+                    # Ближайшая именованная папка выше по вложенности
+                    "folder": next((name for name in reversed(folders) if name), None),
+                }
+            elif tag == "dd":
+                # Описание относится к закладке прямо перед ним
+                if last is not None:
+                    last["content"] = (element.text or "").strip() or None
+                    ready.append(last)
+                    last = None
+            elif tag == "dl":
+                if last is not None:
+                    ready.append(last)
+                    last = None
+                if folders:
+                    folders.pop()
+            elif tag != "dt":
+                continue
+            element.clear(keep_tail=False)
+            # Уже разобранные соседи слева больше не нужны
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+        return ready
+
+    async for chunk in chunks:
+        parser.feed(chunk)
+        for record in take_ready():
+            yield record.pop("line"), record
+    parser.close()
+    ready = take_ready()
+    if last is not None:
+        ready.append(last)
+    for record in ready:
+        yield record.pop("line"), record
+
+
+PARSERS = {
+    ImportFormat.NDJSON: parse_ndjson,
+    ImportFormat.CSV: parse_csv,
+    ImportFormat.BOOKMARKS: parse_bookmarks,
+}
+
+
+class _BatchWriter:
+    """Пишет пачки записей одного пользователя; помнит найденные папки и теги."""
+
+    def __init__(self, db: AsyncSession, owner_id: UUID, folder_id: Optional[UUID]):
+        self.db = db
+        self.owner_id = owner_id
+        self.default_folder_id = folder_id
+        self.folder_ids: dict[str, UUID] = {}
+        self.tag_ids: dict[str, UUID] = {}
+
+    async def _resolve_folders(self, names: set[str]) -> None:
+        """Одним запросом находит папки по именам и одним INSERT - недостающие."""
+        missing = names - self.folder_ids.keys()
+        if not missing:
+            return
+        found = await self.db.exec(
+            select(IdeaFolder.name, IdeaFolder.id).where(
+                IdeaFolder.owner_id == self.owner_id, IdeaFolder.name.in_(missing)
+            )
+        )
+        for name, folder_id in found:
+            self.folder_ids.setdefault(name, folder_id)
+        rows = [
+            {"id": uuid4(), "name": name, "icon": None, "owner_id": self.owner_id}
+            for name in missing - self.folder_ids.keys()
+        ]
+        if rows:
+            await self.db.exec(insert(IdeaFolder.__table__), params=rows)
+            self.folder_ids.update((row["name"], row["id"]) for row in rows)
+
+    async def _cached_previews(self, urls: set[str]) -> dict[str, tuple]:
+        if not urls:
+            return {}
+        rows = await self.db.exec(
+            select(LinkMetadata.url, LinkMetadata.id, is_stale()).where(
+                LinkMetadata.url.in_(urls)
+            )
+        )
+        return {url: (metadata_id, stale) for url, metadata_id, stale in rows}
+
+    async def write(self, batch: list[ImportRecord], progress: ImportProgress) -> None:
+        ideas = [record for record in batch if record.kind == "idea"]
+        tasks = [record for record in batch if record.kind == "task"]
+        now = get_current_time()
+
+        folder_names = {record.folder for record in ideas if record.folder}
+        if self.default_folder_id is None and any(not r.folder for r in ideas):
+            folder_names.add(DEFAULT_FOLDER_NAME)
+        await self._resolve_folders(folder_names)
+        if self.default_folder_id is None and DEFAULT_FOLDER_NAME in self.folder_ids:
+            self.default_folder_id = self.folder_ids[DEFAULT_FOLDER_NAME]
+        tag_names = {tag for record in ideas for tag in record.tags}
+        self.tag_ids.update(
+            await resolve_tags(self.db, self.owner_id, tag_names - self.tag_ids.keys())
+        )
+
+        idea_rows, tag_rows = [], []
+        link_urls = set()
+        for record in ideas:
+            idea_type = record.idea_type or (
+                IdeaType.LINK if record.url else IdeaType.TEXT
+            )
+            if idea_type == IdeaType.LINK and record.url:
+                link_urls.add(record.url)
+            idea_id = uuid4()
+            created_at = record.created_at or now
+            idea_rows.append(
+                {
+                    "id": idea_id,
+                    "idea_type": idea_type,
+                    "title": record.title,
+                    "content": record.content,
+                    "url": record.url,
+                    "is_pinned": record.is_pinned,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "owner_id": self.owner_id,
+                    "folder_id": (
+                        self.folder_ids[record.folder]
+                        if record.folder
+                        else self.default_folder_id
+                    ),
+                    "link_metadata_id": None,
+                    "generated_task_id": None,
+                }
+            )
+            tag_rows.extend(
+                {"idea_id": idea_id, "tag_id": self.tag_ids[tag]} for tag in record.tags
+            )
+
+        # Превью из кэша привязывается сразу, устаревшие и новые - в очередь
+        previews = await self._cached_previews(link_urls)
+        for row in idea_rows:
+            if row["idea_type"] == IdeaType.LINK and row["url"] in previews:
+                row["link_metadata_id"] = previews[row["url"]][0]
+        to_fetch = [url for url in link_urls if previews.get(url, (None, True))[1]]
+
+        if idea_rows:
+            await self.db.exec(insert(Idea.__table__), params=idea_rows)
+        if tag_rows:
+            await self.db.exec(insert(IdeaTagLink.__table__), params=tag_rows)
+        if tasks:
+            await self.db.exec(
+                insert(Task.__table__),
+                params=[
+                    {
+                        "id": uuid4(),
+                        "title": record.title,
+                        "description": record.description or record.content,
+                        "status": record.status,
+                        "priority": record.priority,
+                        "due_date": record.due_date,
+                        "owner_id": self.owner_id,
+                    }
+                    for record in tasks
+                ],
+            )
+        await enqueue_link_previews(self.db, to_fetch)
+        await self.db.commit()
+        if to_fetch:
+            notify_link_workers()
+        progress.ideas += len(idea_rows)
+        progress.tasks += len(tasks)
+
+
+def _skip(progress: ImportProgress, line: int, message: str) -> None:
+    progress.skipped += 1
+    if len(progress.errors) < settings.IMPORT_MAX_ERRORS:
+        progress.errors.append(ImportIssue(line=line, message=message))
+
+
+async def import_records(
+    db: AsyncSession,
+    owner_id: UUID,
+    records: AsyncIterator[ParsedRecord],
+    folder_id: Optional[UUID] = None,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[ImportProgress]:
+    """
+    Импортирует разобранные записи от имени owner_id и после каждой пачки
+    отдает состояние импорта. Записи без папки попадают в folder_id (папка
+    должна принадлежать owner_id) или в папку DEFAULT_FOLDER_NAME.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    writer = _BatchWriter(db, owner_id, folder_id)
+    progress = ImportProgress()
+    batch: list[ImportRecord] = []
+    async for line, data in records:
+        progress.processed += 1
+        if isinstance(data, str):
+            _skip(progress, line, data)
+            continue
+        try:
+            batch.append(ImportRecord.model_validate(data))
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            _skip(progress, line, f"{location}: {error['msg']}".lstrip(": "))
+            continue
+        if len(batch) >= batch_size:
+            await writer.write(batch, progress)
+            batch = []
+            yield progress.model_copy(deep=True)
+    if batch:
+        await writer.write(batch, progress)
+    progress.done = True
+    yield progress
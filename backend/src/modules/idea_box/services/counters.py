@@ -0,0 +1,158 @@
+"""
+Пересчет счетчиков идей по тегам и папкам.
+
+Счетчики ведут триггеры (см. COUNTER_DDL в src/models/idea.py), пересчет
+нужен, только если данные менялись в обход них: восстановление из дампа,
+ручные правки с отключенными триггерами, ошибки в самих триггерах. Запуск
+идет по одному пользователю, каждый в своей короткой транзакции.
+
+Запуск из каталога backend/:
+    python -m src.modules.idea_box.services.counters [--email user@example.com]
+"""
+
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import func, insert
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.database import async_engine, async_session_maker
+from src.core.log import setup_logging
+from src.models import FolderTagCount, Idea, IdeaFolder, IdeaTagLink, Tag, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CounterDrift:
+    """Сколько счетчиков пересчет исправил."""
+
+    folders: int = 0
+    tags: int = 0
+    folder_tags: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.folders or self.tags or self.folder_tags)
+
+
+async def rebuild_counters(db: AsyncSession, owner_id: UUID) -> CounterDrift:
+    """
+    Пересчитывает счетчики пользователя в транзакции db (коммит остается за
+    вызывающим кодом) и возвращает, сколько из них разошлось с данными.
+    """
+    drift = CounterDrift()
+
+    folder_count = (
+        select(func.count())
+        .select_from(Idea)
+        .where(Idea.folder_id == IdeaFolder.id)
+        .scalar_subquery()
+    )
+    result = await db.exec(
+        update(IdeaFolder)
+        .where(IdeaFolder.owner_id == owner_id, IdeaFolder.idea_count != folder_count)
+        .values(idea_count=folder_count)
+        .execution_options(synchronize_session=False)
+    )
+    drift.folders = result.rowcount
+
+    tag_count = (
+        select(func.count())
+        .select_from(IdeaTagLink)
+        .where(IdeaTagLink.tag_id == Tag.id)
+        .scalar_subquery()
+    )
+    result = await db.exec(
+        update(Tag)
+        .where(Tag.owner_id == owner_id, Tag.idea_count != tag_count)
+        .values(idea_count=tag_count)
+        .execution_options(synchronize_session=False)
+    )
+    drift.tags = result.rowcount
+
+    # Счетчики пар папка-тег проще построить заново и сравнить со старыми
+    actual_statement = (
+        select(Idea.folder_id, IdeaTagLink.tag_id, func.count())
+        .join(IdeaTagLink, IdeaTagLink.idea_id == Idea.id)
+        .where(Idea.owner_id == owner_id)
+        .group_by(Idea.folder_id, IdeaTagLink.tag_id)
+    )
+    actual = {
+        (folder_id, tag_id): count
+        for folder_id, tag_id, count in await db.exec(actual_statement)
+    }
+    owned_folders = select(IdeaFolder.id).where(IdeaFolder.owner_id == owner_id)
+    stored = {
+        (row.folder_id, row.tag_id): row.idea_count
+        for row in await db.exec(
+            select(FolderTagCount).where(FolderTagCount.folder_id.in_(owned_folders))
+        )
+    }
+    drift.folder_tags = sum(
+        actual.get(pair) != stored.get(pair) for pair in actual.keys() | stored.keys()
+    )
+    if drift.folder_tags:
+        await db.exec(
+            delete(FolderTagCount)
+            .where(FolderTagCount.folder_id.in_(owned_folders))
+            .execution_options(synchronize_session=False)
+        )
+        await db.exec(
+            insert(FolderTagCount.__table__).from_select(
+                ["folder_id", "tag_id", "idea_count"], actual_statement
+            )
+        )
+    return drift
+
+
+async def rebuild_all_counters(email: Optional[str] = None) -> CounterDrift:
+    """Пересчитывает счетчики всех пользователей (или одного) по очереди."""
+    total = CounterDrift()
+    async with async_session_maker() as db:
+        statement = select(User.id)
+        if email:
+            statement = statement.where(User.email == email)
+        owner_ids = (await db.exec(statement)).all()
+    for owner_id in owner_ids:
+        async with async_session_maker() as db:
+            drift = await rebuild_counters(db, owner_id)
+            await db.commit()
+        if drift:
+            logger.warning(
+                "Idea counters drifted",
+                extra={"user_id": owner_id, **vars(drift)},
+            )
+        total.folders += drift.folders
+        total.tags += drift.tags
+        total.folder_tags += drift.folder_tags
+    return total
+
+
+async def run(email: Optional[str]) -> None:
+    try:
+        drift = await rebuild_all_counters(email)
+        logger.info("Idea counters rebuilt", extra=vars(drift))
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--email", help="пересчитать только этого пользователя")
+    args = parser.parse_args()
+
+    listener = setup_logging()
+    listener.start()
+    try:
+        asyncio.run(run(args.email))
+    finally:
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Потоковое извлечение метаданных превью из <head> HTML-страницы.
+
+Тело ответа подается кусками в инкрементальный парсер lxml; как только
+<head> закончился (или начался <body>), разбор и скачивание прекращаются.
+Полное дерево документа не строится: обработанные элементы сразу удаляются.
+"""
+
+from typing import Optional
+
+from lxml import etree
+
+# Open Graph и их запасные варианты из обычных мета-тегов
+META_FIELDS = {
+    "og:title": "title",
+    "og:description": "description",
+    "og:image": "image_url",
+    "description": "description",
+    "twitter:title": "title",
+    "twitter:description": "description",
+    "twitter:image": "image_url",
+}
+# Чем меньше число, тем выше приоритет источника поля
+_PRIORITY = {"og:": 0, "twitter:": 1}
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class HeadMetadataParser:
+    """
+    Инкрементальный парсер: feed() принимает очередной кусок байтов и
+    возвращает True, когда <head> разобран и читать дальше не нужно.
+    """
+
+    def __init__(self, encoding: Optional[str] = None):
+        self._parser = etree.HTMLPullParser(
+            events=("start", "end"), encoding=encoding, no_network=True
+        )
+        self._values: dict[str, tuple[int, str]] = {}
+        self._title: Optional[str] = None
+        self.done = False
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.done:
+            return True
+        self._parser.feed(chunk)
+        for event, element in self._parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ""
+            if event == "start" and tag == "body":
+                self.done = True
+                break
+            if event != "end":
+                continue
+            if tag == "head":
+                self.done = True
+                break
+            if tag == "meta":
+                self._take_meta(element)
+            elif tag == "title" and self._title is None:
+                self._title = (element.text or "").strip() or None
+            # Разобранные элементы <head> больше не нужны
+            element.clear(keep_tail=False)
+        return self.done
+
+    def _take_meta(self, element) -> None:
+        key = (element.get("property") or element.get("name") or "").lower()
+        field = META_FIELDS.get(key)
+        content = (element.get("content") or "").strip()
+        if not field or not content:
+            return
+        priority = next(
+            (rank for prefix, rank in _PRIORITY.items() if key.startswith(prefix)), 2
+        )
+        current = self._values.get(field)
+        if current is None or priority < current[0]:
+            self._values[field] = (priority, content)
+
+    def result(self) -> dict:
+        metadata = {field: value for field, (_, value) in self._values.items()}
+        return {
+            "title": metadata.get("title") or self._title,
+            "description": metadata.get("description"),
+            "image_url": metadata.get("image_url"),
+        }
+
+
+def is_html(content_type: Optional[str]) -> bool:
+    if not content_type:
+        # Сервер не сообщил тип - пробуем разобрать как HTML
+        return True
+    return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
@@ -0,0 +1,70 @@
+"""
+Массовый импорт идей и задач из файла от имени пользователя.
+
+Запуск из каталога backend/:
+    python -m src.modules.idea_box.services.import_cli \
+        --email user@example.com --format bookmarks bookmarks.html
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from uuid import UUID
+
+from sqlmodel import select
+
+from src.core.database import async_engine, async_session_maker
+from src.models import User
+
+from ..imports.schemas import FORMAT_BY_SUFFIX, ImportFormat
+from .bulk_import import PARSERS, import_records
+
+CHUNK_SIZE = 256 * 1024
+
+
+async def _file_chunks(path: Path):
+    with path.open("rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def run(path: Path, import_format: ImportFormat, email: str, folder_id):
+    started = time.perf_counter()
+    try:
+        async with async_session_maker() as db:
+            user = (await db.exec(select(User).where(User.email == email))).first()
+            if user is None:
+                sys.exit(f"User {email} not found")
+            records = PARSERS[import_format](_file_chunks(path))
+            async for progress in import_records(db, user.id, records, folder_id):
+                elapsed = time.perf_counter() - started
+                print(
+                    f"{progress.processed:>9} processed {progress.ideas:>9} ideas "
+                    f"{progress.tasks:>7} tasks {progress.skipped:>6} skipped "
+                    f"{elapsed:>8.1f}s",
+                    file=sys.stderr,
+                )
+        for issue in progress.errors:
+            print(f"line {issue.line}: {issue.message}", file=sys.stderr)
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--email", required=True, help="владелец импортируемых идей")
+    parser.add_argument("--format", type=ImportFormat, choices=list(ImportFormat))
+    parser.add_argument("--folder-id", type=UUID)
+    args = parser.parse_args()
+
+    import_format = args.format or FORMAT_BY_SUFFIX.get(args.path.suffix.lower())
+    if import_format is None:
+        parser.error("cannot detect the format, pass --format")
+    asyncio.run(run(args.path, import_format, args.email, args.folder_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Очередь заданий на загрузку превью ссылок в БД.
+
+Задание создается в той же транзакции, что и идея, поэтому не теряется при
+перезапуске. Задание одно на URL (уникальный индекс): если много
+пользователей одновременно сохраняют одну и ту же ссылку, страница
+загружается один раз, и превью привязывается ко всем их идеям.
+
+Воркеры берут задания условным UPDATE с арендой (locked_until): два воркера
+не возьмут одно задание, а задание упавшего воркера вернется в очередь,
+когда аренда истечет. Неудачи повторяются с экспоненциальной паузой.
+"""
+
+import asyncio
+import logging
+import statistics
+from collections import deque
+from datetime import timedelta
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import delete, or_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.database import async_session_maker
+from src.core.utils import as_local_time, get_current_time
+from src.models import Idea, IdeaType, LinkMetadata, LinkPreviewJob
+
+from .link_preview import is_stale, refresh_link_metadata
+
+logger = logging.getLogger(__name__)
+
+# Сколько готовых заданий воркер рассматривает за раз, пытаясь взять одно
+CLAIM_CANDIDATES = 8
+
+
+class LinkJobStats:
+    """Счетчики воркеров этого процесса и задержки последних заданий."""
+
+    def __init__(self, window: int = 1000):
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        # Секунды от постановки задания в очередь до привязки превью
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        self._latencies.append(latency)
+
+    def clear(self) -> None:
+        self.completed = self.failed = self.retried = 0
+        self._latencies.clear()
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "latency_p50_seconds": statistics.median(latencies) if latencies else None,
+            "latency_p95_seconds": (
+                latencies[int(len(latencies) * 0.95)] if latencies else None
+            ),
+            "latency_max_seconds": latencies[-1] if latencies else None,
+        }
+
+
+link_job_stats = LinkJobStats()
+# Будит воркеры этого процесса сразу после постановки задания
+_wakeup: Optional[asyncio.Event] = None
+
+
+async def enqueue_link_preview(db: AsyncSession, url: str) -> None:
+    """
+    Ставит задание на превью url в очередь в транзакции db (коммит остается
+    за вызывающим кодом). Если задание на этот URL уже есть, новое не
+    создается: идея получит превью вместе с остальными.
+    """
+    await enqueue_link_previews(db, [url])
+
+
+async def enqueue_link_previews(db: AsyncSession, urls) -> None:
+    """То же для многих ссылок одним INSERT (массовый импорт)."""
+    if not urls:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        insert = postgresql_insert
+    else:
+        insert = sqlite_insert
+    now = get_current_time()
+    await db.exec(
+        insert(LinkPreviewJob.__table__).on_conflict_do_nothing(index_elements=["url"]),
+        params=[
+            {
+                "id": uuid4(),
+                "url": url,
+                "attempts": 0,
+                "created_at": now,
+                "run_after": now,
+            }
+            for url in urls
+        ],
+    )
+
+
+def notify_link_workers() -> None:
+    """Будит воркеры этого процесса; вызывать после коммита задания."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def _claimable(now):
+    return or_(
+        LinkPreviewJob.locked_until.is_(None), LinkPreviewJob.locked_until <= now
+    )
+
+
+async def claim_next_job() -> Optional[LinkPreviewJob]:
+    """Берет готовое задание в аренду; None, если таких нет."""
+    async with async_session_maker() as session:
+        now = get_current_time()
+        candidates = (
+            await session.exec(
+                select(LinkPreviewJob)
+                .where(LinkPreviewJob.run_after <= now, _claimable(now))
+                .order_by(LinkPreviewJob.run_after)
+                .limit(CLAIM_CANDIDATES)
+            )
+        ).all()
+        for job in candidates:
+            # Условный UPDATE: из нескольких воркеров задание получит один
+            claimed = await session.exec(
+                update(LinkPreviewJob)
+                .where(LinkPreviewJob.id == job.id, _claimable(now))
+                .values(
+                    locked_until=now
+                    + timedelta(seconds=settings.LINK_PREVIEW_JOB_LEASE_SECONDS),
+                    attempts=LinkPreviewJob.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount == 1:
+                await session.commit()
+                job.attempts += 1
+                return job
+        return None
+
+
+async def _retry_later(session: AsyncSession, job: LinkPreviewJob, error) -> None:
+    delay = settings.LINK_PREVIEW_JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)
+    await session.exec(
+        update(LinkPreviewJob)
+        .where(LinkPreviewJob.id == job.id)
+        .values(
+            run_after=get_current_time() + timedelta(seconds=delay),
+            locked_until=None,
+            last_error=error,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    link_job_stats.retried += 1
+
+
+def _record_done(job: LinkPreviewJob, succeeded: bool) -> None:
+    if succeeded:
+        link_job_stats.completed += 1
+    else:
+        link_job_stats.failed += 1
+        logger.warning(
+            "Link preview job gave up",
+            extra={"url": job.url, "attempts": job.attempts},
+        )
+    link_job_stats.record(
+        (get_current_time() - as_local_time(job.created_at)).total_seconds()
+    )
+
+
+async def process_job(job: LinkPreviewJob) -> None:
+    """
+    Загружает превью (если в кэше нет свежего) и привязывает его ко всем
+    идеям с этой ссылкой. При неудаче задание откладывается, пока не
+    исчерпаны попытки; запись о неудаче остается в LinkMetadata в любом
+    случае и служит негативным кэшем.
+    """
+    async with async_session_maker() as session:
+        metadata, stale = (
+            await session.exec(
+                select(LinkMetadata, is_stale()).where(LinkMetadata.url == job.url)
+            )
+        ).first() or (None, True)
+        succeeded = True
+        # Запись о неудаче свежая, но повтор задания - это новая попытка
+        if stale or metadata.failure_count:
+            if metadata is None:
+                metadata = LinkMetadata(url=job.url)
+            succeeded = await refresh_link_metadata(metadata)
+            session.add(metadata)
+
+        if not succeeded and job.attempts < settings.LINK_PREVIEW_JOB_MAX_ATTEMPTS:
+            await _retry_later(session, job, metadata.last_error)
+            return
+
+        # Идеи ссылаются и на запись о неудаче: превью появится, когда
+        # перепроверка пройдет
+        await session.exec(
+            update(Idea)
+            .where(
+                Idea.url == job.url,
+                Idea.idea_type == IdeaType.LINK,
+                Idea.link_metadata_id.is_(None),
+            )
+            .values(link_metadata_id=metadata.id)
+            .execution_options(synchronize_session=False)
+        )
+        await session.exec(delete(LinkPreviewJob).where(LinkPreviewJob.id == job.id))
+        await session.commit()
+    _record_done(job, succeeded)
+
+
+async def run_next_job() -> bool:
+    """Выполняет одно готовое задание; False, если очередь пуста."""
+    job = await claim_next_job()
+    if job is None:
+        return False
+    try:
+        await process_job(job)
+    except Exception as e:
+        logger.exception("Link preview job failed", extra={"url": job.url})
+        async with async_session_maker() as session:
+            if job.attempts < settings.LINK_PREVIEW_JOB_MAX_ATTEMPTS:
+                await _retry_later(session, job, f"{type(e).__name__}: {e}"[:500])
+            else:
+                # Задание, которое раз за разом падает, не должно занимать
+                # очередь вечно
+                await session.exec(
+                    delete(LinkPreviewJob).where(LinkPreviewJob.id == job.id)
+                )
+                await session.commit()
+                _record_done(job, False)
+    return True
+
+
+async def _worker_loop() -> None:
+    while True:
+        try:
+            if await run_next_job():
+                continue
+        except Exception:
+            logger.exception("Link preview worker failed to claim a job")
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(
+                _wakeup.wait(), settings.LINK_PREVIEW_WORKER_POLL_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_link_workers(count: int) -> None:
+    """Пул из count воркеров; работает, пока задачу не отменят."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    logger.info("Link preview workers started", extra={"workers": count})
+    try:
+        await asyncio.gather(*(_worker_loop() for _ in range(count)))
+    finally:
+        _wakeup = None
+
+
+async def queue_stats(db: AsyncSession) -> dict:
+    """Глубина очереди по данным БД (общая для всех процессов)."""
+    now = get_current_time()
+    total, running, due, oldest = (
+        await db.exec(
+            select(
+                func.count(),
+                func.count().filter(LinkPreviewJob.locked_until > now),
+                func.count().filter(LinkPreviewJob.run_after <= now, _claimable(now)),
+                func.min(LinkPreviewJob.created_at),
+            ).select_from(LinkPreviewJob)
+        )
+    ).one()
+    return {
+        "queued": total,
+        "running": running,
+        "due": due,
+        "oldest_age_seconds": (
+            (now - as_local_time(oldest)).total_seconds() if oldest else None
+        ),
+    }
@@ -1,93 +1,168 @@
-from uuid import UUID
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import PurePosixPath
+from typing import Optional
+from urllib.parse import unquote, urlsplit
 import httpx
-from bs4 import BeautifulSoup
-from sqlmodel import Session, select
+from sqlmodel import or_
 
-# Мы импортируем engine напрямую, чтобы создавать независимую сессию в фоновой задаче
-from src.core.database import engine
-from src.models import Idea, LinkMetadata
+from src.core.config import settings
+from src.core.http_client import get_http_client, host_slot
+from src.core.utils import get_current_time
+from src.models import LinkMetadata
 
+from .html_head import HeadMetadataParser, is_html
 
-def fetch_and_save_metadata(idea_id: UUID, url: str):
+logger = logging.getLogger(__name__)
+
+
+def file_preview(url: str, content_type: str) -> dict:
+    """Превью ссылки на файл (PDF, картинка, видео) по типу содержимого."""
+    mime = content_type.split(";")[0].strip().lower()
+    name = unquote(PurePosixPath(urlsplit(url).path).name) or None
+    return {
+        "title": name,
+        "description": None,
+        "image_url": url if mime.startswith("image/") else None,
+        "content_type": mime,
+    }
+
+
+def freshness_lifetime(headers: httpx.Headers) -> timedelta:
     """
-    Фоновая задача для получения метаданных по URL-адресу.
-
-    Эта функция спроектирована для безопасного выполнения в фоновом потоке:
-    1.  Она создает собственную сессию базы данных, чтобы быть независимой от
-        контекста запроса.
-    2.  Сначала проверяет, не были ли метаданные для этого URL уже
-        закэшированы.
-    3.  Выполняет безопасный HTTP-запрос с таймаутом и user-agent.
-    4.  Парсит HTML для извлечения Open Graph (og:*) мета-тегов.
-    5.  Сохраняет результат и связывает его с исходной Идеей.
-
-    Args:
-        idea_id: ID Идеи, к которой нужно привязать метаданные.
-        url: URL-адрес для парсинга.
+    Сколько ответ считается свежим по Cache-Control (s-maxage, max-age) или
+    Expires, в пределах LINK_PREVIEW_MIN/MAX_TTL_SECONDS. no-store и no-cache
+    дают минимальный срок: совсем без кэша каждая новая идея с этой ссылкой
+    снова ходила бы на сайт.
     """
-    print(f"Background task started: Fetching metadata for URL: {url}")
-
-    # Создаем новую, независимую сессию БД специально для этой задачи
-    with Session(engine) as session:
+    seconds = None
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        directives[name.lower()] = value.strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        seconds = 0
+    else:
+        for name in ("s-maxage", "max-age"):
+            if directives.get(name, "").isdigit():
+                seconds = int(directives[name])
+                break
+    if seconds is None and headers.get("expires"):
         try:
-            # --- Шаг 1: Проверка кэша ---
-            # Эффективность: если мы уже парсили этот URL, просто используем результат
-            cached_metadata = session.exec(
-                select(LinkMetadata).where(LinkMetadata.url == url)
-            ).first()
-            if cached_metadata:
-                print(f"Found cached metadata for {url}")
-                metadata_to_link = cached_metadata
-            else:
-                # --- Шаг 2: Безопасный HTTP-запрос ---
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-                with httpx.Client(
-                    headers=headers, follow_redirects=True, timeout=10.0
-                ) as client:
-                    response = client.get(url)
-                    response.raise_for_status()  # Вызовет исключение для статусов 4xx/5xx
-
-                # --- Шаг 3: Парсинг HTML ---
-                soup = BeautifulSoup(response.text, "lxml")
-
-                def _get_meta_property(prop):
-                    tag = soup.find("meta", property=prop)
-                    return tag["content"] if tag else None
-
-                title = _get_meta_property("og:title") or (
-                    soup.title.string if soup.title else None
-                )
-                description = _get_meta_property("og:description")
-                image_url = _get_meta_property("og:image")
-
-                # --- Шаг 4: Сохранение новых метаданных ---
-                new_metadata = LinkMetadata(
-                    url=url, title=title, description=description, image_url=image_url
-                )
-                session.add(new_metadata)
-                session.commit()
-                session.refresh(new_metadata)
-                print(f"Successfully fetched and saved new metadata for {url}")
-                metadata_to_link = new_metadata
-
-            # --- Шаг 5: Связывание метаданных с Идеей ---
-            idea = session.get(Idea, idea_id)
-            if idea:
-                idea.link_metadata_id = metadata_to_link.id
-                session.add(idea)
-                session.commit()
-                print(f"Successfully linked metadata to Idea ID: {idea_id}")
+            expires = parsedate_to_datetime(headers["expires"])
+            date = parsedate_to_datetime(headers["date"]) if "date" in headers else None
+        except (TypeError, ValueError):
+            # Некорректный Expires (например, "0") означает "уже устарел"
+            seconds = 0
+        else:
+            if expires.tzinfo is None or (date and date.tzinfo is None):
+                seconds = 0
             else:
-                print(
-                    f"Warning: Idea with ID {idea_id} not found after fetching metadata."
-                )
-
-        except httpx.RequestError as e:
-            print(f"HTTP Request Error for {url}: {e}")
-        except Exception as e:
-            # Общий обработчик, чтобы фоновая задача не "упала" молча
-            print(
-                f"An unexpected error occurred while fetching metadata for {url}: {e}"
-            )
+                now = date or datetime.now(timezone.utc)
+                seconds = int((expires - now).total_seconds())
+    if seconds is None:
+        seconds = settings.LINK_PREVIEW_TTL_SECONDS
+    seconds = max(settings.LINK_PREVIEW_MIN_TTL_SECONDS, seconds)
+    return timedelta(seconds=min(seconds, settings.LINK_PREVIEW_MAX_TTL_SECONDS))
+
+
+def _freshness_fields(response: httpx.Response) -> dict:
+    now = get_current_time()
+    fields = {
+        "fetched_at": now,
+        "expires_at": now + freshness_lifetime(response.headers),
+        "failure_count": 0,
+        "last_error": None,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+    }
+    if response.status_code == 304:
+        # 304 может не повторять валидаторы - тогда остаются сохраненные
+        for name in ("etag", "last_modified"):
+            if fields[name] is None:
+                del fields[name]
+    return fields
+
+
+async def fetch_link_metadata(
+    url: str, etag: Optional[str] = None, last_modified: Optional[str] = None
+) -> dict:
+    """
+    Читает страницу общим HTTP-клиентом ровно настолько, чтобы разобрать
+    метаданные из <head>, но не больше LINK_PREVIEW_MAX_BYTES.
+
+    Ответы не-HTML (PDF, картинки, видео) не скачиваются: превью строится по
+    заголовку Content-Type. Запрос занимает место в общем и хостовом лимитах
+    исходящих запросов.
+
+    С etag/last_modified запрос условный. Возвращает поля LinkMetadata для
+    обновления; на 304 это только срок свежести и валидаторы.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    async with host_slot(url):
+        async with get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return _freshness_fields(response)
+            response.raise_for_status()  # Вызовет исключение для статусов 4xx/5xx
+            freshness = _freshness_fields(response)
+            content_type = response.headers.get("content-type")
+            if not is_html(content_type):
+                return {**file_preview(str(response.url), content_type), **freshness}
+
+            parser = HeadMetadataParser(response.charset_encoding)
+            received = 0
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if parser.feed(chunk) or received >= settings.LINK_PREVIEW_MAX_BYTES:
+                    # Выход из stream() закрывает соединение без дочитывания
+                    break
+    return {**parser.result(), "content_type": "text/html", **freshness}
+
+
+def record_failure(metadata: LinkMetadata, error: Exception) -> None:
+    """
+    Негативный кэш: прежние данные превью сохраняются, а следующая попытка
+    откладывается на NEGATIVE_TTL, удваиваясь после каждой неудачи подряд.
+    """
+    metadata.failure_count += 1
+    backoff = min(
+        settings.LINK_PREVIEW_NEGATIVE_TTL_SECONDS * 2 ** (metadata.failure_count - 1),
+        settings.LINK_PREVIEW_MAX_TTL_SECONDS,
+    )
+    metadata.last_error = f"{type(error).__name__}: {error}"[:500]
+    metadata.expires_at = get_current_time() + timedelta(seconds=backoff)
+
+
+async def refresh_link_metadata(metadata: LinkMetadata) -> bool:
+    """
+    Загружает или условно перепроверяет превью и обновляет запись на месте;
+    коммит остается за вызывающим кодом. Сетевые ошибки и ответы 4xx/5xx
+    кэшируются как неудача (record_failure). Возвращает True при успехе.
+    """
+    try:
+        fields = await fetch_link_metadata(
+            metadata.url, metadata.etag, metadata.last_modified
+        )
+    except httpx.HTTPError as e:
+        logger.warning(
+            "Link metadata request failed: %s", e, extra={"url": metadata.url}
+        )
+        record_failure(metadata, e)
+        return False
+    for name, value in fields.items():
+        setattr(metadata, name, value)
+    return True
+
+
+def is_stale():
+    """Условие для устаревших превью, включая еще не проверявшиеся."""
+    # Сравнение в SQL: SQLite хранит время без часового пояса
+    return or_(
+        LinkMetadata.expires_at.is_(None),
+        LinkMetadata.expires_at <= get_current_time(),
+    )
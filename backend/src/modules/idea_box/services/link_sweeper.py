@@ -0,0 +1,74 @@
+"""
+Фоновая перепроверка устаревших превью ссылок.
+
+Раз в LINK_PREVIEW_SWEEP_INTERVAL_SECONDS берется пачка записей, у которых
+истек срок свежести (самые давние первыми), и перепроверяется условными
+запросами: неизменившиеся страницы отвечают дешевым 304. Запросы пачки идут
+параллельно в пределах лимитов общего HTTP-клиента.
+"""
+
+import asyncio
+import logging
+
+from sqlmodel import select
+
+from src.core.config import settings
+from src.core.database import async_session_maker
+from src.models import LinkMetadata
+
+from .link_preview import is_stale, record_failure, refresh_link_metadata
+
+logger = logging.getLogger(__name__)
+
+
+async def revalidate_stale_links(limit: int) -> int:
+    """Перепроверяет до limit устаревших превью; возвращает их число."""
+    async with async_session_maker() as session:
+        stale = (
+            await session.exec(
+                select(LinkMetadata)
+                .where(is_stale())
+                .order_by(LinkMetadata.expires_at.asc().nulls_first())
+                .limit(limit)
+            )
+        ).all()
+        if not stale:
+            return 0
+        results = await asyncio.gather(
+            *(refresh_link_metadata(metadata) for metadata in stale),
+            return_exceptions=True,
+        )
+        for metadata, result in zip(stale, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Unexpected error while revalidating link metadata",
+                    exc_info=result,
+                    extra={"url": metadata.url},
+                )
+                # Иначе запись с ошибкой возглавляла бы каждую следующую пачку
+                record_failure(metadata, result)
+        session.add_all(stale)
+        await session.commit()
+    logger.info(
+        "Revalidated stale link metadata",
+        extra={
+            "count": len(stale),
+            "failed": sum(result is not True for result in results),
+        },
+    )
+    return len(stale)
+
+
+async def run_link_sweeper() -> None:
+    """Бесконечный цикл перепроверки; запускается и отменяется в lifespan."""
+    while True:
+        try:
+            # Полная пачка - значит, устаревших больше: следующую берем сразу
+            while (
+                await revalidate_stale_links(settings.LINK_PREVIEW_SWEEP_BATCH_SIZE)
+                == settings.LINK_PREVIEW_SWEEP_BATCH_SIZE
+            ):
+                pass
+        except Exception:
+            logger.exception("Link metadata sweep failed")
+        await asyncio.sleep(settings.LINK_PREVIEW_SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,62 @@
+"""
+Отдельный процесс для очереди превью ссылок и перепроверки устаревших.
+
+Для API в этом случае задаются LINK_PREVIEW_WORKERS=0 и
+LINK_PREVIEW_SWEEP_INTERVAL_SECONDS=0, чтобы загрузка страниц шла только
+здесь. Процессов-воркеров может быть несколько: задания берутся в аренду.
+
+Запуск из каталога backend/:
+    python -m src.modules.idea_box.services.link_worker --workers 8
+"""
+
+import argparse
+import asyncio
+import logging
+
+from src.core.config import settings
+from src.core.database import async_engine
+from src.core.http_client import close_http_client, start_http_client
+from src.core.log import setup_logging
+
+from .link_jobs import run_link_workers
+from .link_sweeper import run_link_sweeper
+
+logger = logging.getLogger(__name__)
+
+
+async def run(workers: int, sweep: bool) -> None:
+    start_http_client()
+    try:
+        tasks = [run_link_workers(workers)]
+        if sweep:
+            tasks.append(run_link_sweeper())
+        await asyncio.gather(*tasks)
+    finally:
+        await close_http_client()
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--workers", type=int, default=max(settings.LINK_PREVIEW_WORKERS, 1)
+    )
+    parser.add_argument(
+        "--no-sweep",
+        action="store_true",
+        help="не перепроверять устаревшие превью в этом процессе",
+    )
+    args = parser.parse_args()
+
+    listener = setup_logging()
+    listener.start()
+    try:
+        asyncio.run(run(args.workers, not args.no_sweep))
+    except KeyboardInterrupt:
+        logger.info("Link worker stopped")
+    finally:
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
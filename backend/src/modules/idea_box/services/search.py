@@ -0,0 +1,90 @@
+"""
+Полнотекстовый поиск по идеям.
+
+SQLite: запрос MATCH к таблице FTS5 idea_fts, ранжирование bm25.
+Postgres: колонка search_vector (tsvector + GIN), ранжирование ts_rank_cd.
+Объекты индекса описаны рядом с моделью Idea (src/models/idea.py).
+"""
+
+import re
+from typing import Any, List, Optional, Tuple
+
+import snowballstemmer
+from sqlalchemy import Float, column, func, literal_column, table
+from sqlmodel import select
+
+from src.models import Idea
+
+# Слова запроса: буквы и цифры любого алфавита
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+CYRILLIC_RE = re.compile(r"[а-яё]", re.IGNORECASE)
+
+# Основы короче этого слишком многозначны для поиска по префиксу
+MIN_STEM_LENGTH = 3
+
+# Вес заголовка и содержания в bm25
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+_russian_stemmer = snowballstemmer.stemmer("russian")
+
+idea_fts = table("idea_fts", column("rowid"), column("idea_fts"))
+
+
+def search_terms(q: str) -> List[str]:
+    """
+    Разбивает запрос на термы для поиска по префиксу.
+
+    Английские слова стеммит токенизатор porter самого индекса, а для
+    русских основу находит Snowball: "книгами" -> "книг*" найдет и "книга",
+    и "книги".
+    """
+    terms = []
+    for word in WORD_RE.findall(q.lower()):
+        if CYRILLIC_RE.search(word):
+            stem = _russian_stemmer.stemWord(word)
+            if len(stem) >= MIN_STEM_LENGTH:
+                word = stem
+        terms.append(word)
+    return terms
+
+
+def fts5_match_query(terms: List[str]) -> str:
+    # Каждый терм в кавычках, чтобы пользовательский ввод не стал синтаксисом
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def tsquery_text(terms: List[str]) -> str:
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def search_ideas(q: str, dialect: str) -> Tuple[Any, Optional[Any]]:
+    """
+    Запрос идей, подходящих под поисковую строку, и выражение их ранга.
+
+    Запрос выбирает пары (идея, ранг); меньший ранг - более релевантная идея,
+    поэтому ранг годится как ключ сортировки по возрастанию. Если в строке
+    нет ни одного слова, возвращает обычный select(Idea) и None.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return select(Idea), None
+
+    if dialect == "postgresql":
+        query = func.to_tsquery("russian", tsquery_text(terms)).op("||")(
+            func.to_tsquery("english", tsquery_text(terms))
+        )
+        search_vector = literal_column("idea.search_vector")
+        # ts_rank_cd растет с релевантностью, поэтому берем его со знаком минус
+        rank = -func.ts_rank_cd(search_vector, query, type_=Float)
+        return select(Idea, rank).where(search_vector.op("@@")(query)), rank
+
+    rank = func.bm25(
+        literal_column("idea_fts"), TITLE_WEIGHT, CONTENT_WEIGHT, type_=Float
+    )
+    statement = (
+        select(Idea, rank)
+        .join(idea_fts, idea_fts.c.rowid == literal_column("idea.rowid"))
+        .where(idea_fts.c.idea_fts.op("MATCH")(fts5_match_query(terms)))
+    )
+    return statement, rank
@@ -0,0 +1,88 @@
+"""
+Теги идей по именам.
+
+Теги находятся одним IN-запросом, недостающие создаются одним
+INSERT ... ON CONFLICT DO NOTHING по уникальному индексу (owner_id, name).
+Если тег между этими запросами создал параллельный запрос, вставка его
+пропускает, а id дочитывается третьим запросом - только в этом случае.
+
+Связи идеи с тегами меняются точечно: вставляются и удаляются только
+изменившиеся строки IdeaTagLink.
+"""
+
+from typing import Iterable
+from uuid import UUID, uuid4
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models import IdeaTagLink, Tag
+
+
+def _insert(db: AsyncSession):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql_insert
+    return sqlite_insert
+
+
+async def _find_tags(db: AsyncSession, owner_id: UUID, names) -> dict[str, UUID]:
+    rows = await db.exec(
+        select(Tag.name, Tag.id).where(Tag.owner_id == owner_id, Tag.name.in_(names))
+    )
+    return dict(rows.all())
+
+
+async def resolve_tags(
+    db: AsyncSession, owner_id: UUID, names: Iterable[str]
+) -> dict[str, UUID]:
+    """
+    Возвращает id тегов owner_id по именам, создавая недостающие в
+    транзакции db (коммит остается за вызывающим кодом).
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    tag_ids = await _find_tags(db, owner_id, names)
+    missing = [name for name in names if name not in tag_ids]
+    if not missing:
+        return tag_ids
+
+    table = Tag.__table__
+    inserted = await db.exec(
+        _insert(db)(table)
+        .on_conflict_do_nothing(index_elements=["owner_id", "name"])
+        .returning(table.c.name, table.c.id),
+        params=[
+            {"id": uuid4(), "name": name, "owner_id": owner_id} for name in missing
+        ],
+    )
+    tag_ids.update(inserted.all())
+    raced = [name for name in missing if name not in tag_ids]
+    if raced:
+        tag_ids.update(await _find_tags(db, owner_id, raced))
+    return tag_ids
+
+
+async def link_tags(db: AsyncSession, idea_id: UUID, tag_ids: Iterable[UUID]) -> None:
+    """Добавляет идее связи с тегами; уже существующие связи пропускаются."""
+    rows = [{"idea_id": idea_id, "tag_id": tag_id} for tag_id in tag_ids]
+    if rows:
+        await db.exec(
+            _insert(db)(IdeaTagLink.__table__).on_conflict_do_nothing(
+                index_elements=["idea_id", "tag_id"]
+            ),
+            params=rows,
+        )
+
+
+async def unlink_tags(db: AsyncSession, idea_id: UUID, tag_ids: Iterable[UUID]) -> None:
+    """Удаляет связи идеи с тегами одним DELETE; сами теги остаются."""
+    tag_ids = list(tag_ids)
+    if tag_ids:
+        await db.exec(
+            delete(IdeaTagLink)
+            .where(IdeaTagLink.idea_id == idea_id, IdeaTagLink.tag_id.in_(tag_ids))
+            .execution_options(synchronize_session=False)
+        )
@@ -1,69 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from src.core.security import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from src.core.security import get_current_user_id, get_read_db
 from src.core.database import get_db
-from src.models import User, Tag, Idea, IdeaTagLink
-from sqlmodel import Session, select, desc, func
+from src.core.etag import check_not_modified
+from src.core.pagination import PageParams, SortKey, fetch_page
+from src.core.responses import json_response, row_columns
+from src.models import Tag
+from src.models.version import TAGS_COLLECTION
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 from uuid import UUID
-from .schemas import TagPublic, TagUpdate, TagWithCount
+from .schemas import TagPublic, TagUpdate, TagWithCount, TagWithCountRow
 
 tags_router = APIRouter(
-    prefix="/tags", tags=["Idea Box"], dependencies=[Depends(get_current_user)]
+    prefix="/tags", tags=["Idea Box"], dependencies=[Depends(get_current_user_id)]
 )
 
+# Популярные теги первыми, при равенстве - по имени. Счетчики хранятся в
+# строке тега (их ведут триггеры), поэтому страница - чтение из индекса
+# ix_tag_owner_count, без JOIN и GROUP BY
+TAG_COUNT_SORT = (
+    SortKey(Tag.idea_count, "idea_count", descending=True),
+    SortKey(Tag.name, "name"),
+    SortKey(Tag.id, "id"),
+)
+TAG_ROW_COLUMNS = row_columns(TagWithCountRow, Tag)
+
 
 @tags_router.get("/", response_model=List[TagWithCount])
 async def get_tags(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    statement = (
-        select(Tag, func.count(Idea.id).label("idea_count"))
-        .join(IdeaTagLink, Tag.id == IdeaTagLink.tag_id)
-        .join(Idea, IdeaTagLink.idea_id == Idea.id)
-        .where(Idea.owner_id == current_user.id)
-        .group_by(Tag.id)
-        .order_by(desc("idea_count"), Tag.name)
+    cached = await check_not_modified(
+        db, request, response, current_user_id, TAGS_COLLECTION
     )
-    results = db.exec(statement).all()
-    tags_with_counts = []
-    for tag, count in results:
-        update_data = tag.model_dump()
-        update_data["idea_count"] = count
-        tag_data = TagWithCount.model_validate(update_data)
-        tags_with_counts.append(tag_data)
-
-    return tags_with_counts
+    if cached is not None:
+        return cached
+    # Теги без идей в словарь не попадают
+    statement = select(*TAG_ROW_COLUMNS).where(
+        Tag.owner_id == current_user_id, Tag.idea_count > 0
+    )
+    rows = await fetch_page(db, statement, TAG_COUNT_SORT, page, response)
+    return json_response([TagWithCountRow(*row) for row in rows], response)
 
 
 @tags_router.put("/{tag_id}", response_model=TagPublic)
 async def rename_tag(
     tag_id: UUID,
     tag_in: TagUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    tag = db.get(Tag, tag_id)
-    if not tag or tag.owner_id != current_user:
+    tag = await db.get(Tag, tag_id)
+    if not tag or tag.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found"
         )
+    # Имя тега уникально у владельца; слияние тегов не выполняем
+    duplicate = await db.exec(
+        select(Tag.id).where(
+            Tag.owner_id == current_user_id, Tag.name == tag_in.name, Tag.id != tag_id
+        )
+    )
+    if duplicate.first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Tag with this name already exists",
+        )
     tag.name = tag_in.name
     db.add(tag)
-    db.commit()
-    db.refresh()
+    await db.commit()
+    await db.refresh(tag)
     return tag
 
 
 @tags_router.delete("/{tag_id}", status_code=204)
 async def delete_tag(
     tag_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    tag = db.get(Tag, tag_id)
-    if not tag or tag.owner_id != current_user:
+    # Связи с идеями нужны ORM, чтобы удалить строки IdeaTagLink
+    tag = await db.get(Tag, tag_id, options=[selectinload(Tag.ideas)])
+    if not tag or tag.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found"
         )
-    db.delete(tag)
-    db.commit()
+    await db.delete(tag)
+    await db.commit()
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from uuid import UUID
 from pydantic import BaseModel, ConfigDict
 
@@ -29,3 +30,21 @@ class TagWithCount(TagPublic):
     """
 
     idea_count: int
+
+
+# --- Строки быстрого пути списков (см. core/responses.py) ---
+
+
+@dataclass(slots=True)
+class TagRow:
+    """Поля TagPublic."""
+
+    name: str
+    id: UUID
+
+
+@dataclass(slots=True)
+class TagWithCountRow(TagRow):
+    """Поля TagWithCount."""
+
+    idea_count: int
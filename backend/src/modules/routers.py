@@ -2,6 +2,7 @@ from .admin.router import admin_router
 from .auth.router import auth_router
 from .user.router import user_router
 from .tasks.router import task_router
+from .calendar.feed import calendar_feed_router
 from .calendar.router import calendar_router
 from .idea_box import idea_box_router
 
@@ -12,5 +13,6 @@ routers = [
     user_router,
     task_router,
     calendar_router,
+    calendar_feed_router,
     idea_box_router,
 ]
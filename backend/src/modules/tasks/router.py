@@ -1,48 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from typing import List
 from uuid import UUID
-from sqlmodel import Session
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from src.core.database import get_db
-from src.core.security import get_current_user
-from src.models.user import User
+from src.core.etag import check_not_modified
+from src.core.pagination import PageParams, SortKey, fetch_page
+from src.core.responses import json_response, row_columns
+from src.core.security import get_current_user_id, get_read_db
 from src.models.task import Task
-from .schemas import TaskCreate, TaskPublic, TaskUpdate
-
+from src.models.version import TASKS_COLLECTION
+from .schemas import TaskCreate, TaskPublic, TaskRow, TaskUpdate
 
 task_router = APIRouter(prefix="/tasks", tags=["tasks"])
+logger = logging.getLogger(__name__)
+
+TASK_SORT = (SortKey(Task.id, "id"),)
+TASK_ROW_COLUMNS = row_columns(TaskRow, Task)
 
 
 @task_router.post("/", response_model=TaskPublic, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task_data: TaskCreate | None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    print("im in tasks")
+    logger.debug("Creating task", extra={"user_id": current_user_id})
     if not task_data:
         raise HTTPException(400, "There is no task info")
-    task = Task.model_validate(task_data, update={"owner_id": current_user.id})
+    task = Task.model_validate(task_data, update={"owner_id": current_user_id})
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     return task
 
 
 @task_router.get("/", response_model=List[TaskPublic])
 async def get_tasks(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    return current_user.tasks
+    cached = await check_not_modified(
+        db, request, response, current_user_id, TASKS_COLLECTION
+    )
+    if cached is not None:
+        return cached
+    statement = select(*TASK_ROW_COLUMNS).where(Task.owner_id == current_user_id)
+    rows = await fetch_page(db, statement, TASK_SORT, page, response)
+    return json_response([TaskRow(*row) for row in rows], response)
 
 
 @task_router.get("/{task_id}")
 async def get_task(
     task_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    task = db.get(Task, task_id)
-    if not task or task.owner_id != current_user.id:
+    task = await db.get(Task, task_id)
+    if not task or task.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
         )
@@ -53,11 +74,11 @@ async def get_task(
 async def update_task(
     task_id: UUID,
     task_in: TaskUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    task = db.get(Task, task_id)
-    if not task or task.owner_id != current_user.id:
+    task = await db.get(Task, task_id)
+    if not task or task.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
         )
@@ -66,21 +87,22 @@ async def update_task(
         if value:
             setattr(task, key, value)
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     return task
 
 
 @task_router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    task = db.get(Task, task_id)
-    if not task or task.owner_id != current_user.id:
+    # Связанная идея нужна ORM, чтобы обнулить ссылку на удаляемую задачу
+    task = await db.get(Task, task_id, options=[selectinload(Task.source_idea)])
+    if not task or task.owner_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
         )
-    db.delete(task)
-    db.commit()
+    await db.delete(task)
+    await db.commit()
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic import BaseModel
 from typing import Optional
 from uuid import UUID
@@ -27,3 +28,15 @@ class TaskUpdate(BaseModel):
 
 class TaskPublic(TaskBase):
     id: UUID
+
+
+@dataclass(slots=True)
+class TaskRow:
+    """Задача в списках (быстрый путь, см. core/responses.py): поля TaskPublic."""
+
+    title: str
+    description: Optional[str]
+    status: TaskStatus
+    priority: TaskPriority
+    due_date: Optional[datetime]
+    id: UUID
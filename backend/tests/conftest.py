@@ -1,11 +1,21 @@
 # backend/tests/conftest.py
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.main import app
-from src.core.database import get_db
+from src.core.database import (
+    RequestSession,
+    apply_sqlite_profile,
+    get_db,
+    sqlite_pragmas,
+    to_async_url,
+)
 from src.core.config import settings
+from src.core.user_cache import user_cache
 
 # Создаем тестовый движок БД, который будет использоваться только для тестов
 engine = create_engine(
@@ -14,6 +24,21 @@ engine = create_engine(
     echo=False,  # Отключаем логирование SQL запросов в тестах
 )
 
+# Асинхронный движок для приложения. TestClient запускает каждый запрос в
+# собственном event loop, поэтому соединения не переиспользуются между ними.
+async_engine = create_async_engine(
+    to_async_url(settings.DB_PATH), echo=False, poolclass=NullPool
+)
+# Тесты работают с тем же профилем PRAGMA, что и приложение (WAL, внешние ключи)
+apply_sqlite_profile(engine, sqlite_pragmas())
+apply_sqlite_profile(async_engine.sync_engine, sqlite_pragmas())
+async_session_maker = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RequestSession,
+    expire_on_commit=False,
+)
+
 
 # Эта фикстура будет выполняться для КАЖДОГО теста.
 # Она создает чистую БД перед тестом и удаляет ее после.
@@ -23,14 +48,17 @@ def session_fixture():
     with Session(engine) as session:
         yield session
     SQLModel.metadata.drop_all(engine)
+    # Пользователи пересоздаются в каждом тесте с новыми id
+    user_cache.clear()
 
 # Эта фикстура создает экземпляр TestClient для отправки запросов к приложению.
 @pytest.fixture(name="client")
 def client_fixture(session: Session):
-    # Функция-заменитель для get_db. Вместо создания новой сессии,
-    # она будет возвращать тестовую сессию из фикстуры 'session'.
-    def get_session_override():
-        yield session
+    # Функция-заменитель для get_db. Открывает асинхронную сессию
+    # к той же тестовой БД, которую подготовила фикстура 'session'.
+    async def get_session_override():
+        async with async_session_maker() as async_session:
+            yield async_session
 
     # "Горячая" замена зависимости get_db на нашу тестовую функцию
     app.dependency_overrides[get_db] = get_session_override
@@ -57,3 +57,174 @@ def test_get_me_success(client: TestClient):
     assert response.status_code == 200
     data = response.json()
     assert data["username"] == TEST_USER["username"]
+
+
+def test_current_user_is_cached_and_invalidated(client: TestClient, session):
+    from sqlmodel import select
+
+    from src.core.user_cache import user_cache
+    from src.models.user import User
+    from .test_tasks import get_auth_headers
+
+    headers = get_auth_headers(client)
+    client.get("/user/me", headers=headers)
+    client.get("/user/me", headers=headers)
+    assert user_cache.stats()["misses"] == 1
+    assert user_cache.stats()["hits"] == 1
+
+    # Деактивация через ORM сбрасывает запись, и токен перестает работать
+    user = session.exec(select(User)).one()
+    user.is_active = False
+    session.add(user)
+    session.commit()
+    assert user_cache.stats()["size"] == 0
+    assert client.get("/user/me", headers=headers).status_code == 401
+
+
+def test_user_cache_ttl_and_lru(mocker):
+    from uuid import uuid4
+
+    from src.core.user_cache import UserCache
+    from src.models.user import User
+
+    clock = mocker.patch("src.core.user_cache.time.monotonic", return_value=0.0)
+    cache = UserCache(ttl_seconds=10, max_size=2)
+    users = [User(id=uuid4(), username=f"u{i}", email=f"u{i}@x") for i in range(3)]
+    for user in users:
+        cache.put(user.username, user)
+    # Самая старая запись вытеснена
+    assert cache.get("u0") is None
+    assert cache.get("u1") is users[1]
+    clock.return_value = 11.0
+    assert cache.get("u1") is None
+    assert cache.stats() | {"hit_ratio": None} == {
+        "size": 1,
+        "max_size": 2,
+        "ttl_seconds": 10,
+        "hits": 1,
+        "misses": 2,
+        "hit_ratio": None,
+    }
+
+
+def test_token_carries_user_id_and_resolves_without_queries(client: TestClient):
+    import jwt
+    from sqlalchemy import event
+
+    from src.core.config import settings
+    from .conftest import async_engine
+    from .test_tasks import get_auth_headers
+
+    headers = get_auth_headers(client)
+    token = headers["Authorization"].split()[1]
+    payload = jwt.decode(token, settings.SECRET_KEY, [settings.JWT_ALGORITHM])
+    assert payload["ver"] == 0
+    assert payload["is_superuser"] is False
+    me = client.get("/user/me", headers=headers)
+    assert me.status_code == 200
+
+    # Пользователь уже в кэше: проверка владельца не обращается к БД
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        response = client.get("/tasks/", headers=headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_statement)
+    assert response.status_code == 200
+    assert not any('FROM "user"' in statement for statement in statements)
+
+
+def test_logout_all_revokes_issued_tokens(client: TestClient):
+    from .test_tasks import get_auth_headers
+
+    headers = get_auth_headers(client)
+    assert client.get("/tasks/", headers=headers).status_code == 200
+    assert client.post("/auth/logout-all", headers=headers).status_code == 204
+    assert client.get("/tasks/", headers=headers).status_code == 401
+    assert client.get("/user/me", headers=headers).status_code == 401
+
+    # Новый вход выдает токен с новой версией
+    assert client.get("/tasks/", headers=get_auth_headers(client)).status_code == 200
+
+
+def test_login_rehashes_outdated_password_hash(client: TestClient, session, mocker):
+    from sqlmodel import select
+
+    from src.core.crypto import build_password_hash
+    from src.models.user import User
+
+    client.post("/auth/register", json=TEST_USER)
+    old_hash = session.exec(select(User)).one().hashed_password
+
+    # Параметры Argon2 поменялись (например, после калибровки)
+    mocker.patch(
+        "src.core.security.password_hash", build_password_hash(1, 19 * 1024, 1)
+    )
+    login_data = {"username": TEST_USER["email"], "password": TEST_USER["password"]}
+    assert client.post("/auth/token", data=login_data).status_code == 200
+
+    session.expire_all()
+    new_hash = session.exec(select(User)).one().hashed_password
+    assert new_hash != old_hash
+    assert "m=19456,t=1,p=1" in new_hash
+    # Пароль по-прежнему подходит
+    assert client.post("/auth/token", data=login_data).status_code == 200
+
+
+def login_pair(client: TestClient) -> dict:
+    client.post("/auth/register", json=TEST_USER)
+    login_data = {"username": TEST_USER["email"], "password": TEST_USER["password"]}
+    return client.post("/auth/token", data=login_data).json()
+
+
+def test_refresh_rotates_tokens(client: TestClient):
+    tokens = login_pair(client)
+    assert tokens["refresh_token"]
+    assert tokens["expires_in"] > 0
+
+    response = client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert client.get("/user/me", headers=headers).status_code == 200
+
+    # Новый refresh-токен тоже обменивается
+    response = client.post(
+        "/auth/refresh", json={"refresh_token": rotated["refresh_token"]}
+    )
+    assert response.status_code == 200
+
+
+def test_refresh_token_reuse_revokes_family(client: TestClient):
+    tokens = login_pair(client)
+    first = tokens["refresh_token"]
+    second = client.post("/auth/refresh", json={"refresh_token": first}).json()
+
+    # Повторный обмен уже использованного токена - признак кражи
+    reused = client.post("/auth/refresh", json={"refresh_token": first})
+    assert reused.status_code == 401
+    # Вся цепочка отозвана, в том числе законный последний токен
+    response = client.post(
+        "/auth/refresh", json={"refresh_token": second["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+def test_refresh_rejects_unknown_and_revoked_tokens(client: TestClient):
+    assert (
+        client.post("/auth/refresh", json={"refresh_token": "nope"}).status_code == 401
+    )
+    tokens = login_pair(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.post("/auth/logout-all", headers=headers).status_code == 204
+    response = client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
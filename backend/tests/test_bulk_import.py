@@ -0,0 +1,172 @@
+import asyncio
+import json
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from src.models import Idea, IdeaFolder, LinkPreviewJob, Tag
+from src.models.task import Task
+from src.modules.idea_box.services.bulk_import import (
+    import_records,
+    parse_bookmarks,
+    parse_csv,
+)
+
+from .conftest import async_session_maker
+from .test_idea_box import create_folder
+from .test_tasks import get_auth_headers
+
+BOOKMARKS = b"""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3>Reading</H3>
+    <DL><p>
+        <DT><A HREF="https://example.com/a" ADD_DATE="1700000000" TAGS="python,web">A</A>
+        <DD>About A
+        <DT><H3>Deep</H3>
+        <DL><p>
+            <DT><A HREF="https://example.com/b">B</A>
+        </DL><p>
+        <DT><A HREF="https://example.com/c">C</A>
+    </DL><p>
+    <DT><A HREF="https://example.com/d">D</A>
+</DL><p>
+"""
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def _collect(parser, data: bytes, size: int = 7):
+    return [record async for record in parser(_chunks(data, size))]
+
+
+def _import(client, headers, name, data, **params):
+    response = client.post(
+        "/idea-box/import/",
+        files={"file": (name, data)},
+        params=params,
+        headers=headers,
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_import_ndjson_streams_progress(client: TestClient, session):
+    headers = get_auth_headers(client)
+    lines = [
+        {"title": "First", "tags": ["work", "ideas"], "folder": "Inbox"},
+        {"title": "Link", "url": "https://example.com/x", "tags": "work; later"},
+        "not json",
+        {"kind": "task", "title": "Call Bob", "priority": "high"},
+        {"kind": "task"},
+        {"content": "No folder"},
+    ]
+    data = "\n".join(
+        line if isinstance(line, str) else json.dumps(line) for line in lines
+    )
+
+    progress = _import(client, headers, "ideas.ndjson", data.encode())
+    final = progress[-1]
+    assert final["done"] is True
+    assert final["processed"] == 6
+    assert (final["ideas"], final["tasks"], final["skipped"]) == (3, 1, 2)
+    assert [issue["line"] for issue in final["errors"]] == [3, 5]
+
+    ideas = session.exec(select(Idea)).all()
+    folders = {folder.id: folder.name for folder in session.exec(select(IdeaFolder))}
+    assert {folders[idea.folder_id] for idea in ideas} == {"Inbox", "Imported"}
+    tags = {tag.name for tag in session.exec(select(Tag))}
+    assert tags == {"work", "ideas", "later"}
+    assert session.exec(select(Task)).one().title == "Call Bob"
+    # Превью для ссылки ставится в очередь, как при обычном создании идеи
+    assert session.exec(select(LinkPreviewJob.url)).all() == ["https://example.com/x"]
+
+    # Повторный импорт переиспользует существующие теги и папки
+    _import(client, headers, "ideas.ndjson", data.encode())
+    assert len(session.exec(select(Tag)).all()) == 3
+    assert len(session.exec(select(IdeaFolder)).all()) == 2
+    assert len(session.exec(select(LinkPreviewJob)).all()) == 1
+
+
+def test_import_commits_in_batches(client: TestClient, session):
+    headers = get_auth_headers(client)
+    folder = create_folder(client, headers, "Target")
+    owner_id = session.exec(select(IdeaFolder.owner_id)).one()
+    records = [(i, {"title": f"Idea {i}"}) for i in range(1, 6)]
+
+    async def run():
+        async def source():
+            for record in records:
+                yield record
+
+        async with async_session_maker() as db:
+            return [
+                progress
+                async for progress in import_records(
+                    db, owner_id, source(), UUID(folder["id"]), batch_size=2
+                )
+            ]
+
+    progress = asyncio.run(run())
+    assert [p.ideas for p in progress] == [2, 4, 5]
+    assert [p.done for p in progress] == [False, False, True]
+    ideas = session.exec(select(Idea)).all()
+    assert {str(idea.folder_id) for idea in ideas} == {folder["id"]}
+
+
+def test_import_rejects_unknown_format_and_foreign_folder(client: TestClient):
+    headers = get_auth_headers(client)
+    response = client.post(
+        "/idea-box/import/", files={"file": ("ideas.txt", b"x")}, headers=headers
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        "/idea-box/import/",
+        files={"file": ("ideas.csv", b"title\nx")},
+        params={"folder_id": "00000000-0000-0000-0000-000000000000"},
+        headers=headers,
+    )
+    assert response.status_code == 404
+
+
+def test_parse_csv_multiline_fields_in_small_chunks():
+    data = (
+        "\ufefftitle,content,tags\r\n"
+        'One,"first line\nsecond, line",a|b\r\n'
+        'Two,"say ""hi""",\r\n'
+    ).encode()
+    records = asyncio.run(_collect(parse_csv, data, size=5))
+    assert records == [
+        (2, {"title": "One", "content": "first line\nsecond, line", "tags": "a|b"}),
+        (4, {"title": "Two", "content": 'say "hi"', "tags": ""}),
+    ]
+
+
+def test_parse_bookmarks_maps_nested_folders():
+    for size in (11, len(BOOKMARKS)):
+        records = asyncio.run(_collect(parse_bookmarks, BOOKMARKS, size))
+        by_title = {data["title"]: data for _, data in records}
+        assert [data["title"] for _, data in records] == ["A", "B", "C", "D"]
+        assert by_title["A"]["folder"] == "Reading"
+        assert by_title["A"]["content"] == "About A"
+        assert by_title["A"]["tags"] == "python,web"
+        assert by_title["A"]["created_at"].timestamp() == 1700000000
+        assert by_title["B"]["folder"] == "Deep"
+        assert by_title["C"]["folder"] == "Reading"
+        assert by_title["D"]["folder"] is None
+
+
+def test_import_bookmarks_endpoint(client: TestClient, session):
+    headers = get_auth_headers(client)
+    final = _import(client, headers, "bookmarks.html", BOOKMARKS)[-1]
+    assert (final["ideas"], final["skipped"]) == (4, 0)
+    ideas = session.exec(select(Idea)).all()
+    assert {idea.idea_type for idea in ideas} == {"link"}
+    assert len(session.exec(select(LinkPreviewJob)).all()) == 4
@@ -0,0 +1,113 @@
+from fastapi.testclient import TestClient
+
+from .test_tasks import get_auth_headers
+
+
+def _event(client, headers, title, start, end, **fields):
+    response = client.post(
+        "/calendar/events",
+        json={"title": title, "start_time": start, "end_time": end, **fields},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_calendar_view_returns_overlapping_events(client: TestClient):
+    """Тест: в окно попадают события, которые лишь частично в нем лежат."""
+    headers = get_auth_headers(client)
+    _event(client, headers, "Trip", "2029-12-30T08:00:00", "2030-01-03T20:00:00")
+    _event(client, headers, "Night", "2030-01-31T23:00:00", "2030-02-01T02:00:00")
+    _event(client, headers, "Inside", "2030-01-10T10:00:00", "2030-01-10T11:00:00")
+    _event(client, headers, "Before", "2029-12-31T22:00:00", "2030-01-01T00:00:00")
+    _event(client, headers, "After", "2030-02-01T00:00:00", "2030-02-01T01:00:00")
+
+    response = client.get(
+        "/calendar/?start_date=2030-01-01&end_date=2030-02-01&with_total=true",
+        headers=headers,
+    )
+    titles = [event["title"] for event in response.json()["events"]]
+    assert titles == ["Trip", "Inside", "Night"]
+    assert response.headers["X-Total-Count"] == "3"
+
+
+def test_free_busy_merges_events_and_occurrences(client: TestClient):
+    """Тест: занятые блоки склеиваются, свободные окна не короче заданного."""
+    headers = get_auth_headers(client)
+    _event(client, headers, "A", "2030-01-07T09:00:00", "2030-01-07T10:00:00")
+    _event(client, headers, "B", "2030-01-07T09:30:00", "2030-01-07T11:00:00")
+    _event(client, headers, "Off", "2030-01-05T00:00:00", "2030-01-07T08:30:00")
+    _event(
+        client,
+        headers,
+        "Standup",
+        "2030-01-06T13:00:00",
+        "2030-01-06T14:00:00",
+        rrule="FREQ=DAILY",
+    )
+
+    url = "/calendar/free-busy?start=2030-01-07T08:00:00&end=2030-01-07T18:00:00"
+    data = client.get(f"{url}&min_free_minutes=60", headers=headers).json()
+    assert data["busy"] == [
+        {"start": "2030-01-07T08:00:00", "end": "2030-01-07T08:30:00"},
+        {"start": "2030-01-07T09:00:00", "end": "2030-01-07T11:00:00"},
+        {"start": "2030-01-07T13:00:00", "end": "2030-01-07T14:00:00"},
+    ]
+    assert data["free"] == [
+        {"start": "2030-01-07T11:00:00", "end": "2030-01-07T13:00:00"},
+        {"start": "2030-01-07T14:00:00", "end": "2030-01-07T18:00:00"},
+    ]
+
+    longer = client.get(f"{url}&min_free_minutes=180", headers=headers).json()
+    assert longer["free"] == [data["free"][1]]
+
+    reversed_window = client.get(
+        "/calendar/free-busy?start=2030-01-07T18:00:00&end=2030-01-07T08:00:00",
+        headers=headers,
+    )
+    assert reversed_window.status_code == 422
+
+
+def test_conflicts_on_create_and_update(client: TestClient):
+    """Тест: по запросу событие возвращается с пересекающимися событиями."""
+    headers = get_auth_headers(client)
+    _event(client, headers, "Lunch", "2030-01-07T12:00:00", "2030-01-07T13:00:00")
+    _event(
+        client,
+        headers,
+        "Weekly",
+        "2029-12-31T12:30:00",
+        "2029-12-31T14:00:00",
+        rrule="FREQ=WEEKLY",
+    )
+
+    quiet = _event(
+        client, headers, "Call", "2030-01-07T12:45:00", "2030-01-07T13:15:00"
+    )
+    assert quiet["conflicts"] == []
+
+    response = client.post(
+        "/calendar/events?check_conflicts=true",
+        json={
+            "title": "Call",
+            "start_time": "2030-01-07T12:45:00",
+            "end_time": "2030-01-07T13:15:00",
+        },
+        headers=headers,
+    )
+    conflicts = response.json()["conflicts"]
+    assert [(event["title"], event["start_time"]) for event in conflicts] == [
+        ("Lunch", "2030-01-07T12:00:00"),
+        ("Weekly", "2030-01-07T12:30:00"),
+        ("Call", "2030-01-07T12:45:00"),
+    ]
+
+    moved = client.put(
+        f"/calendar/events/{quiet['id']}?check_conflicts=true",
+        json={
+            "start_time": "2030-01-07T14:00:00",
+            "end_time": "2030-01-07T15:00:00",
+        },
+        headers=headers,
+    )
+    assert moved.json()["conflicts"] == []
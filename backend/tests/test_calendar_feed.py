@@ -0,0 +1,138 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from src.modules.calendar.ics import fold
+
+from .conftest import async_engine
+from .test_tasks import get_auth_headers
+
+
+def _feed_url(client, headers) -> str:
+    response = client.post("/calendar/feed-token", headers=headers)
+    assert response.status_code == 200
+    return response.json()["url"]
+
+
+def _unfold(body: str) -> list[str]:
+    return body.replace("\r\n ", "").split("\r\n")
+
+
+def test_feed_exports_events_and_dated_tasks(client: TestClient):
+    """Тест: лента содержит события, серии с повторами и задачи с дедлайном."""
+    headers = get_auth_headers(client)
+    url = _feed_url(client, headers)
+    client.post(
+        "/calendar/events",
+        json={
+            "title": "Lunch; with, team",
+            "description": "Первая строка\nвторая " + "длинная " * 20,
+            "start_time": "2030-01-07T12:00:00",
+            "end_time": "2030-01-07T13:00:00",
+        },
+        headers=headers,
+    )
+    series = client.post(
+        "/calendar/events",
+        json={
+            "title": "Standup",
+            "start_time": "2030-01-07T10:00:00",
+            "end_time": "2030-01-07T10:30:00",
+            "rrule": "FREQ=WEEKLY;BYDAY=MO",
+            "exdates": ["2030-01-14T10:00:00"],
+        },
+        headers=headers,
+    ).json()
+    client.put(
+        f"/calendar/events/{series['id']}/occurrences/2030-01-21T10:00:00",
+        json={"start_time": "2030-01-21T11:00:00"},
+        headers=headers,
+    )
+    client.post(
+        "/tasks/",
+        json={"title": "Report", "due_date": "2030-01-10T18:00:00"},
+        headers=headers,
+    )
+    client.post("/tasks/", json={"title": "Someday"}, headers=headers)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/calendar")
+    assert response.headers["etag"].startswith('"')
+    body = response.text
+    assert all(len(line.encode()) <= 75 for line in body.split("\r\n"))
+    lines = _unfold(body)
+    assert lines[0] == "BEGIN:VCALENDAR" and lines[-2] == "END:VCALENDAR"
+    assert lines.count("BEGIN:VEVENT") == 3
+    assert lines.count("BEGIN:VTODO") == 1
+    assert "SUMMARY:Lunch\\; with\\, team" in lines
+    assert "SUMMARY:Someday" not in lines
+    assert "RRULE:FREQ=WEEKLY;BYDAY=MO" in lines
+    assert "EXDATE:20300114T100000Z" in lines
+    assert "RECURRENCE-ID:20300121T100000Z" in lines
+    assert lines.count(f"UID:{series['id']}") == 2
+    assert "DUE:20300110T180000Z" in lines
+    assert any(line.startswith("DESCRIPTION:Первая строка\\nвторая") for line in lines)
+
+
+def test_unchanged_feed_is_not_rebuilt(client: TestClient):
+    """Тест: без изменений лента отдается как 304 без запросов к событиям."""
+    headers = get_auth_headers(client)
+    url = _feed_url(client, headers)
+    client.post(
+        "/calendar/events",
+        json={
+            "title": "Gym",
+            "start_time": "2030-01-07T08:00:00",
+            "end_time": "2030-01-07T09:00:00",
+        },
+        headers=headers,
+    )
+    etag = client.get(url).headers["etag"]
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        cached = client.get(url, headers={"If-None-Match": etag})
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert len(statements) == 1
+    assert "calendarevent" not in statements[0] and "task" not in statements[0]
+
+    # Задача без дедлайна в ленту не попадает и версию не меняет
+    client.post("/tasks/", json={"title": "Someday"}, headers=headers)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(
+        "/tasks/",
+        json={"title": "Report", "due_date": "2030-01-10T18:00:00"},
+        headers=headers,
+    )
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_feed_token_rotation_and_revocation(client: TestClient):
+    """Тест: лента доступна только по действующему токену."""
+    headers = get_auth_headers(client)
+    old_url = _feed_url(client, headers)
+    new_url = _feed_url(client, headers)
+    assert client.get(old_url).status_code == 404
+    assert client.get(new_url).status_code == 200
+    assert client.get("/calendar/feed.ics?token=guess").status_code == 404
+
+    client.delete("/calendar/feed-token", headers=headers)
+    assert client.get(new_url).status_code == 404
+
+
+def test_fold_keeps_utf8_characters_whole():
+    line = "DESCRIPTION:" + "ж" * 100
+    folded = fold(line).split("\r\n ")
+    assert "".join(folded) == line
+    assert all(len(part.encode()) <= 75 for part in folded)
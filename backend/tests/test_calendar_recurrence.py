@@ -0,0 +1,291 @@
+import time
+from datetime import datetime
+from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo
+
+from fastapi.testclient import TestClient
+
+from src.models import CalendarEvent
+from src.modules.calendar.recurrence import expand, find_occurrence
+
+from .test_tasks import get_auth_headers
+
+JANUARY = "/calendar/?start_date=2030-01-01&end_date=2030-02-01"
+
+
+def _create_series(client, headers, **fields):
+    response = client.post(
+        "/calendar/events",
+        json={
+            "title": "Standup",
+            "start_time": "2030-01-07T10:00:00",
+            "end_time": "2030-01-07T10:30:00",
+            "rrule": "FREQ=WEEKLY;BYDAY=MO",
+            **fields,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _starts(client, headers, url=JANUARY):
+    events = client.get(url, headers=headers).json()["events"]
+    return [(event["start_time"], event["title"]) for event in events]
+
+
+def test_weekly_series_with_exdate_and_overrides(client: TestClient):
+    """Тест: серия разворачивается в окне, EXDATE и замены повторов учтены."""
+    headers = get_auth_headers(client)
+    series = _create_series(client, headers, exdates=["2030-01-14T10:00:00"])
+    assert series["recurrence_id"] is None
+    assert _starts(client, headers) == [
+        ("2030-01-07T10:00:00", "Standup"),
+        ("2030-01-21T10:00:00", "Standup"),
+        ("2030-01-28T10:00:00", "Standup"),
+    ]
+
+    # Перенос одного повтора заменяет его отдельным событием
+    occurrence = f"/calendar/events/{series['id']}/occurrences/2030-01-21T10:00:00"
+    moved = client.put(
+        occurrence,
+        json={"title": "Planning", "start_time": "2030-01-22T12:00:00"},
+        headers=headers,
+    )
+    assert moved.status_code == 200
+    assert moved.json()["series_id"] == series["id"]
+    assert moved.json()["end_time"] == "2030-01-21T10:30:00"
+    client.put(
+        occurrence,
+        json={"end_time": "2030-01-22T13:00:00"},
+        headers=headers,
+    )
+    client.delete(
+        f"/calendar/events/{series['id']}/occurrences/2030-01-28T10:00:00",
+        headers=headers,
+    )
+    assert _starts(client, headers) == [
+        ("2030-01-07T10:00:00", "Standup"),
+        ("2030-01-22T12:00:00", "Planning"),
+    ]
+
+    # Только настоящие повторы серии
+    missing = client.delete(
+        f"/calendar/events/{series['id']}/occurrences/2030-01-08T10:00:00",
+        headers=headers,
+    )
+    assert missing.status_code == 404
+
+    # Удаление серии удаляет и ее измененные повторы
+    client.delete(f"/calendar/events/{series['id']}", headers=headers)
+    assert _starts(client, headers) == []
+
+
+def test_occurrences_are_paginated_with_events(client: TestClient):
+    """Тест: повторы и одиночные события идут одной курсорной лентой."""
+    headers = get_auth_headers(client)
+    _create_series(client, headers, rrule="RRULE:FREQ=WEEKLY;BYDAY=MO;COUNT=3")
+    client.post(
+        "/calendar/events",
+        json={
+            "title": "Review",
+            "start_time": "2030-01-15T09:00:00",
+            "end_time": "2030-01-15T10:00:00",
+        },
+        headers=headers,
+    )
+
+    seen = []
+    page = f"{JANUARY}&limit=1&with_total=true"
+    url = page
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.headers["X-Total-Count"] == "4"
+        seen += [event["start_time"] for event in response.json()["events"]]
+        cursor = response.headers.get("X-Next-Cursor")
+        url = cursor and f"{page}&cursor={cursor}"
+    assert seen == [
+        "2030-01-07T10:00:00",
+        "2030-01-14T10:00:00",
+        "2030-01-15T09:00:00",
+        "2030-01-21T10:00:00",
+    ]
+
+
+def test_infinite_series_cost_is_bounded(client: TestClient):
+    """Тест: бесконечная серия разворачивается только в окне и с лимитом."""
+    headers = get_auth_headers(client)
+    _create_series(
+        client,
+        headers,
+        start_time="1990-01-01T10:00:00",
+        end_time="1990-01-01T10:30:00",
+        rrule="FREQ=DAILY",
+    )
+    week = "/calendar/?start_date=2030-01-01&end_date=2030-01-08"
+    assert len(_starts(client, headers, week)) == 7
+
+    decade = "/calendar/?start_date=2030-01-01&end_date=2040-01-01"
+    assert client.get(decade, headers=headers).status_code == 400
+
+    hourly = client.post(
+        "/calendar/events",
+        json={
+            "title": "Ping",
+            "start_time": "2030-01-01T10:00:00",
+            "end_time": "2030-01-01T10:05:00",
+            "rrule": "FREQ=HOURLY",
+        },
+        headers=headers,
+    )
+    assert hourly.status_code == 422
+
+
+def test_invalid_rules_are_rejected(client: TestClient, session):
+    """Тест: правила без FREQ, с INTERVAL=0 и чаще раза в день - 422."""
+    headers = get_auth_headers(client)
+    for rule in (
+        "BYDAY=MO",
+        "FREQ=WEEKLY;INTERVAL=0",
+        "FREQ=DAILY;BYHOUR=9,10",
+        "FREQ=DAILY;BYMINUTE=0,30",
+    ):
+        response = client.post(
+            "/calendar/events",
+            json={
+                "title": "Broken",
+                "start_time": "2030-01-07T10:00:00",
+                "end_time": "2030-01-07T10:30:00",
+                "rrule": rule,
+            },
+            headers=headers,
+        )
+        assert response.status_code == 422, rule
+    # Один BYHOUR - по-прежнему один повтор в день
+    _create_series(client, headers, rrule="FREQ=DAILY;BYHOUR=10;COUNT=2")
+
+    # Правило, сохраненное до проверок, не ломает календарь
+    series = _create_series(client, headers, rrule="FREQ=WEEKLY;BYDAY=TU")
+    event = session.get(CalendarEvent, UUID(series["id"]))
+    event.rrule = "FREQ=WEEKLY;INTERVAL=0"
+    session.add(event)
+    session.commit()
+    response = client.get(JANUARY, headers=headers)
+    assert response.status_code == 200
+    assert ("2030-01-07T10:00:00", "Standup") in _starts(client, headers)
+
+
+def test_never_matching_rules_are_rejected(client: TestClient, session):
+    """Тест: правило без повторов - 422, сохраненное раньше не виснет."""
+    headers = get_auth_headers(client)
+    for rule in (
+        "FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30",
+        "FREQ=MONTHLY;BYMONTH=2;BYMONTHDAY=31",
+        "FREQ=YEARLY;COUNT=5;BYMONTH=2;BYMONTHDAY=30",
+        # Первый повтор дальше CALENDAR_RULE_HORIZON_YEARS и слишком
+        # длинная серия с COUNT
+        "FREQ=DAILY;BYMONTH=2;BYMONTHDAY=29;BYDAY=MO",
+        "FREQ=YEARLY;COUNT=200",
+    ):
+        started = time.perf_counter()
+        response = client.post(
+            "/calendar/events",
+            json={
+                "title": "Never",
+                "start_time": "2030-01-07T10:00:00",
+                "end_time": "2030-01-07T10:30:00",
+                "rrule": rule,
+            },
+            headers=headers,
+        )
+        assert response.status_code == 422, rule
+        assert time.perf_counter() - started < 1, rule
+    # Редкое, но существующее правило принимается
+    _create_series(client, headers, rrule="FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29")
+
+    series = _create_series(client, headers, rrule="FREQ=WEEKLY;BYDAY=TU")
+    event = session.get(CalendarEvent, UUID(series["id"]))
+    event.rrule = "FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30"
+    session.add(event)
+    session.commit()
+    started = time.perf_counter()
+    assert ("2030-01-07T10:00:00", "Standup") in _starts(client, headers)
+    busy = client.get(
+        "/calendar/free-busy?start=2030-01-07T08:00:00&end=2030-01-14T08:00:00",
+        headers=headers,
+    )
+    assert busy.status_code == 200
+    occurrence = f"/calendar/events/{series['id']}/occurrences/2030-01-07T10:00:00"
+    moved = client.put(occurrence, json={"title": "Fixed"}, headers=headers)
+    assert moved.status_code == 200
+    assert time.perf_counter() - started < 2
+
+    decades = "/calendar/?start_date=2030-01-01&end_date=2050-01-01"
+    assert client.get(decades, headers=headers).status_code == 400
+
+
+def test_update_clears_rule_and_exdates(client: TestClient):
+    """Тест: явные null и [] в PUT сбрасывают правило и исключения."""
+    headers = get_auth_headers(client)
+    series = _create_series(client, headers, exdates=["2030-01-14T10:00:00"])
+    url = f"/calendar/events/{series['id']}"
+    client.put(
+        f"{url}/occurrences/2030-01-21T10:00:00",
+        json={"title": "Planning"},
+        headers=headers,
+    )
+
+    cleared = client.put(url, json={"exdates": []}, headers=headers)
+    assert cleared.json()["exdates"] == []
+    assert cleared.json()["rrule"] == "FREQ=WEEKLY;BYDAY=MO"
+    assert len(_starts(client, headers)) == 4
+
+    single = client.put(url, json={"rrule": None}, headers=headers)
+    assert single.status_code == 200
+    assert single.json()["rrule"] is None
+    # Название не сбрасывается, а замены повторов удаляются вместе с серией
+    client.put(url, json={"title": None}, headers=headers)
+    assert _starts(client, headers) == [("2030-01-07T10:00:00", "Standup")]
+
+
+def test_expansion_keeps_local_time_across_dst():
+    """Тест: повторы держат местное время, длительность - точная."""
+    berlin = ZoneInfo("Europe/Berlin")
+    event = CalendarEvent(
+        id=uuid4(),
+        title="Night job",
+        start_time=datetime(2030, 3, 29, 2, 30),
+        end_time=datetime(2030, 3, 29, 4, 30),
+        rrule="FREQ=DAILY;UNTIL=20300402T000000Z",
+        owner_id=uuid4(),
+    )
+    occurrences = expand(event, datetime(2030, 3, 29), datetime(2030, 4, 3), tz=berlin)
+    # 31 марта 02:30 не существует: повтор сдвигается на час вперед, а
+    # двухчасовая работа заканчивается в 05:30 по летнему времени
+    assert occurrences == (
+        (datetime(2030, 3, 29, 2, 30), datetime(2030, 3, 29, 4, 30)),
+        (datetime(2030, 3, 30, 2, 30), datetime(2030, 3, 30, 4, 30)),
+        (datetime(2030, 3, 31, 3, 30), datetime(2030, 3, 31, 5, 30)),
+        (datetime(2030, 4, 1, 2, 30), datetime(2030, 4, 1, 4, 30)),
+    )
+    assert find_occurrence(event, datetime(2030, 3, 31, 3, 30), tz=berlin)
+    assert find_occurrence(event, datetime(2030, 3, 31, 2, 30), tz=berlin) is None
+
+
+def test_monthly_series_skips_to_the_window():
+    """Тест: MONTHLY/YEARLY из прошлого века дают те же повторы в окне."""
+    for rule, expected in (
+        ("FREQ=MONTHLY;BYDAY=-1FR", datetime(2030, 1, 25, 9)),
+        ("FREQ=MONTHLY;INTERVAL=5", datetime(2030, 1, 31, 9)),
+        ("FREQ=YEARLY;BYMONTH=1;BYMONTHDAY=31", datetime(2030, 1, 31, 9)),
+    ):
+        event = CalendarEvent(
+            id=uuid4(),
+            title="Report",
+            start_time=datetime(1905, 1, 31, 9),
+            end_time=datetime(1905, 1, 31, 10),
+            rrule=rule,
+            owner_id=uuid4(),
+        )
+        occurrences = expand(event, datetime(2030, 1, 1), datetime(2030, 2, 1))
+        assert [start for start, _ in occurrences] == [expected], rule
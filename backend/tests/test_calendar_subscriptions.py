@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import select, update
+
+from src.core import http_client
+from src.core.config import settings
+from src.models import CalendarSource, RemoteEvent
+from src.modules.calendar.subscriptions import (
+    normalize_feed_url,
+    sync_due_sources,
+    sync_source,
+)
+
+from .conftest import async_session_maker
+from .test_tasks import get_auth_headers
+
+FIXTURES = Path(__file__).parent / "fixtures" / "calendars"
+JANUARY = "/calendar/?start_date=2030-01-01&end_date=2030-02-01"
+
+
+class FeedServer(ThreadingHTTPServer):
+    """Локальный сервер календарей: отдает feeds[path] с ETag и 304."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FeedHandler)
+        self.feeds: dict[str, bytes] = {}
+        self.redirects: dict[str, str] = {}
+        self.requests: list[tuple[str, str | None]] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path in self.server.redirects:
+            self.send_response(302)
+            self.send_header("Location", self.server.redirects[self.path])
+            self.end_headers()
+            return
+        body = self.server.feeds.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"{}"'.format(hashlib.sha256(body).hexdigest()[:16])
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(name="feeds")
+def feeds_fixture(monkeypatch):
+    # Сессия на NullPool тестов: соединение из пула приложения пережило бы
+    # event loop этого теста
+    monkeypatch.setattr(
+        "src.modules.calendar.subscriptions.async_session_maker",
+        async_session_maker,
+    )
+    # Локальный сервер - внутренний адрес, его разрешаем явно
+    monkeypatch.setattr(settings, "CALENDAR_SUBSCRIPTION_ALLOWED_HOSTS", ["127.0.0.1"])
+    server = FeedServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _run(coro_factory):
+    async def run():
+        http_client.start_http_client()
+        try:
+            return await coro_factory()
+        finally:
+            await http_client.close_http_client()
+
+    return asyncio.run(run())
+
+
+def _make_due(session):
+    session.exec(update(CalendarSource).values(next_fetch_at=None))
+    session.commit()
+
+
+def _subscribe(client, headers, url, name="Team"):
+    response = client.post(
+        "/calendar/subscriptions", json={"url": url, "name": name}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _titles(client, headers):
+    events = client.get(JANUARY, headers=headers).json()["events"]
+    return [(event["start_time"], event["title"]) for event in events]
+
+
+def test_shared_feed_is_fetched_once(client: TestClient, session, feeds):
+    """Тест: одна загрузка на всех подписчиков, события видны в календаре."""
+    feeds.feeds["/team.ics"] = (FIXTURES / "team_v1.ics").read_bytes()
+    url = f"{feeds.base_url}/team.ics"
+    alice = get_auth_headers(client)
+    client.post(
+        "/auth/register",
+        json={"username": "bob", "email": "bob@example.com", "password": "secret"},
+    )
+    token = client.post(
+        "/auth/token", data={"username": "bob@example.com", "password": "secret"}
+    ).json()["access_token"]
+    bob = {"Authorization": f"Bearer {token}"}
+    subscription = _subscribe(client, alice, url)
+    _subscribe(client, bob, url)
+    duplicate = client.post("/calendar/subscriptions", json={"url": url}, headers=alice)
+    assert duplicate.status_code == 409
+
+    assert _run(lambda: sync_due_sources(10)) == 1
+    assert len(feeds.requests) == 1
+
+    expected = [
+        ("2030-01-07T09:00:00", "Kickoff"),
+        ("2030-01-08T09:00:00", "Standup"),
+        ("2030-01-16T00:00:00", "Offsite"),
+        ("2030-01-22T10:00:00", "Standup (late)"),
+        ("2030-01-24T15:00:00", "Retro"),
+        ("2030-01-29T09:00:00", "Standup"),
+    ]
+    assert _titles(client, alice) == expected
+    assert _titles(client, bob) == expected
+    events = client.get(JANUARY, headers=alice).json()["events"]
+    assert {event["subscription_id"] for event in events} == {subscription["id"]}
+    assert events[0]["description"].endswith("things we will discuss this quarter")
+
+    # Внешние события идут той же курсорной лентой
+    seen, page = [], f"{JANUARY}&limit=2&with_total=true"
+    next_url = page
+    while next_url:
+        response = client.get(next_url, headers=alice)
+        assert response.headers["X-Total-Count"] == "6"
+        seen += [event["start_time"] for event in response.json()["events"]]
+        cursor = response.headers.get("X-Next-Cursor")
+        next_url = cursor and f"{page}&cursor={cursor}"
+    assert seen == [start for start, _ in expected]
+
+    listed = client.get("/calendar/subscriptions", headers=alice).json()
+    assert listed[0]["url"] == url and listed[0]["fetched_at"]
+
+
+def test_resync_applies_only_the_diff(client: TestClient, session, feeds, monkeypatch):
+    """Тест: 304 без изменений, затем в БД меняются только отличающиеся UID."""
+    monkeypatch.setattr(settings, "CALENDAR_SUBSCRIPTION_BATCH_SIZE", 2)
+    feeds.feeds["/team.ics"] = (FIXTURES / "team_v1.ics").read_bytes()
+    headers = get_auth_headers(client)
+    _subscribe(client, headers, f"{feeds.base_url}/team.ics")
+    source_id = session.exec(select(CalendarSource.id)).one()
+
+    first = _run(lambda: sync_source(source_id))
+    assert (first.inserted, first.skipped) == (5, 1)
+    ids = {event.uid: event.id for event in session.exec(select(RemoteEvent))}
+
+    # Не пора - не загружается
+    assert _run(lambda: sync_source(source_id)) is None
+    _make_due(session)
+    etag = client.get(JANUARY, headers=headers).headers["etag"]
+    unchanged = _run(lambda: sync_source(source_id))
+    assert unchanged.not_modified
+    assert feeds.requests[-1][1] is not None
+    cached = client.get(JANUARY, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    feeds.feeds["/team.ics"] = (FIXTURES / "team_v2.ics").read_bytes()
+    _make_due(session)
+    result = _run(lambda: sync_source(source_id))
+    assert (result.inserted, result.updated, result.deleted) == (1, 1, 1)
+    assert result.unchanged == 3
+    # Изменения внешнего календаря меняют версию календаря подписчика
+    changed = client.get(JANUARY, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+
+    session.expire_all()
+    events = {event.uid: event for event in session.exec(select(RemoteEvent))}
+    assert "offsite@example.com" not in events
+    assert events["retro@example.com"].title == "Retrospective"
+    # Неизменившиеся и измененные строки не пересоздаются
+    assert events["kickoff@example.com"].id == ids["kickoff@example.com"]
+    assert events["retro@example.com"].id == ids["retro@example.com"]
+    assert ("2030-01-28T13:00:00", "Review") in _titles(client, headers)
+
+
+def test_never_matching_rule_is_skipped(client: TestClient, session, feeds):
+    """Тест: событие с правилом без повторов пропускается при загрузке."""
+    feeds.feeds["/never.ics"] = (
+        b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Example Corp//Never//EN\r\n"
+        b"BEGIN:VEVENT\r\nUID:never@example.com\r\nDTSTAMP:20291201T000000Z\r\n"
+        b"DTSTART:20300108T090000Z\r\nDTEND:20300108T093000Z\r\n"
+        b"RRULE:FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30\r\nSUMMARY:Never\r\n"
+        b"END:VEVENT\r\n"
+        b"BEGIN:VEVENT\r\nUID:planning@example.com\r\nDTSTAMP:20291201T000000Z\r\n"
+        b"DTSTART:20300109T090000Z\r\nDTEND:20300109T093000Z\r\n"
+        b"SUMMARY:Planning\r\nEND:VEVENT\r\n"
+        b"END:VCALENDAR\r\n"
+    )
+    headers = get_auth_headers(client)
+    _subscribe(client, headers, f"{feeds.base_url}/never.ics")
+    source_id = session.exec(select(CalendarSource.id)).one()
+
+    started = time.perf_counter()
+    result = _run(lambda: sync_source(source_id))
+    assert (result.inserted, result.skipped) == (1, 1)
+    assert _titles(client, headers) == [("2030-01-09T09:00:00", "Planning")]
+    assert time.perf_counter() - started < 2
+
+
+def test_broken_feed_keeps_events_and_backs_off(client: TestClient, session, feeds):
+    """Тест: оборванный календарь ничего не удаляет, подписка снимается."""
+    feeds.feeds["/team.ics"] = (FIXTURES / "team_v1.ics").read_bytes()
+    headers = get_auth_headers(client)
+    subscription = _subscribe(client, headers, f"{feeds.base_url}/team.ics")
+    source_id = session.exec(select(CalendarSource.id)).one()
+    _run(lambda: sync_source(source_id))
+
+    body = (FIXTURES / "team_v2.ics").read_bytes()
+    feeds.feeds["/team.ics"] = body[: body.index(b"BEGIN:VEVENT\r\nUID:retro")]
+    _make_due(session)
+    assert _run(lambda: sync_source(source_id)) is None
+
+    session.expire_all()
+    source = session.get(CalendarSource, source_id)
+    assert source.failure_count == 1
+    assert source.last_error == "invalid_calendar"
+    assert source.next_fetch_at is not None
+    uids = set(session.exec(select(RemoteEvent.uid)))
+    assert "offsite@example.com" in uids and "review@example.com" in uids
+
+    invalid = client.post(
+        "/calendar/subscriptions",
+        json={"url": "ftp://example.com/a.ics"},
+        headers=headers,
+    )
+    assert invalid.status_code == 422
+    assert normalize_feed_url(" webcal://example.com/a.ics") == (
+        "https://example.com/a.ics"
+    )
+
+    client.delete(f"/calendar/subscriptions/{subscription['id']}", headers=headers)
+    assert _titles(client, headers) == []
+    session.expire_all()
+    assert session.exec(select(RemoteEvent)).first() is None
+    assert session.exec(select(CalendarSource)).first() is None
+
+
+def test_internal_addresses_are_not_fetched(client: TestClient, session, feeds):
+    """Тест: внутренние адреса отклоняются и сразу, и после редиректа."""
+    headers = get_auth_headers(client)
+    for url in (
+        "http://169.254.169.254/latest/meta-data/",
+        "http://10.0.0.1/team.ics",
+        f"http://localhost:{feeds.server_address[1]}/team.ics",
+    ):
+        response = client.post(
+            "/calendar/subscriptions", json={"url": url}, headers=headers
+        )
+        assert response.status_code == 422, url
+
+    # Публичный (здесь - разрешенный) хост редиректит во внутреннюю сеть
+    feeds.feeds["/team.ics"] = (FIXTURES / "team_v1.ics").read_bytes()
+    feeds.redirects["/moved.ics"] = (
+        f"http://localhost:{feeds.server_address[1]}/team.ics"
+    )
+    _subscribe(client, headers, f"{feeds.base_url}/moved.ics")
+    source_id = session.exec(select(CalendarSource.id)).one()
+    assert _run(lambda: sync_source(source_id)) is None
+    assert [path for path, _ in feeds.requests] == ["/moved.ics"]
+
+    listed = client.get("/calendar/subscriptions", headers=headers).json()
+    assert listed[0]["last_error"] == "blocked_address"
+    assert _titles(client, headers) == []
@@ -0,0 +1,113 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import update
+
+from src.core.etag import conditional_get_stats
+from src.models import LinkMetadata
+
+from .conftest import async_engine
+from .test_idea_box import create_folder
+from .test_tasks import get_auth_headers
+
+
+def _etag(client, url, headers) -> str:
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+def _revalidate(client, url, headers, etag) -> int:
+    return client.get(url, headers={**headers, "If-None-Match": etag}).status_code
+
+
+def test_unchanged_list_is_one_version_read(client: TestClient):
+    """Тест: 304 по If-None-Match после одного запроса, к версии."""
+    headers = get_auth_headers(client)
+    client.post("/tasks/", json={"title": "Report"}, headers=headers)
+    conditional_get_stats.clear()
+    etag = _etag(client, "/tasks/", headers)
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        cached = client.get("/tasks/", headers={**headers, "If-None-Match": etag})
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert len(statements) == 1 and "collectionversion" in statements[0]
+
+    # Другая страница - другой ответ той же версии
+    assert _revalidate(client, "/tasks/?limit=1", headers, etag) == 200
+    client.post("/tasks/", json={"title": "Plan"}, headers=headers)
+    assert _revalidate(client, "/tasks/", headers, etag) == 200
+
+    stats = conditional_get_stats.stats()
+    assert stats["tasks"]["requests"] == 4
+    assert stats["tasks"]["conditional"] == 3
+    assert stats["total"]["not_modified"] == 1
+    assert stats["total"]["not_modified_percent"] == 25.0
+
+
+def test_idea_box_versions_follow_related_rows(client: TestClient, session):
+    """Тест: версии идей и тегов меняют теги, связи с ними и превью ссылок."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Inbox")["id"]
+    session.add(LinkMetadata(url="https://example.com/", title="Example"))
+    session.commit()
+    idea = client.post(
+        "/idea-box/ideas/",
+        json={
+            "folder_id": folder_id,
+            "idea_type": "link",
+            "url": "https://example.com/",
+            "tags": ["read"],
+        },
+        headers=headers,
+    ).json()
+    ideas = _etag(client, "/idea-box/ideas/", headers)
+    tags = _etag(client, "/idea-box/tags/", headers)
+    calendar = "/calendar/?start_date=2030-01-01&end_date=2030-02-01"
+    events = _etag(client, calendar, headers)
+
+    # Задача без дедлайна не меняет ни идеи, ни календарь
+    client.post("/tasks/", json={"title": "Someday"}, headers=headers)
+    assert _revalidate(client, "/idea-box/ideas/", headers, ideas) == 304
+    assert _revalidate(client, calendar, headers, events) == 304
+
+    # Превью ссылки обновилось - изменился список идей, но не тегов
+    session.exec(update(LinkMetadata).values(title="Example Domain"))
+    session.commit()
+    assert _revalidate(client, "/idea-box/ideas/", headers, ideas) == 200
+    assert _revalidate(client, "/idea-box/tags/", headers, tags) == 304
+    ideas = _etag(client, "/idea-box/ideas/", headers)
+
+    # Переименованный тег виден в идеях и в словаре тегов
+    tag_id = client.get("/idea-box/tags/", headers=headers).json()[0]["id"]
+    client.put(f"/idea-box/tags/{tag_id}", json={"name": "later"}, headers=headers)
+    assert _revalidate(client, "/idea-box/ideas/", headers, ideas) == 200
+    assert _revalidate(client, "/idea-box/tags/", headers, tags) == 200
+    ideas = _etag(client, "/idea-box/ideas/", headers)
+    tags = _etag(client, "/idea-box/tags/", headers)
+
+    client.put(
+        f"/idea-box/ideas/{idea['id']}", json={"add_tags": ["new"]}, headers=headers
+    )
+    assert _revalidate(client, "/idea-box/ideas/", headers, ideas) == 200
+    assert _revalidate(client, "/idea-box/tags/", headers, tags) == 200
+
+    # Версии у каждого пользователя свои
+    client.post(
+        "/auth/register",
+        json={"username": "bob", "email": "bob@example.com", "password": "secret"},
+    )
+    token = client.post(
+        "/auth/token", data={"username": "bob@example.com", "password": "secret"}
+    ).json()["access_token"]
+    other = {"Authorization": f"Bearer {token}"}
+    assert _revalidate(client, "/idea-box/ideas/", other, ideas) == 200
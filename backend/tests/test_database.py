@@ -0,0 +1,68 @@
+from sqlalchemy import text
+
+from .conftest import engine
+
+
+def test_sqlite_production_profile_applied(session):
+    """Тест: каждое соединение получает профиль PRAGMA из настроек."""
+    with engine.connect() as connection:
+        journal_mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+        foreign_keys = connection.execute(text("PRAGMA foreign_keys")).scalar()
+        temp_store = connection.execute(text("PRAGMA temp_store")).scalar()
+    assert journal_mode == "wal"
+    assert foreign_keys == 1
+    assert temp_store == 2  # MEMORY
+
+
+def test_reads_go_to_replica_outside_read_your_writes_window(client, mocker):
+    """Тест: GET уходит в реплику, но сразу после записи читает основную БД."""
+    from contextlib import asynccontextmanager
+
+    from src.core.database import recent_writes
+    from .conftest import async_session_maker
+    from .test_tasks import get_auth_headers
+
+    replica_sessions = []
+
+    @asynccontextmanager
+    async def replica_session_maker():
+        async with async_session_maker() as session:
+            replica_sessions.append(session)
+            yield session
+
+    mocker.patch("src.core.security.read_session_maker", replica_session_maker)
+    headers = get_auth_headers(client)
+
+    client.post("/tasks/", json={"title": "Fresh"}, headers=headers)
+    response = client.get("/tasks/", headers=headers)
+    assert len(response.json()) == 1
+    assert replica_sessions == []
+
+    # Окно истекло: чтение обслуживает реплика
+    recent_writes.clear()
+    response = client.get("/tasks/", headers=headers)
+    assert len(response.json()) == 1
+    assert len(replica_sessions) == 1
+
+
+def test_lazy_load_in_request_session_raises(client):
+    """Тест: ленивая подгрузка связи в сессии запроса явно запрещена."""
+    import asyncio
+
+    import pytest
+    from sqlmodel import select
+
+    from src.core.database import LazyLoadError
+    from src.models import User
+    from .conftest import async_session_maker
+    from .test_tasks import get_auth_headers
+
+    get_auth_headers(client)
+
+    async def touch_relationship():
+        async with async_session_maker() as db:
+            user = (await db.exec(select(User))).first()
+            return user.tasks
+
+    with pytest.raises(LazyLoadError, match="User.tasks"):
+        asyncio.run(touch_relationship())
@@ -1,5 +1,7 @@
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock
+from sqlmodel import select
+
+from src.models import LinkPreviewJob
 
 # Импортируем тестового пользователя и вспомогательную функцию для авторизации
 from .test_tasks import get_auth_headers
@@ -88,13 +90,8 @@ def test_create_idea_with_new_tags(client: TestClient):
     assert tag_names == {"feature", "urgent"}
 
 
-def test_create_link_idea_mocks_background_task(client: TestClient, mocker):
-    """Тест: создание идеи-ссылки вызывает фоновую задачу (с моком)."""
-    # Мокаем фоновую задачу, чтобы она не выполняла реальный HTTP-запрос
-    mocked_fetch = mocker.patch(
-        "src.modules.idea_box.ideas.router.fetch_and_save_metadata", MagicMock()
-    )
-
+def test_create_link_idea_enqueues_preview_job(client: TestClient, session):
+    """Тест: создание идеи-ссылки ставит задание на превью в очередь."""
     headers = get_auth_headers(client)
     folder_id = create_folder(client, headers, "Links")["id"]
 
@@ -105,8 +102,10 @@ def test_create_link_idea_mocks_background_task(client: TestClient, mocker):
     }
     client.post("/idea-box/ideas/", json=idea_data, headers=headers)
 
-    # Проверяем, что наша фоновая задача была вызвана
-    mocked_fetch.assert_called_once()
+    # Страница не загружается в запросе: задание ждет воркер
+    job = session.exec(select(LinkPreviewJob)).one()
+    assert job.url == "https://example.com"
+    assert job.attempts == 0
 
 
 def test_master_idea_filtering(client: TestClient):
@@ -252,3 +251,276 @@ def test_get_contextual_tags_in_folder(client: TestClient):
     assert "alpha" in tags_map
     assert "beta" not in tags_map
     assert tags_map["work"] == 1  # Счетчик для 'work' должен быть 1, а не 2
+
+
+def test_update_and_delete_tagged_idea(client: TestClient):
+    """Тест: смена тегов и удаление идеи с тегами работают в async-сессии."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Tagged")["id"]
+    idea_id = client.post(
+        "/idea-box/ideas/",
+        json={"folder_id": folder_id, "title": "T", "tags": ["alpha", "beta"]},
+        headers=headers,
+    ).json()["id"]
+
+    update_res = client.put(
+        f"/idea-box/ideas/{idea_id}", json={"tags": ["beta", "gamma"]}, headers=headers
+    )
+    assert update_res.status_code == 200
+    assert {tag["name"] for tag in update_res.json()["tags"]} == {"beta", "gamma"}
+
+    delete_res = client.delete(f"/idea-box/ideas/{idea_id}", headers=headers)
+    assert delete_res.status_code == 204
+    assert client.get(f"/idea-box/ideas/{idea_id}", headers=headers).status_code == 404
+
+
+def test_ideas_cursor_pagination_keeps_sort_order(client: TestClient):
+    """Тест: курсор обходит ленту идей в порядке (закреплена, обновлена)."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Paged")["id"]
+    ids = [
+        client.post(
+            "/idea-box/ideas/",
+            json={"folder_id": folder_id, "title": f"Idea {i}"},
+            headers=headers,
+        ).json()["id"]
+        for i in range(5)
+    ]
+    client.put(f"/idea-box/ideas/{ids[0]}", json={"is_pinned": True}, headers=headers)
+
+    first = client.get("/idea-box/ideas/?limit=3", headers=headers)
+    assert first.headers["X-Has-More"] == "true"
+    second = client.get(
+        "/idea-box/ideas/",
+        params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]},
+        headers=headers,
+    )
+    assert "X-Next-Cursor" not in second.headers
+
+    titles = [idea["title"] for idea in first.json() + second.json()]
+    assert titles == ["Idea 0", "Idea 4", "Idea 3", "Idea 2", "Idea 1"]
+
+
+def test_tags_cursor_pagination(client: TestClient):
+    """Тест: курсор по тегам учитывает сортировку по числу идей."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Tags")["id"]
+    for tags in (["a", "b", "c"], ["b", "c"], ["c"]):
+        client.post(
+            "/idea-box/ideas/",
+            json={"folder_id": folder_id, "title": "x", "tags": tags},
+            headers=headers,
+        )
+
+    first = client.get("/idea-box/tags/?limit=2", headers=headers)
+    second = client.get(
+        "/idea-box/tags/",
+        params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+        headers=headers,
+    )
+    names = [tag["name"] for tag in first.json() + second.json()]
+    assert names == ["c", "b", "a"]
+
+
+def test_idea_list_costs_constant_number_of_queries(client: TestClient):
+    """Тест: число SQL-запросов списка идей не зависит от числа идей."""
+    from sqlalchemy import event
+
+    from .conftest import async_engine
+
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "N+1")["id"]
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    def list_cost(extra_ideas: int) -> int:
+        for i in range(extra_ideas):
+            client.post(
+                "/idea-box/ideas/",
+                json={"folder_id": folder_id, "title": str(i), "tags": [f"t{i}", "x"]},
+                headers=headers,
+            )
+        statements.clear()
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+        try:
+            response = client.get("/idea-box/ideas/", headers=headers)
+        finally:
+            event.remove(
+                async_engine.sync_engine, "before_cursor_execute", count_statement
+            )
+        assert response.status_code == 200
+        return len(statements)
+
+    assert list_cost(2) == list_cost(10)
+
+
+def test_idea_full_text_search(client: TestClient):
+    """Тест: поиск по префиксу, русская морфология и ранжирование."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Search")["id"]
+    ideas = [
+        {"title": "Прочитать книгу", "content": "Про архитектуру"},
+        {"title": "Список дел", "content": "Вернуть книги в библиотеку"},
+        {"title": "Databases", "content": "Indexing strategies"},
+        {"title": "Groceries", "content": "Milk and bread"},
+    ]
+    for idea in ideas:
+        client.post(
+            "/idea-box/ideas/", json={"folder_id": folder_id, **idea}, headers=headers
+        )
+
+    def search(q: str) -> list:
+        response = client.get("/idea-box/ideas/", params={"q": q}, headers=headers)
+        assert response.status_code == 200
+        return [idea["title"] for idea in response.json()]
+
+    # Префикс и стемминг английских слов
+    assert search("datab") == ["Databases"]
+    assert search("index") == ["Databases"]
+    # Другая форма русского слова; совпадение в заголовке важнее
+    assert search("книгами") == ["Прочитать книгу", "Список дел"]
+    # Все слова запроса обязательны, синтаксис FTS экранируется
+    assert search('milk "bread') == ["Groceries"]
+    assert search("milk architecture") == []
+    # Строка без слов не фильтрует список
+    assert len(search("!!!")) == 4
+
+
+def test_idea_search_cursor_pagination(client: TestClient):
+    """Тест: результаты поиска листаются курсором без пропусков и повторов."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Notes")["id"]
+    for i in range(5):
+        client.post(
+            "/idea-box/ideas/",
+            json={"folder_id": folder_id, "title": f"Note {i}", "content": "note"},
+            headers=headers,
+        )
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "note", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/idea-box/ideas/", params=params, headers=headers)
+        seen += [idea["id"] for idea in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+
+def test_rename_and_delete_tag(client: TestClient):
+    """Тест: владелец может переименовать и удалить свой тег."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Tags")["id"]
+    client.post(
+        "/idea-box/ideas/",
+        json={"folder_id": folder_id, "title": "Tagged", "tags": ["old"]},
+        headers=headers,
+    )
+    tag_id = client.get("/idea-box/tags/", headers=headers).json()[0]["id"]
+
+    response = client.put(
+        f"/idea-box/tags/{tag_id}", json={"name": "new"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "new"
+    assert client.delete(f"/idea-box/tags/{tag_id}", headers=headers).status_code == 204
+    assert client.get("/idea-box/tags/", headers=headers).json() == []
+
+
+def test_tag_resolution_costs_two_statements(client: TestClient, session):
+    """Тест: 20 тегов идеи - один SELECT и одна вставка, без дублей тегов."""
+    from sqlalchemy import event
+
+    from src.models import Tag
+
+    from .conftest import async_engine
+
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Many tags")["id"]
+    names = [f"tag{i}" for i in range(20)]
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    def tag_statements(tags) -> int:
+        statements.clear()
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+        try:
+            response = client.post(
+                "/idea-box/ideas/",
+                json={"folder_id": folder_id, "title": "T", "tags": tags},
+                headers=headers,
+            )
+        finally:
+            event.remove(
+                async_engine.sync_engine, "before_cursor_execute", count_statement
+            )
+        assert response.status_code == 201
+        assert {tag["name"] for tag in response.json()["tags"]} == set(tags)
+        # Запросы к самой таблице tag (без загрузки тегов для ответа)
+        return sum(
+            " tag " in statement.replace("\n", " ") + " "
+            and "ideataglink" not in statement
+            for statement in statements
+        )
+
+    assert tag_statements(names) == 2
+    # Существующие теги находятся одним запросом, новых строк не появляется
+    assert tag_statements(names[:10] + ["new"]) == 2
+    assert tag_statements(names) == 1
+    assert len(session.exec(select(Tag)).all()) == 21
+
+
+def test_update_idea_add_and_remove_tags(client: TestClient):
+    """Тест: add_tags/remove_tags меняют только указанные теги идеи."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Tag diff")["id"]
+    idea_id = client.post(
+        "/idea-box/ideas/",
+        json={"folder_id": folder_id, "title": "T", "tags": ["a", "b", "c"]},
+        headers=headers,
+    ).json()["id"]
+
+    response = client.put(
+        f"/idea-box/ideas/{idea_id}",
+        json={"add_tags": ["d", "a"], "remove_tags": ["b", "missing"]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert {tag["name"] for tag in response.json()["tags"]} == {"a", "c", "d"}
+
+    # Полная замена и точечная правка в одном запросе
+    response = client.put(
+        f"/idea-box/ideas/{idea_id}",
+        json={"tags": ["x"], "add_tags": ["y"], "remove_tags": ["x"]},
+        headers=headers,
+    )
+    assert {tag["name"] for tag in response.json()["tags"]} == {"y"}
+
+
+def test_rename_tag_to_existing_name_conflicts(client: TestClient):
+    """Тест: имя тега уникально у владельца."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Tags")["id"]
+    client.post(
+        "/idea-box/ideas/",
+        json={"folder_id": folder_id, "title": "T", "tags": ["one", "two"]},
+        headers=headers,
+    )
+    tags = {
+        tag["name"]: tag["id"]
+        for tag in client.get("/idea-box/tags/", headers=headers).json()
+    }
+
+    response = client.put(
+        f"/idea-box/tags/{tags['one']}", json={"name": "two"}, headers=headers
+    )
+    assert response.status_code == 409
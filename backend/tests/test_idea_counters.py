@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+from sqlmodel import select, update
+
+from src.models import FolderTagCount, IdeaFolder, Tag
+from src.modules.idea_box.services.counters import rebuild_counters
+
+from .conftest import async_session_maker
+from .test_idea_box import create_folder
+from .test_tasks import get_auth_headers
+
+
+def _create_idea(client, headers, folder_id, tags):
+    response = client.post(
+        "/idea-box/ideas/",
+        json={"folder_id": folder_id, "title": "T", "tags": tags},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _tag_counts(client, headers, folder_id=None):
+    url = f"/idea-box/folders/{folder_id}/tags" if folder_id else "/idea-box/tags/"
+    return {
+        tag["name"]: tag["idea_count"]
+        for tag in client.get(url, headers=headers).json()
+    }
+
+
+def _folder_counts(client, headers):
+    folders = client.get("/idea-box/folders/", headers=headers).json()
+    return {folder["name"]: folder["idea_count"] for folder in folders}
+
+
+def _drift(session):
+    owner_id = session.exec(select(IdeaFolder.owner_id)).first()
+
+    async def run():
+        async with async_session_maker() as db:
+            drift = await rebuild_counters(db, owner_id)
+            await db.commit()
+            return drift
+
+    return asyncio.run(run())
+
+
+def test_counters_follow_idea_changes(client: TestClient, session):
+    """Тест: счетчики тегов и папок меняются вместе с идеями."""
+    headers = get_auth_headers(client)
+    folder_a = create_folder(client, headers, "A")["id"]
+    folder_b = create_folder(client, headers, "B")["id"]
+    first = _create_idea(client, headers, folder_a, ["x", "y"])
+    _create_idea(client, headers, folder_a, ["x"])
+    last = _create_idea(client, headers, folder_b, ["x"])
+
+    assert _tag_counts(client, headers) == {"x": 3, "y": 1}
+    assert _tag_counts(client, headers, folder_a) == {"x": 2, "y": 1}
+    assert _folder_counts(client, headers) == {"A": 2, "B": 1}
+
+    # Перенос идеи переносит и ее теги
+    client.put(
+        f"/idea-box/ideas/{first}", json={"folder_id": folder_b}, headers=headers
+    )
+    assert _tag_counts(client, headers, folder_a) == {"x": 1}
+    assert _tag_counts(client, headers, folder_b) == {"x": 2, "y": 1}
+    assert _folder_counts(client, headers) == {"A": 1, "B": 2}
+
+    # Тег без идей пропадает из словаря и из тегов папки
+    client.put(f"/idea-box/ideas/{first}", json={"remove_tags": ["y"]}, headers=headers)
+    assert _tag_counts(client, headers) == {"x": 3}
+    assert _tag_counts(client, headers, folder_b) == {"x": 2}
+
+    client.delete(f"/idea-box/ideas/{last}", headers=headers)
+    assert _tag_counts(client, headers) == {"x": 2}
+    assert _folder_counts(client, headers) == {"A": 1, "B": 1}
+
+    tag_id = session.exec(select(Tag.id).where(Tag.name == "x")).one()
+    client.delete(f"/idea-box/tags/{tag_id}", headers=headers)
+    assert session.exec(select(FolderTagCount)).all() == []
+    assert not _drift(session)
+
+
+def test_bulk_import_updates_counters(client: TestClient, session):
+    """Тест: массовый импорт в обход ORM тоже обновляет счетчики."""
+    headers = get_auth_headers(client)
+    lines = [
+        {"title": "1", "folder": "Inbox", "tags": ["a", "b"]},
+        {"title": "2", "folder": "Inbox", "tags": ["a"]},
+        {"title": "3", "tags": ["a"]},
+    ]
+    client.post(
+        "/idea-box/import/",
+        files={"file": ("i.ndjson", "\n".join(map(json.dumps, lines)).encode())},
+        headers=headers,
+    )
+    assert _folder_counts(client, headers) == {"Imported": 1, "Inbox": 2}
+    assert _tag_counts(client, headers) == {"a": 3, "b": 1}
+    assert not _drift(session)
+
+
+def test_rebuild_counters_repairs_drift(client: TestClient, session):
+    """Тест: пересчет исправляет разошедшиеся счетчики и сообщает о них."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "A")["id"]
+    _create_idea(client, headers, folder_id, ["x", "y"])
+    _create_idea(client, headers, folder_id, ["x"])
+
+    session.exec(update(Tag).values(idea_count=7))
+    session.exec(update(IdeaFolder).values(idea_count=0))
+    session.exec(
+        update(FolderTagCount)
+        .where(FolderTagCount.idea_count == 1)
+        .values(idea_count=5)
+    )
+    session.commit()
+
+    drift = _drift(session)
+    assert (drift.folders, drift.tags, drift.folder_tags) == (1, 2, 1)
+    assert _tag_counts(client, headers) == {"x": 2, "y": 1}
+    assert _tag_counts(client, headers, folder_id) == {"x": 2, "y": 1}
+    assert _folder_counts(client, headers) == {"A": 2}
+    assert not _drift(session)
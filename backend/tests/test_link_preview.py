@@ -0,0 +1,414 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import select, update
+
+from src.core import http_client
+from src.core.config import settings
+from src.core.utils import get_current_time
+from src.core.http_client import HostLimiter
+from src.models import Idea, LinkMetadata, LinkPreviewJob
+from src.modules.idea_box.services.html_head import HeadMetadataParser
+from src.modules.idea_box.services.link_jobs import (
+    link_job_stats,
+    queue_stats,
+    run_next_job,
+)
+from src.modules.idea_box.services.link_preview import (
+    fetch_link_metadata,
+    freshness_lifetime,
+)
+from src.modules.idea_box.services.link_sweeper import revalidate_stale_links
+
+from .conftest import async_session_maker
+from .test_idea_box import create_folder
+from .test_tasks import get_auth_headers
+
+PAGE = """
+<html><head>
+<title>Fallback title</title>
+<meta property="og:title" content="OG title">
+<meta property="og:description" content="About">
+<meta property="og:image" content="https://example.com/a.png">
+</head><body>Body</body></html>
+"""
+
+
+async def _with_mock_client(handler, coro_factory):
+    http_client.start_http_client()
+    await http_client.get_http_client().aclose()
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        return await coro_factory()
+    finally:
+        await http_client.close_http_client()
+
+
+def test_head_parser_stops_at_body_and_prefers_open_graph():
+    parser = HeadMetadataParser("utf-8")
+    head = (
+        "<html><head><title>Fallback</title>"
+        '<meta name="description" content="Plain">'
+        '<meta name="twitter:description" content="Twitter">'
+        '<meta name="twitter:title" content="Twitter title">'
+        '<meta property="og:description" content="OG">'
+        "<script>var body = '<body>';</script>"
+    ).encode()
+    # Head приходит двумя кусками: после первого разбор еще не закончен
+    assert parser.feed(head[:40]) is False
+    assert parser.feed(head[40:]) is False
+    assert parser.feed(b"</head><body>" + b"<p>x</p>" * 1000) is True
+
+    assert parser.result() == {
+        "title": "Twitter title",
+        "description": "OG",
+        "image_url": None,
+    }
+
+
+def test_fetch_link_metadata_stops_reading_after_head():
+    sent = []
+
+    async def body():
+        yield PAGE.encode()
+        for _ in range(100):
+            sent.append(1)
+            yield b"<p>" + b"x" * 16384 + b"</p>"
+
+    def handler(request):
+        return httpx.Response(
+            200, content=body(), headers={"Content-Type": "text/html"}
+        )
+
+    metadata = asyncio.run(
+        _with_mock_client(
+            handler, lambda: fetch_link_metadata("https://example.com/page")
+        )
+    )
+    assert metadata["title"] == "OG title"
+    assert metadata["content_type"] == "text/html"
+    # Тело страницы после </head> не дочитывается
+    assert len(sent) <= 1
+
+
+def test_fetch_link_metadata_respects_byte_cap(monkeypatch):
+    monkeypatch.setattr(settings, "LINK_PREVIEW_MAX_BYTES", 64 * 1024)
+    sent = []
+
+    async def body():
+        yield b"<html><head><title>Endless</title>"
+        for _ in range(1000):
+            sent.append(1)
+            yield b"<meta name='x' content='" + b"y" * 16384 + b"'>"
+
+    def handler(request):
+        return httpx.Response(
+            200, content=body(), headers={"Content-Type": "text/html"}
+        )
+
+    metadata = asyncio.run(
+        _with_mock_client(
+            handler, lambda: fetch_link_metadata("https://example.com/page")
+        )
+    )
+    assert metadata["title"] == "Endless"
+    assert len(sent) <= 5
+
+
+def test_fetch_link_metadata_typed_preview_for_files():
+    def handler(request):
+        return httpx.Response(
+            200, content=b"%PDF-1.7", headers={"Content-Type": "application/pdf"}
+        )
+
+    metadata = asyncio.run(
+        _with_mock_client(
+            handler,
+            lambda: fetch_link_metadata("https://example.com/docs/Report%202024.pdf"),
+        )
+    )
+    assert metadata["title"] == "Report 2024.pdf"
+    assert metadata["image_url"] is None
+    assert metadata["content_type"] == "application/pdf"
+
+
+def test_host_limiter_caps_requests_per_host():
+    async def scenario():
+        limiter = HostLimiter(total=10, per_host=2)
+        active = {"a.test": 0, "b.test": 0}
+        peak = {"a.test": 0, "b.test": 0}
+
+        async def request(host):
+            async with limiter.slot(f"https://{host}/page"):
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+                await asyncio.sleep(0.01)
+                active[host] -= 1
+
+        await asyncio.gather(
+            *(request("a.test") for _ in range(8)),
+            *(request("b.test") for _ in range(3)),
+        )
+        return peak, limiter._hosts
+
+    peak, hosts = asyncio.run(scenario())
+    assert peak == {"a.test": 2, "b.test": 2}
+    # Семафоры хостов без ожидающих запросов удалены
+    assert hosts == {}
+
+
+@pytest.fixture(name="run_jobs")
+def run_jobs_fixture(monkeypatch):
+    """Выполняет готовые задания очереди с подставным HTTP-транспортом."""
+    # Сессия на NullPool тестов: соединение из пула приложения пережило бы
+    # event loop этого теста
+    monkeypatch.setattr(
+        "src.modules.idea_box.services.link_jobs.async_session_maker",
+        async_session_maker,
+    )
+    link_job_stats.clear()
+
+    def run(handler) -> int:
+        async def drain():
+            processed = 0
+            while await run_next_job():
+                processed += 1
+            return processed
+
+        return asyncio.run(_with_mock_client(handler, drain))
+
+    return run
+
+
+def _create_link_idea(client, headers, folder_id, url):
+    response = client.post(
+        "/idea-box/ideas/",
+        json={
+            "folder_id": folder_id,
+            "idea_type": "link",
+            "title": "Link",
+            "url": url,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def _enqueue(session, url):
+    session.add(LinkPreviewJob(url=url))
+    session.commit()
+
+
+def _expire_all(session):
+    session.exec(
+        update(LinkMetadata).values(expires_at=get_current_time() - timedelta(1))
+    )
+    session.commit()
+
+
+def test_same_url_is_fetched_once_for_all_ideas(client: TestClient, session, run_jobs):
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Links")["id"]
+    url = "https://example.com/trending"
+    for _ in range(5):
+        _create_link_idea(client, headers, folder_id, url)
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, text=PAGE, headers={"Content-Type": "text/html"})
+
+    # Пять идей - одно задание
+    job = session.exec(select(LinkPreviewJob)).one()
+    assert job.url == url
+    assert run_jobs(handler) == 1
+
+    assert len(requests) == 1
+    metadata = session.exec(select(LinkMetadata)).one()
+    assert metadata.title == "OG title"
+    assert metadata.content_type == "text/html"
+    ideas = session.exec(select(Idea)).all()
+    assert {idea.link_metadata_id for idea in ideas} == {metadata.id}
+    assert session.exec(select(LinkPreviewJob)).all() == []
+    assert link_job_stats.stats()["completed"] == 1
+
+    # Идея со ссылкой из свежего кэша получает превью сразу, без задания
+    idea = _create_link_idea(client, headers, folder_id, url)
+    assert idea["link_metadata"]["title"] == "OG title"
+    assert session.exec(select(LinkPreviewJob)).all() == []
+
+
+def test_failed_job_is_retried_with_backoff(session, run_jobs):
+    responses = [
+        httpx.Response(503),
+        httpx.Response(200, text=PAGE, headers={"Content-Type": "text/html"}),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    url = "https://example.com/flaky"
+    _enqueue(session, url)
+    assert run_jobs(handler) == 1
+
+    job = session.exec(select(LinkPreviewJob)).one()
+    assert job.attempts == 1
+    assert job.locked_until is None
+    assert "503" in job.last_error
+    # Повтор - не раньше паузы
+    assert run_jobs(handler) == 0
+
+    session.exec(
+        update(LinkPreviewJob).values(run_after=get_current_time() - timedelta(1))
+    )
+    session.commit()
+    assert run_jobs(handler) == 1
+
+    assert session.exec(select(LinkPreviewJob)).all() == []
+    metadata = session.exec(select(LinkMetadata)).one()
+    session.refresh(metadata)
+    assert metadata.title == "OG title"
+    assert metadata.failure_count == 0
+    assert link_job_stats.stats()["retried"] == 1
+
+
+def test_stale_metadata_is_revalidated_with_validators(session, run_jobs):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"Cache-Control": "max-age=7200"})
+        return httpx.Response(
+            200,
+            text=PAGE,
+            headers={
+                "Content-Type": "text/html",
+                "ETag": '"v1"',
+                "Last-Modified": "Mon, 05 Oct 2026 10:00:00 GMT",
+            },
+        )
+
+    url = "https://example.com/article"
+    _enqueue(session, url)
+    run_jobs(handler)
+    # Свежая запись: задание на ту же ссылку не ходит в сеть
+    _enqueue(session, url)
+    run_jobs(handler)
+    assert len(requests) == 1
+
+    _expire_all(session)
+    _enqueue(session, url)
+    run_jobs(handler)
+
+    assert len(requests) == 2
+    assert requests[1].headers["if-modified-since"] == "Mon, 05 Oct 2026 10:00:00 GMT"
+    metadata = session.exec(select(LinkMetadata)).one()
+    session.refresh(metadata)
+    # 304 продлевает срок, данные и валидаторы остаются прежними
+    assert metadata.title == "OG title"
+    assert metadata.etag == '"v1"'
+    assert metadata.expires_at > get_current_time().replace(tzinfo=None)
+
+
+def test_failed_fetch_is_negatively_cached(
+    client: TestClient, session, run_jobs, monkeypatch
+):
+    monkeypatch.setattr(settings, "LINK_PREVIEW_JOB_MAX_ATTEMPTS", 1)
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Links")["id"]
+    url = "https://example.com/gone"
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(404)
+
+    _create_link_idea(client, headers, folder_id, url)
+    run_jobs(handler)
+    # Новая идея с мертвой ссылкой не ставит задание повторно
+    _create_link_idea(client, headers, folder_id, url)
+    run_jobs(handler)
+
+    assert len(requests) == 1
+    assert session.exec(select(LinkPreviewJob)).all() == []
+    metadata = session.exec(select(LinkMetadata)).one()
+    assert metadata.failure_count == 1
+    assert metadata.title is None
+    assert "404" in metadata.last_error
+    ideas = session.exec(select(Idea)).all()
+    assert {idea.link_metadata_id for idea in ideas} == {metadata.id}
+    assert link_job_stats.stats()["failed"] == 1
+
+
+def test_queue_stats_report_depth(session):
+    _enqueue(session, "https://example.com/a")
+    _enqueue(session, "https://example.com/b")
+
+    async def stats():
+        async with async_session_maker() as db:
+            return await queue_stats(db)
+
+    stats = asyncio.run(stats())
+    assert stats["queued"] == 2
+    assert stats["due"] == 2
+    assert stats["running"] == 0
+    assert stats["oldest_age_seconds"] >= 0
+
+
+def test_freshness_lifetime_honours_cache_headers():
+    def lifetime(**headers):
+        headers = {name.replace("_", "-"): value for name, value in headers.items()}
+        return freshness_lifetime(httpx.Headers(headers)).total_seconds()
+
+    assert lifetime() == settings.LINK_PREVIEW_TTL_SECONDS
+    assert lifetime(cache_control="public, max-age=7200") == 7200
+    assert lifetime(cache_control="max-age=7200, s-maxage=10800") == 10800
+    # no-store и слишком короткие сроки поднимаются до минимума
+    assert lifetime(cache_control="no-store") == settings.LINK_PREVIEW_MIN_TTL_SECONDS
+    assert lifetime(cache_control="max-age=5") == settings.LINK_PREVIEW_MIN_TTL_SECONDS
+    assert lifetime(expires="0") == settings.LINK_PREVIEW_MIN_TTL_SECONDS
+    assert (
+        lifetime(
+            date="Mon, 05 Oct 2026 10:00:00 GMT",
+            expires="Mon, 05 Oct 2026 14:00:00 GMT",
+        )
+        == 4 * 3600
+    )
+    assert (
+        lifetime(cache_control="max-age=999999999")
+        == settings.LINK_PREVIEW_MAX_TTL_SECONDS
+    )
+
+
+def test_sweeper_revalidates_stale_entries_in_batches(session, monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/broken":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, text=PAGE, headers={"Content-Type": "text/html"})
+
+    session.add_all(
+        LinkMetadata(url=f"https://example.com/{path}")
+        for path in ("a", "b", "c", "broken")
+    )
+    session.commit()
+    monkeypatch.setattr(
+        "src.modules.idea_box.services.link_sweeper.async_session_maker",
+        async_session_maker,
+    )
+
+    async def sweep():
+        return [await revalidate_stale_links(3), await revalidate_stale_links(3)]
+
+    counts = asyncio.run(_with_mock_client(handler, sweep))
+
+    assert counts == [3, 1]
+    rows = {m.url.rsplit("/", 1)[1]: m for m in session.exec(select(LinkMetadata))}
+    assert rows["a"].title == "OG title"
+    assert rows["broken"].failure_count == 1
+    # Все записи получили новый срок и в следующую пачку не попадут
+    assert asyncio.run(revalidate_stale_links(3)) == 0
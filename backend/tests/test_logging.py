@@ -0,0 +1,45 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from src.core.log import (
+    DebugSamplingFilter,
+    JsonFormatter,
+    RequestIdFilter,
+    request_id_var,
+)
+
+
+def test_json_formatter_includes_request_id_and_extra():
+    record = logging.makeLogRecord(
+        {"name": "test", "levelno": logging.INFO, "levelname": "INFO", "msg": "hi %s"}
+    )
+    record.args = ("there",)
+    record.url = "https://example.com"
+    token = request_id_var.set("abc123")
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hi there"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "abc123"
+    assert entry["url"] == "https://example.com"
+
+
+def test_debug_sampling_keeps_other_levels():
+    never = DebugSamplingFilter(rate=0)
+    debug = logging.makeLogRecord({"levelno": logging.DEBUG})
+    warning = logging.makeLogRecord({"levelno": logging.WARNING})
+    assert not never.filter(debug)
+    assert never.filter(warning)
+    assert DebugSamplingFilter(rate=1).filter(debug)
+
+
+def test_request_id_header_is_echoed_or_generated(client: TestClient):
+    response = client.get("/", headers={"X-Request-ID": "req-42"})
+    assert response.headers["X-Request-ID"] == "req-42"
+    assert len(client.get("/").headers["X-Request-ID"]) == 32
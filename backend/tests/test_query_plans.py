@@ -0,0 +1,264 @@
+"""
+Планы запросов списковых эндпоинтов.
+
+Каждый эндпоинт вызывается через API, его SELECT-запросы перехватываются и
+повторяются с EXPLAIN QUERY PLAN. Тест падает, если план читает таблицу
+целиком (SCAN) или сортирует результат во временном B-дереве: значит,
+запрос перестал попадать в индекс и будет замедляться с ростом данных.
+"""
+
+import re
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlmodel import select
+
+from src.models import CalendarSource, CalendarSubscription, RemoteEvent, User
+
+from .conftest import async_engine, engine
+from .test_idea_box import create_folder
+from .test_tasks import get_auth_headers
+
+# Допустимые узлы плана, которые иначе считались бы деградацией, и запросы,
+# для которых они допустимы
+ALLOWED_PLAN_STEPS = [
+    # Виртуальная таблица FTS5 ищет по своему индексу, SCAN здесь - MATCH
+    (r"^SCAN idea_fts VIRTUAL TABLE INDEX", r"\bidea_fts\b"),
+    # Поиск сортирует по релевантности, ее нет ни в одном индексе
+    (r"^USE TEMP B-TREE FOR ORDER BY$", r"\bidea_fts\b"),
+    # Теги папки: индекс упорядочен по счетчику, по имени сортируются только
+    # теги с равным счетчиком
+    (r"^USE TEMP B-TREE FOR RIGHT PART OF ORDER BY$", r"\bfoldertagcount\b"),
+]
+
+BAD_STEP = re.compile(r"^(SCAN \S+|USE TEMP B-TREE.*)")
+
+
+def _plan(statement: str, parameters) -> list[str]:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).all()
+    return [row[3] for row in rows]
+
+
+def _bad_steps(statement: str, parameters) -> list[str]:
+    return [
+        step
+        for step in _plan(statement, parameters)
+        if BAD_STEP.match(step)
+        and not any(
+            re.search(step_pattern, step) and re.search(statement_pattern, statement)
+            for step_pattern, statement_pattern in ALLOWED_PLAN_STEPS
+        )
+    ]
+
+
+@pytest.fixture(name="captured")
+def captured_fixture():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+@pytest.fixture(name="seeded")
+def seeded_fixture(client: TestClient, session):
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Plans")["id"]
+    for i in range(3):
+        client.post(
+            "/idea-box/ideas/",
+            json={
+                "folder_id": folder_id,
+                "title": f"idea {i}",
+                "content": "query plan",
+                "tags": ["work", f"t{i}"],
+            },
+            headers=headers,
+        )
+        client.post(
+            "/tasks/",
+            json={
+                "title": f"task {i}",
+                "due_date": "2030-01-0{}T10:00:00".format(i + 1),
+            },
+            headers=headers,
+        )
+        client.post(
+            "/calendar/events",
+            json={
+                "title": f"event {i}",
+                "start_time": f"2030-01-0{i + 1}T10:00:00",
+                "end_time": f"2030-01-0{i + 1}T11:00:00",
+            },
+            headers=headers,
+        )
+    client.post(
+        "/calendar/events",
+        json={
+            "title": "trip",
+            "start_time": "2030-01-10T08:00:00",
+            "end_time": "2030-01-12T20:00:00",
+        },
+        headers=headers,
+    )
+    series = client.post(
+        "/calendar/events",
+        json={
+            "title": "weekly",
+            "start_time": "2030-01-07T09:00:00",
+            "end_time": "2030-01-07T09:30:00",
+            "rrule": "FREQ=WEEKLY",
+        },
+        headers=headers,
+    ).json()
+    client.put(
+        f"/calendar/events/{series['id']}/occurrences/2030-01-14T09:00:00",
+        json={"title": "moved"},
+        headers=headers,
+    )
+    # Внешний календарь с обычным, длинным и повторяющимся событием
+    source = CalendarSource(url="https://example.com/team.ics")
+    session.add(source)
+    session.flush()
+    session.add(
+        CalendarSubscription(
+            name="Team",
+            owner_id=session.exec(select(User.id)).one(),
+            source_id=source.id,
+        )
+    )
+    for uid, start, end, rrule, recurrence_id in [
+        ("review", (2030, 1, 8, 14), (2030, 1, 8, 15), None, None),
+        ("offsite", (2030, 1, 16), (2030, 1, 18), None, None),
+        ("sync", (2030, 1, 2, 9), (2030, 1, 2, 10), "FREQ=WEEKLY", None),
+        ("sync", (2030, 1, 9, 11), (2030, 1, 9, 12), None, (2030, 1, 9, 9)),
+    ]:
+        session.add(
+            RemoteEvent(
+                source_id=source.id,
+                uid=uid,
+                digest=uid,
+                title=uid,
+                start_time=datetime(*start),
+                end_time=datetime(*end),
+                rrule=rrule,
+                recurrence_id=recurrence_id and datetime(*recurrence_id),
+            )
+        )
+    session.commit()
+    # Без статистики планировщик SQLite выбирает индексы эвристически,
+    # как на свежей базе без ANALYZE
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS sqlite_stat1"))
+    return headers, folder_id
+
+
+LIST_URLS = [
+    "/idea-box/ideas/",
+    "/idea-box/ideas/?with_total=true",
+    "/idea-box/ideas/?folder_id={folder_id}",
+    "/idea-box/ideas/?tags=work",
+    "/idea-box/ideas/?folder_id={folder_id}&tags=work&pinned=false",
+    "/idea-box/ideas/?pinned=true",
+    "/idea-box/ideas/?q=plan",
+    "/idea-box/tags/",
+    "/idea-box/folders/",
+    "/idea-box/folders/{folder_id}/tags",
+    "/tasks/",
+    "/calendar/?start_date=2030-01-01&end_date=2030-01-31&with_total=true",
+    "/calendar/free-busy?start=2030-01-01T00:00:00&end=2030-01-31T00:00:00",
+]
+
+
+@pytest.mark.parametrize("url", LIST_URLS)
+def test_list_queries_use_indexes(client: TestClient, seeded, captured, url):
+    headers, folder_id = seeded
+    # Вторая страница добавляет к запросу условие курсора
+    response = client.get(url.format(folder_id=folder_id), headers=headers)
+    assert response.status_code == 200
+    cursor_url = url.format(folder_id=folder_id)
+    separator = "&" if "?" in cursor_url else "?"
+    first_page = client.get(f"{cursor_url}{separator}limit=1", headers=headers)
+    if cursor := first_page.headers.get("X-Next-Cursor"):
+        client.get(f"{cursor_url}{separator}limit=1&cursor={cursor}", headers=headers)
+
+    # Запросы авторизации и сессии не относятся к списку
+    list_statements = [
+        (statement, parameters)
+        for statement, parameters in captured
+        if "FROM user" not in statement and "FROM refreshtoken" not in statement
+    ]
+    assert list_statements
+    problems = {
+        statement: (parameters, bad)
+        for statement, parameters in list_statements
+        if (bad := _bad_steps(statement, parameters))
+    }
+    assert not problems, "\n\n".join(
+        f"{statement}\n-> {steps}\n{_plan(statement, parameters)}"
+        for statement, (parameters, steps) in problems.items()
+    )
+
+
+@pytest.mark.parametrize(
+    "url, index",
+    [
+        (
+            "/idea-box/ideas/?folder_id={folder_id}",
+            "ix_idea_owner_folder_pinned_updated",
+        ),
+        ("/idea-box/ideas/?tags=work", "ix_ideataglink_tag_idea"),
+        (
+            "/calendar/?start_date=2030-01-01&end_date=2030-01-31",
+            "ix_calendarevent_owner_start",
+        ),
+        (
+            "/calendar/?start_date=2030-01-01&end_date=2030-01-31",
+            "ix_calendarevent_owner_series",
+        ),
+        (
+            "/calendar/free-busy?start=2030-01-01T00:00:00&end=2030-01-31T00:00:00",
+            "ix_calendarevent_owner_long_end",
+        ),
+        (
+            "/calendar/?start_date=2030-01-01&end_date=2030-01-31",
+            "ix_calendarevent_series_recurrence",
+        ),
+        (
+            "/calendar/?start_date=2030-01-01&end_date=2030-01-31",
+            "ix_remoteevent_source_start",
+        ),
+        (
+            "/calendar/?start_date=2030-01-01&end_date=2030-01-31",
+            "ix_remoteevent_source_long_end",
+        ),
+        (
+            "/calendar/?start_date=2030-01-01&end_date=2030-01-31",
+            "ix_remoteevent_source_series",
+        ),
+        (
+            "/calendar/?start_date=2030-01-01&end_date=2030-01-31",
+            "ix_remoteevent_source_uid",
+        ),
+    ],
+)
+def test_filters_use_dedicated_indexes(
+    client: TestClient, seeded, captured, url, index
+):
+    headers, folder_id = seeded
+    client.get(url.format(folder_id=folder_id), headers=headers)
+    steps = [
+        step
+        for statement, parameters in captured
+        for step in _plan(statement, parameters)
+    ]
+    assert any(index in step for step in steps), steps
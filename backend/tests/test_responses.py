@@ -0,0 +1,82 @@
+from dataclasses import fields
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.modules.calendar.schemas import CalendarEventPublic, CalendarEventRow
+from src.modules.idea_box.ideas.schemas import (
+    IdeaPublic,
+    IdeaRow,
+    LinkMetadataPublic,
+    LinkMetadataRow,
+)
+from src.modules.idea_box.tags.schemas import (
+    TagPublic,
+    TagRow,
+    TagWithCount,
+    TagWithCountRow,
+)
+from src.modules.tasks.schemas import TaskPublic, TaskRow
+from src.models import LinkMetadata
+
+from .test_idea_box import create_folder
+from .test_tasks import get_auth_headers
+
+
+@pytest.mark.parametrize(
+    "row_type, schema",
+    [
+        (TaskRow, TaskPublic),
+        (TagRow, TagPublic),
+        (TagWithCountRow, TagWithCount),
+        (LinkMetadataRow, LinkMetadataPublic),
+        (IdeaRow, IdeaPublic),
+        (CalendarEventRow, CalendarEventPublic),
+    ],
+)
+def test_rows_follow_public_schemas(row_type, schema):
+    """Тест: строки быстрого пути - те же поля и в том же порядке, что у схем."""
+    assert [field.name for field in fields(row_type)] == list(schema.model_fields)
+
+
+def test_list_items_match_validated_responses(client: TestClient, session):
+    """Тест: элементы списков совпадают с ответами, проверенными по схеме."""
+    headers = get_auth_headers(client)
+    folder_id = create_folder(client, headers, "Inbox")["id"]
+    session.add(LinkMetadata(url="https://example.com/", title="Пример"))
+    session.commit()
+    idea = client.post(
+        "/idea-box/ideas/",
+        json={
+            "folder_id": folder_id,
+            "idea_type": "link",
+            "title": "Статья про кэширование",
+            "url": "https://example.com/",
+            "tags": ["read"],
+        },
+        headers=headers,
+    ).json()
+    event = client.post(
+        "/calendar/events",
+        json={
+            "title": "Обед",
+            "start_time": "2030-01-07T12:00:00.250000",
+            "end_time": "2030-01-07T13:00:00",
+        },
+        headers=headers,
+    ).json()
+
+    ideas = client.get("/idea-box/ideas/", headers=headers).json()
+    assert ideas == [
+        client.get(f"/idea-box/ideas/{idea['id']}", headers=headers).json()
+    ]
+    assert ideas[0]["link_metadata"]["title"] == "Пример"
+    # Поиск выбирает те же колонки вместе с рангом
+    assert client.get("/idea-box/ideas/?q=кэширование", headers=headers).json() == ideas
+
+    view = client.get(
+        "/calendar/?start_date=2030-01-01&end_date=2030-02-01", headers=headers
+    ).json()
+    assert view["events"] == [
+        client.get(f"/calendar/events/{event['id']}", headers=headers).json()
+    ]
@@ -73,3 +73,32 @@ def test_delete_task(client: TestClient):
     # Проверяем, что она действительно удалена
     get_response = client.get(f"/tasks/{task_id}", headers=headers)
     assert get_response.status_code == 404
+
+
+def test_get_tasks_cursor_pagination(client: TestClient):
+    headers = get_auth_headers(client)
+    for i in range(5):
+        client.post("/tasks/", json={"title": f"Task {i}"}, headers=headers)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "with_total": True}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/tasks/", params=params, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["X-Total-Count"] == "5"
+        seen.extend(task["title"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            assert response.headers["X-Has-More"] == "false"
+            break
+
+    assert sorted(seen) == [f"Task {i}" for i in range(5)]
+
+
+def test_get_tasks_invalid_cursor(client: TestClient):
+    headers = get_auth_headers(client)
+    response = client.get("/tasks/?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400